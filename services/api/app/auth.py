@@ -1,9 +1,51 @@
+import base64
+import json
+import re
+import time
+
 from fastapi import Depends, HTTPException, status, Request
 from jose import jwt, JWTError
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 
 from .settings import settings
+from .jwks import JWKSManager
+from .keys import KeySet
 from .log_client import send_event
-from .keys import load_public_key
+from .rejections import RejectionReporter
+from .token_cache import TokenCache
+
+jwks_manager = JWKSManager(
+    settings.JWKS_URL,
+    timeout=settings.JWKS_TIMEOUT_SECONDS,
+    default_ttl=settings.JWKS_REFRESH_SECONDS,
+    min_ttl=settings.JWKS_MIN_REFRESH_SECONDS,
+    max_ttl=settings.JWKS_MAX_REFRESH_SECONDS,
+    retry_initial=settings.JWKS_RETRY_INITIAL_SECONDS,
+    retry_max=settings.JWKS_RETRY_MAX_SECONDS,
+)
+
+# Claims of verified tokens, and why recently rejected tokens were rejected
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+rejected_tokens = TokenCache(settings.REJECTED_TOKEN_CACHE_MAX_ENTRIES)
+
+# Looks send_event up on every call, so patching app.auth.send_event applies
+rejections = RejectionReporter(
+    lambda **event: send_event(**event),
+    interval=settings.REJECTION_REPORT_INTERVAL_SECONDS,
+    burst=settings.REJECTION_REPORT_BURST,
+    max_keys=settings.REJECTION_REPORT_MAX_KEYS,
+)
+
+MAX_TOKEN_LENGTH = 8192
+# Ours is about 80 bytes ({"alg","kid","typ"}); parse nothing much bigger
+MAX_HEADER_BYTES = 512
+_COMPACT_JWS = re.compile(r"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+")
+
+
+class TokenRejected(JWTError):
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
 
 
 def client_ip(request: Request) -> str:
@@ -19,12 +61,11 @@ def original_path(request: Request) -> str:
 def get_bearer_token(request: Request) -> str:
     auth = request.headers.get("Authorization", "")
     if not auth.startswith("Bearer "):
-        send_event(
+        rejections.report(
             event="missing_token",
             ip=client_ip(request),
             path=original_path(request),
-            user_id=None,
-            meta={},
+            reason="missing",
         )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,29 +75,96 @@ def get_bearer_token(request: Request) -> str:
     return auth.removeprefix("Bearer ").strip()
 
 
+def current_keys() -> KeySet:
+    keys = settings.public_keys
+    return keys if keys is not None else jwks_manager.keys
+
+
+def precheck_token(token: str, key_set: KeySet) -> dict:
+    """
+    Reject what cannot be a token of ours before any crypto: not three
+    base64url segments, a header that is too long or unreadable, another
+    alg or an unknown kid. Returns the header. Raises TokenRejected.
+    """
+    if len(token) > MAX_TOKEN_LENGTH or not _COMPACT_JWS.fullmatch(token):
+        raise TokenRejected("malformed", "Not a compact JWS")
+    segment = token[:token.index(".")]
+    if len(segment) > (MAX_HEADER_BYTES * 4 + 2) // 3:
+        raise TokenRejected("malformed", "Header too long")
+    try:
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (ValueError, RecursionError):
+        # RecursionError: deeply nested arrays or objects
+        raise TokenRejected("malformed", "Unreadable header")
+    if not isinstance(header, dict):
+        raise TokenRejected("malformed", "Header is not an object")
+    if header.get("alg") != settings.JWT_ALG:
+        raise TokenRejected("alg", f"Unexpected alg {header.get('alg')!r}")
+    kid = header.get("kid")
+    if kid is not None and (not isinstance(kid, str) or kid not in key_set):
+        raise TokenRejected("unknown_kid", f"No public key for kid {kid!r}")
+    return header
+
+
+def _verify(token: str, key_set: KeySet) -> dict:
+    header = precheck_token(token, key_set)
+    try:
+        return jwt.decode(token, key_set.candidates(header.get("kid")), algorithms=[settings.JWT_ALG])
+    except ExpiredSignatureError as e:
+        raise TokenRejected("expired", str(e)) from e
+    except JWTClaimsError:
+        # Not valid yet (nbf, iat): may be fine in a moment, so not remembered
+        raise
+    except JWTError as e:
+        raise TokenRejected("invalid", str(e)) from e
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a JWT against the cached public keys and return its claims.
+    Raises JWTError (TokenRejected, with a reason, for rejections worth
+    remembering).
+
+    Tokens seen recently are answered from the caches: claims for the ones
+    that verified, the rejection reason for the ones that did not.
+    """
+    key_set = current_keys()
+    if not len(key_set):
+        # The JWKS has not been fetched yet; the manager keeps retrying
+        jwks_manager.request_refresh()
+        raise TokenRejected("no_keys", "Public key not available")
+
+    claims = token_cache.get(token, key_set)
+    if claims is not None:
+        return claims
+    reason = rejected_tokens.get(token, key_set)
+    if reason is not None:
+        raise TokenRejected(reason, "Rejected recently")
+
+    try:
+        claims = _verify(token, key_set)
+    except TokenRejected as e:
+        if e.reason == "unknown_kid":
+            # Maybe signed with a key auth-service has just rotated in
+            jwks_manager.request_refresh()
+        rejected_tokens.put(token, key_set, e.reason, expires_at=time.time() + settings.REJECTED_TOKEN_CACHE_SECONDS)
+        raise
+    token_cache.put(token, key_set, claims)
+    return claims
+
+
 def get_current_user(
     request: Request,
     token: str = Depends(get_bearer_token),
 ) -> dict:
     try:
-        # Verify using RS256 with public key
-        public_key_pem = settings.public_key_pem
-        if not public_key_pem:
-            raise JWTError("Public key not available")
-        
-        public_key = load_public_key(public_key_pem)
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=[settings.JWT_ALG],
-        )
-    except JWTError:
-        send_event(
+        payload = decode_token(token)
+    except JWTError as e:
+        rejections.report(
             event="invalid_token",
             ip=client_ip(request),
             path=original_path(request),
-            user_id=None,
-            meta={},
+            reason=getattr(e, "reason", "invalid"),
         )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,12 +175,11 @@ def get_current_user(
     role = payload.get("role")
 
     if not sub or not role:
-        send_event(
+        rejections.report(
             event="invalid_token_claims",
             ip=client_ip(request),
             path=original_path(request),
-            user_id=None,
-            meta={},
+            reason="claims",
         )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
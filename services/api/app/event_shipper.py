@@ -0,0 +1,247 @@
+"""
+Background batching of events to log-service.
+
+send_event puts the event in a bounded in-memory queue and returns; a worker
+thread sends the queue to log-service in batches, as soon as batch_size
+events are waiting or flush_interval seconds after the first one. A slow or
+unavailable log-service therefore never adds latency to the request that
+produced the event.
+
+When the queue is full the overflow policy decides:
+- drop_oldest: make room by discarding the oldest queued event (default;
+  during an attack the newest events matter most to detection)
+- drop_newest: discard the event being submitted
+- block: wait up to block_timeout for room, then discard it
+
+With a spool (see spool.py), batches log-service does not accept are written
+to disk instead of being lost, and replayed in order once it is back. While
+anything is spooled, new batches are appended behind it rather than sent, so
+log-service still receives events in the order they happened. Delivery is
+retried every retry_interval seconds.
+
+auth-service and api-service ship identical copies of this module; it is
+tested in services/auth, whose tests fail if the two copies differ.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from .spool import EventSpool
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class EventShipper:
+    def __init__(
+        self,
+        send_batch: Callable[[list[dict]], None],
+        *,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str = "drop_oldest",
+        block_timeout: float = 0.1,
+        spool: EventSpool | None = None,
+        send_spooled: Callable[[bytes], None] | None = None,
+        replay_chunk_bytes: int = 1024 * 1024,
+        retry_interval: float = 2.0,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.send_batch = send_batch
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spool = spool
+        self.send_spooled = send_spooled
+        self.replay_chunk_bytes = replay_chunk_bytes
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+
+        self._queue: deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+        # failed: neither sent nor spooled; replayed: sent from the spool
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.spooled = 0
+        self.replayed = 0
+        # Drops already logged by _report_drops
+        self._dropped_reported = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "spool_pending_bytes": self.spool.pending_bytes if self.spool is not None else 0,
+            "spool_dropped": self.spool.dropped if self.spool is not None else 0,
+        }
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="event-shipper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Send what is still queued, then stop."""
+        if not self.running:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, event: dict) -> bool:
+        """Queue an event. Returns False if the overflow policy discarded it."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(lambda: len(self._queue) < self.max_queue, self.block_timeout):
+                    self.dropped += 1
+                    return False
+
+            self._queue.append(event)
+            self.enqueued += 1
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _replaying(self) -> bool:
+        return self.spool is not None and self.spool.has_pending()
+
+    def _take_batch(self) -> list[dict]:
+        replaying = self._replaying()
+        with self._cond:
+            if replaying:
+                # Take whatever is queued right away, so the replay keeps going
+                # (or, while log-service is down, wait until the next retry)
+                self._cond.wait_for(
+                    lambda: self._queue or self._stopping,
+                    max(0.0, self._retry_at - time.monotonic()),
+                )
+            else:
+                self._cond.wait_for(lambda: self._queue or self._stopping)
+            if not self._stopping and not replaying:
+                # Give the batch until flush_interval to fill up
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            # Room for submitters blocked by the "block" policy
+            self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._send(batch)
+            if self.spool is not None:
+                try:
+                    self._replay()
+                    if not self._queue:
+                        # Nothing else coming right now: make the spooled events durable
+                        self.spool.sync()
+                except Exception:
+                    # A disk error must not stop the worker: events keep being sent
+                    # (or dropped) and the spool is tried again on the next pass
+                    logger.exception("Event spool replay failed")
+                    self._retry_at = time.monotonic() + self.retry_interval
+            self._report_drops()
+            if self._stopping and not batch:
+                return
+
+    def _send(self, batch: list[dict]) -> None:
+        if self._replaying():
+            # Stay behind the events already waiting on disk
+            self._spool(batch)
+            return
+        try:
+            self.send_batch(batch)
+        except Exception as e:
+            if self.spool is None:
+                self.failed += len(batch)
+                logger.warning("Failed to ship %d events to log-service: %r", len(batch), e)
+                return
+            logger.warning("Failed to ship %d events to log-service, spooling: %r", len(batch), e)
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._spool(batch)
+            return
+        self.sent += len(batch)
+        self.batches += 1
+
+    def _spool(self, batch: list[dict]) -> None:
+        try:
+            self.spool.append(batch)
+        except OSError as e:
+            self.failed += len(batch)
+            logger.warning("Failed to spool %d events: %r", len(batch), e)
+            return
+        self.spooled += len(batch)
+
+    def _replay(self, budget: float = 1.0) -> None:
+        """Send spooled events oldest first, for up to `budget` seconds."""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return
+        deadline = now + budget
+        while time.monotonic() < deadline:
+            chunk = self.spool.read_chunk(self.replay_chunk_bytes)
+            if chunk is None:
+                return
+            try:
+                self.send_spooled(chunk.data)
+            except Exception as e:
+                logger.warning("Spool replay to log-service failed, retrying in %.0fs: %r", self.retry_interval, e)
+                self._retry_at = time.monotonic() + self.retry_interval
+                return
+            self.spool.commit(chunk)
+            self.replayed += chunk.data.count(b"\n")
+
+    def _report_drops(self) -> None:
+        dropped = self.dropped
+        if dropped > self._dropped_reported:
+            logger.warning(
+                "Event queue full (%s): dropped %d events (%d total)",
+                self.overflow, dropped - self._dropped_reported, dropped,
+            )
+            self._dropped_reported = dropped
@@ -0,0 +1,171 @@
+"""
+Background fetching of auth-service's JWKS.
+
+JWKSManager owns the current KeySet. A background thread (start/stop from
+lifespan) fetches the JWKS right away and then keeps it fresh: again after
+the response's Cache-Control max-age (clamped to [min_ttl, max_ttl], or
+default_ttl without one), revalidating with If-None-Match when auth-service
+sent an ETag. A failed fetch keeps the current keys and is retried with
+exponential backoff from retry_initial up to retry_max seconds.
+
+Requests only ever read `keys`, so they never wait on the network: until
+the first fetch succeeds there are no keys and tokens are rejected. A token
+whose kid is not in the set asks for an early refresh (request_refresh), at
+most once per min_ttl, since auth-service may have just rotated its key.
+"""
+
+import logging
+import random
+import threading
+import time
+
+import httpx
+
+from .keys import KeySet
+
+logger = logging.getLogger(__name__)
+
+
+def parse_max_age(cache_control: str | None) -> float | None:
+    """max-age from a Cache-Control header; 0 for no-cache/no-store; None if it says neither."""
+    if not cache_control:
+        return None
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.lower()
+        if name in ("no-cache", "no-store"):
+            return 0.0
+        if name == "max-age":
+            try:
+                return max(0.0, float(value.strip('"')))
+            except ValueError:
+                return None
+    return None
+
+
+class JWKSManager:
+    def __init__(
+        self,
+        url: str,
+        *,
+        timeout: float = 3.0,
+        default_ttl: float = 300.0,
+        min_ttl: float = 30.0,
+        max_ttl: float = 3600.0,
+        retry_initial: float = 0.5,
+        retry_max: float = 30.0,
+        client: httpx.Client | None = None,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+
+        self._client = client
+        self._keys = KeySet()
+        self._etag: str | None = None
+        self._failures = 0
+        self._last_attempt = float("-inf")
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # A 304 counts as not_modified, not as a fetch
+        self.fetches = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    @property
+    def keys(self) -> KeySet:
+        return self._keys
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "kids": self._keys.kids,
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "consecutive_failures": self._failures,
+        }
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout)
+        return self._client
+
+    def _ttl(self, response: httpx.Response) -> float:
+        max_age = parse_max_age(response.headers.get("cache-control"))
+        if max_age is None:
+            return self.default_ttl
+        return min(self.max_ttl, max(self.min_ttl, max_age))
+
+    def _backoff(self) -> float:
+        delay = min(self.retry_max, self.retry_initial * 2 ** (self._failures - 1))
+        # Jitter, so replicas that lost auth-service together do not retry in lockstep
+        return delay * random.uniform(0.5, 1.0)
+
+    def refresh(self) -> float:
+        """Fetch the JWKS once and swap in its keys. Returns the seconds until the next fetch."""
+        self._last_attempt = time.monotonic()
+        headers = {"If-None-Match": self._etag} if self._etag and len(self._keys) else {}
+        try:
+            response = self._get_client().get(self.url, headers=headers)
+            if response.status_code == 304:
+                self.not_modified += 1
+            else:
+                response.raise_for_status()
+                keys = KeySet.from_jwks(response.json())
+                if not len(keys):
+                    raise ValueError("JWKS has no usable signing keys")
+                if keys.kids != self._keys.kids:
+                    logger.info("JWKS keys: %s", keys.kids)
+                self._keys = keys
+                self._etag = response.headers.get("etag")
+                self.fetches += 1
+        except Exception as e:
+            self.errors += 1
+            self._failures += 1
+            delay = self._backoff()
+            logger.warning("JWKS fetch from %s failed (%d in a row), retrying in %.1fs: %r",
+                           self.url, self._failures, delay, e)
+            return delay
+        self._failures = 0
+        return self._ttl(response)
+
+    def request_refresh(self) -> None:
+        """Ask the background thread for an early fetch; never blocks."""
+        if time.monotonic() - self._last_attempt >= self.min_ttl:
+            self._wake.set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.running:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _run(self) -> None:
+        delay = 0.0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            delay = self.refresh()
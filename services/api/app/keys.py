@@ -1,11 +1,26 @@
 """
 Public key management for JWT verification.
+
+Verification keys are parsed once, when the JWKS is fetched, into a KeySet
+indexed by kid. A KeySet is never modified: a refresh builds a new one and
+swaps it in with a single assignment, so requests verifying concurrently
+always see either the old or the new set, never a mix.
 """
 
-from cryptography.hazmat.primitives import serialization
+import base64
+import hashlib
+import json
+import logging
+
 from cryptography.hazmat.backends import default_backend
-import httpx
-from typing import Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+from jose.backends.base import Key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALG = "RS256"
 
 
 def load_public_key(pem: str):
@@ -16,47 +31,65 @@ def load_public_key(pem: str):
     )
 
 
-def fetch_public_key_from_jwks(jwks_url: str, kid: str = "sentinel-auth-key-1") -> Optional[str]:
-    """
-    Fetch public key from JWKS endpoint.
-    Returns PEM-encoded public key string.
-    """
-    try:
-        with httpx.Client(timeout=3.0) as client:
-            resp = client.get(jwks_url)
-            resp.raise_for_status()
-            jwks = resp.json()
-            
-            # Find the key with matching kid
-            for key in jwks.get("keys", []):
-                if key.get("kid") == kid:
-                    # Reconstruct public key from JWKS components
-                    import base64
-                    
-                    def base64url_to_int(s: str) -> int:
-                        """Convert base64url string to integer."""
-                        # Add padding
-                        padding = (4 - len(s) % 4) % 4
-                        s_padded = s + '=' * padding
-                        b = base64.urlsafe_b64decode(s_padded)
-                        return int.from_bytes(b, byteorder='big')
-                    
-                    n = base64url_to_int(key["n"])
-                    e = base64url_to_int(key["e"])
-                    
-                    # Reconstruct RSA public key
-                    from cryptography.hazmat.primitives.asymmetric import rsa
-                    public_numbers = rsa.RSAPublicNumbers(e, n)
-                    public_key = public_numbers.public_key(default_backend())
-                    
-                    # Export to PEM
-                    public_pem = public_key.public_bytes(
-                        encoding=serialization.Encoding.PEM,
-                        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-                    ).decode("utf-8")
-                    
-                    return public_pem
-            
-            return None
-    except Exception:
-        return None
+def _int_to_base64url(value: int, length: int) -> str:
+    return base64.urlsafe_b64encode(value.to_bytes(length, "big")).rstrip(b"=").decode("ascii")
+
+
+def jwk_thumbprint(public_key: rsa.RSAPublicKey) -> str:
+    """RFC 7638 SHA-256 thumbprint of an RSA public key: the kid auth-service gives it."""
+    numbers = public_key.public_numbers()
+    members = {
+        "e": _int_to_base64url(numbers.e, (numbers.e.bit_length() + 7) // 8),
+        "kty": "RSA",
+        "n": _int_to_base64url(numbers.n, (public_key.key_size + 7) // 8),
+    }
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+class KeySet:
+    """Parsed verification keys by kid."""
+
+    def __init__(self, keys: dict[str, Key] | None = None):
+        self._keys = dict(keys or {})
+        self._all = tuple(self._keys.values())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, kid: str) -> bool:
+        return kid in self._keys
+
+    @property
+    def kids(self) -> list[str]:
+        return list(self._keys)
+
+    def candidates(self, kid: str | None) -> tuple[Key, ...]:
+        """
+        Keys to verify a token with: the one its kid names, or every key for
+        a token without a kid. Empty for an unknown kid.
+        """
+        if kid is None:
+            return self._all
+        key = self._keys.get(kid)
+        return (key,) if key is not None else ()
+
+    @classmethod
+    def from_jwks(cls, jwks: dict) -> "KeySet":
+        """Parse the RSA signing keys of a JWKS document, skipping any that do not parse."""
+        keys = {}
+        for entry in jwks.get("keys", []):
+            if entry.get("kty") != "RSA" or entry.get("use", "sig") != "sig" or "kid" not in entry:
+                continue
+            try:
+                keys[entry["kid"]] = jwk.construct(entry, entry.get("alg", DEFAULT_ALG))
+            except Exception as e:
+                logger.warning("Skipping unusable JWKS key %r: %r", entry.get("kid"), e)
+        return cls(keys)
+
+    @classmethod
+    def from_pem(cls, pem: str, kid: str | None = None, alg: str = DEFAULT_ALG) -> "KeySet":
+        """A single key; its kid defaults to the thumbprint auth-service would publish it under."""
+        if kid is None:
+            kid = jwk_thumbprint(load_public_key(pem))
+        return cls({kid: jwk.construct(pem, alg)})
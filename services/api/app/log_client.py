@@ -1,12 +1,106 @@
+"""
+Client for shipping security events to log-service.
+
+A single keep-alive httpx.Client is shared by every request, so sending an
+event reuses a pooled HTTP/1.1 connection instead of opening a new one.
+While the app runs, send_event only queues the event; the shipper (see
+event_shipper.py) posts them to /ingest/batch in the background, spooling
+them to EVENT_SPOOL_DIR while log-service is unavailable. Both are started
+and stopped by lifespan in main.py. Without a running shipper (scripts,
+tests) events are sent inline.
+"""
+
+import logging
+import threading
 from datetime import datetime, timezone
+
 import httpx
+
+from .event_shipper import EventShipper
+from .spool import EventSpool
 from .settings import settings
 
+logger = logging.getLogger(__name__)
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    base_url=settings.LOG_SERVICE_URL,
+                    timeout=settings.LOG_SERVICE_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=settings.LOG_CLIENT_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.LOG_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.LOG_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                )
+    return _client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def send_batch(events: list[dict]) -> None:
+    response = get_client().post("/ingest/batch", json=events)
+    response.raise_for_status()
+
+
+def send_ndjson(body: bytes) -> None:
+    """Post spooled NDJSON lines as they are; raises if they should be retried."""
+    response = get_client().post(
+        "/ingest/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+        timeout=settings.EVENT_SPOOL_REPLAY_TIMEOUT_SECONDS,
+    )
+    if response.status_code >= 500:
+        response.raise_for_status()
+    # A 4xx will not get better by retrying; log-service already skips bad lines
+
+
+def open_spool() -> EventSpool | None:
+    if not settings.EVENT_SPOOL_DIR:
+        return None
+    try:
+        return EventSpool(
+            settings.EVENT_SPOOL_DIR,
+            segment_bytes=settings.EVENT_SPOOL_SEGMENT_BYTES,
+            max_bytes=settings.EVENT_SPOOL_MAX_BYTES,
+            fsync_interval=settings.EVENT_SPOOL_FSYNC_INTERVAL_SECONDS,
+        )
+    except OSError as e:
+        logger.warning("Event spool unavailable at %s, failed events will be lost: %r", settings.EVENT_SPOOL_DIR, e)
+        return None
+
+
+shipper = EventShipper(
+    send_batch,
+    max_queue=settings.EVENT_QUEUE_MAX,
+    batch_size=settings.EVENT_BATCH_SIZE,
+    flush_interval=settings.EVENT_FLUSH_INTERVAL_SECONDS,
+    overflow=settings.EVENT_QUEUE_OVERFLOW,
+    block_timeout=settings.EVENT_QUEUE_BLOCK_TIMEOUT_SECONDS,
+    send_spooled=send_ndjson,
+    replay_chunk_bytes=settings.EVENT_SPOOL_REPLAY_CHUNK_BYTES,
+    retry_interval=settings.EVENT_SPOOL_RETRY_SECONDS,
+)
+
+
 def send_event(*, event: str, ip: str, path: str, user_id: str | None, meta: dict | None = None) -> None:
     payload = {
         "v": 1,
@@ -18,8 +112,11 @@ def send_event(*, event: str, ip: str, path: str, user_id: str | None, meta: dic
         "user_id": user_id,
         "meta": meta or {},
     }
+    if shipper.running:
+        shipper.submit(payload)
+        return
+
     try:
-        with httpx.Client(timeout=1.0) as client:
-            client.post(f"{settings.LOG_SERVICE_URL}/ingest", json=payload)
+        get_client().post("/ingest", json=payload)
     except Exception as e:
-        print("send_event failed:", repr(e)) # Don't forget to delete print statements in production code!
+        logger.warning("send_event failed: %r", e)
@@ -1,7 +1,32 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
-from .auth import get_current_user, require_admin
+from .auth import get_current_user, require_admin, jwks_manager, rejected_tokens, rejections, token_cache
+from .log_client import get_client, close_client, open_spool, shipper
+from .settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fetches the JWKS in the background; startup does not wait for auth-service
+    jwks_manager.start()
+    # One pooled keep-alive client to log-service for the app's lifetime
+    get_client()
+    if settings.EVENT_SHIPPER_ENABLED:
+        shipper.spool = open_spool()
+        shipper.start()
+    rejections.start()
+    yield
+    # Pending rejection summaries go out before the shipper drains
+    rejections.stop()
+    shipper.stop()
+    if shipper.spool is not None:
+        shipper.spool.close()
+    close_client()
+    jwks_manager.stop()
+
 
-app = FastAPI(title="api-service")
+app = FastAPI(title="api-service", lifespan=lifespan)
 
 
 @app.get("/healthz")
@@ -24,4 +49,9 @@ def admin_stats(admin: dict = Depends(require_admin)):
             "users_total": 1,
             "alerts_total": 0,
         },
+        "token_cache": token_cache.stats(),
+        "rejected_tokens": rejected_tokens.stats(),
+        "rejections": rejections.stats(),
+        "jwks": jwks_manager.stats(),
+        "shipper": shipper.stats(),
     }
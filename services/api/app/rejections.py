@@ -0,0 +1,149 @@
+"""
+Aggregated reporting of rejected requests to log-service.
+
+A flood of bad tokens would otherwise become one event per request. Each
+(event, ip) gets a window of `interval` seconds: the first `burst`
+rejections in it are reported one by one, as before, so log-service
+detection still sees enough events to cross its thresholds; the rest are
+only counted, and reported as a single summary event when the window ends
+(meta: {"aggregated": <count>, "reasons": {...}}).
+
+Windows are closed by a background thread (start/stop from lifespan) and
+also whenever a rejection arrives after `interval`, so without the thread
+(scripts, tests) summaries are still sent, just later. At most max_keys
+windows are tracked; when that many (event, ip) pairs are open, they are all
+closed at once.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Window:
+    started: float
+    path: str
+    reported: int = 0
+    suppressed: int = 0
+    reasons: Counter = field(default_factory=Counter)
+
+
+class RejectionReporter:
+    def __init__(self, send_event: Callable[..., None], *, interval: float, burst: int, max_keys: int):
+        self.send_event = send_event
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+
+        self._windows: dict[tuple[str, str], _Window] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+        # reported: sent as their own event; aggregated: only counted in a summary
+        self.reported = 0
+        self.aggregated = 0
+        self.summaries = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "open_windows": len(self._windows),
+            "reported": self.reported,
+            "aggregated": self.aggregated,
+            "summaries": self.summaries,
+        }
+
+    def report(self, *, event: str, ip: str, path: str, reason: str) -> None:
+        now = time.monotonic()
+        closed: list[tuple[tuple[str, str], _Window]] = []
+        with self._lock:
+            if now - self._last_sweep >= self.interval:
+                closed += self._close_windows(now)
+
+            key = (event, ip)
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) >= self.max_keys:
+                    closed += self._close_windows(None)
+                window = self._windows[key] = _Window(started=now, path=path)
+
+            individual = window.reported < self.burst
+            if individual:
+                window.reported += 1
+                self.reported += 1
+            else:
+                window.suppressed += 1
+                window.reasons[reason] += 1
+                self.aggregated += 1
+
+        self._send_summaries(closed)
+        if individual:
+            self.send_event(event=event, ip=ip, path=path, user_id=None, meta={"reason": reason})
+
+    def flush(self, everything: bool = False) -> None:
+        """Send the summaries of the windows that have ended (all of them with everything=True)."""
+        with self._lock:
+            closed = self._close_windows(None if everything else time.monotonic())
+        self._send_summaries(closed)
+
+    def _close_windows(self, now: float | None) -> list[tuple[tuple[str, str], _Window]]:
+        """Remove the windows that ended by `now` (all if None) and return those with something to summarize."""
+        if now is None:
+            ended = list(self._windows)
+        else:
+            ended = [key for key, window in self._windows.items() if now - window.started >= self.interval]
+            self._last_sweep = now
+        closed = []
+        for key in ended:
+            window = self._windows.pop(key)
+            if window.suppressed:
+                closed.append((key, window))
+        return closed
+
+    def _send_summaries(self, closed: list[tuple[tuple[str, str], _Window]]) -> None:
+        for (event, ip), window in closed:
+            self.summaries += 1
+            self.send_event(
+                event=event,
+                ip=ip,
+                path=window.path,
+                user_id=None,
+                meta={"aggregated": window.suppressed, "reasons": dict(window.reasons)},
+            )
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="rejection-reporter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the thread and send every pending summary."""
+        if self.running:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush(everything=True)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval / 2):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to report aggregated rejections")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
@@ -1,5 +1,7 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from .keys import fetch_public_key_from_jwks
+from .keys import KeySet
 
 
 class Settings(BaseSettings):
@@ -8,31 +10,61 @@ class Settings(BaseSettings):
     JWT_ALG: str = "RS256"
     AUTH_SERVICE_URL: str = "http://auth:8001"
     JWKS_URL: str = "http://auth:8001/.well-known/jwks.json"
+    # Background JWKS refresh (app/jwks.py): after the response's max-age,
+    # clamped to [MIN, MAX], or JWKS_REFRESH_SECONDS without one
+    JWKS_TIMEOUT_SECONDS: float = 3.0
+    JWKS_REFRESH_SECONDS: float = 300.0
+    JWKS_MIN_REFRESH_SECONDS: float = 30.0
+    JWKS_MAX_REFRESH_SECONDS: float = 3600.0
+    JWKS_RETRY_INITIAL_SECONDS: float = 0.5
+    JWKS_RETRY_MAX_SECONDS: float = 30.0
+
+    # Claims of verified tokens, kept until they expire (0 disables)
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    # Hashes of recently rejected tokens, answered without parsing them again
+    REJECTED_TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    REJECTED_TOKEN_CACHE_SECONDS: float = 60.0
+    # Rejections sent to log-service: the first REJECTION_REPORT_BURST per
+    # (event, ip) each interval one by one, the rest as one summary event
+    REJECTION_REPORT_INTERVAL_SECONDS: float = 10.0
+    REJECTION_REPORT_BURST: int = 20
+    REJECTION_REPORT_MAX_KEYS: int = 10_000
 
     LOG_SERVICE_URL: str = "http://log:8003"
+    # Pooled keep-alive client used by send_event
+    LOG_SERVICE_TIMEOUT_SECONDS: float = 1.0
+    LOG_CLIENT_MAX_CONNECTIONS: int = 20
+    LOG_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LOG_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
 
-    # Public key PEM (fetched from auth-service JWKS endpoint)
-    _public_key_pem: str | None = None
+    # Background event shipping: send_event queues, a worker posts batches
+    EVENT_SHIPPER_ENABLED: bool = True
+    EVENT_QUEUE_MAX: int = 10_000
+    EVENT_BATCH_SIZE: int = 200
+    EVENT_FLUSH_INTERVAL_SECONDS: float = 0.5
+    EVENT_QUEUE_OVERFLOW: Literal["drop_oldest", "drop_newest", "block"] = "drop_oldest"
+    EVENT_QUEUE_BLOCK_TIMEOUT_SECONDS: float = 0.1
 
-    def __init__(self, **data):
-        super().__init__(**data)
-        # Fetch public key from JWKS endpoint
-        if not self._public_key_pem:
-            public_key_pem = fetch_public_key_from_jwks(self.JWKS_URL)
-            if public_key_pem:
-                self._public_key_pem = public_key_pem
-            else:
-                # Fallback: try to continue without it, will fail at JWT verification
-                pass
+    # Spool for events log-service did not accept; replayed once it is back.
+    # Set EVENT_SPOOL_DIR empty to disable (failed events are then lost).
+    EVENT_SPOOL_DIR: str | None = "/data/event-spool"
+    EVENT_SPOOL_SEGMENT_BYTES: int = 8 * 1024 * 1024
+    EVENT_SPOOL_MAX_BYTES: int = 512 * 1024 * 1024
+    EVENT_SPOOL_FSYNC_INTERVAL_SECONDS: float = 1.0
+    EVENT_SPOOL_REPLAY_CHUNK_BYTES: int = 1024 * 1024
+    EVENT_SPOOL_REPLAY_TIMEOUT_SECONDS: float = 30.0
+    EVENT_SPOOL_RETRY_SECONDS: float = 2.0
+
+    # Verification keys set directly instead of fetched from the JWKS (tests)
+    _public_keys: KeySet | None = None
+    _public_key_pem: str | None = None
 
     @property
-    def public_key_pem(self) -> str | None:
-        """Get the public key PEM."""
-        if not self._public_key_pem:
-            public_key_pem = fetch_public_key_from_jwks(self.JWKS_URL)
-            if public_key_pem:
-                self._public_key_pem = public_key_pem
-        return self._public_key_pem
+    def public_keys(self) -> KeySet | None:
+        """Keys configured directly, used instead of the JWKS; None normally."""
+        if self._public_keys is None and self._public_key_pem:
+            self._public_keys = KeySet.from_pem(self._public_key_pem)
+        return self._public_keys
 
 
 settings = Settings()
@@ -0,0 +1,240 @@
+"""
+Durable on-disk spool for events log-service did not accept.
+
+Events are appended as NDJSON to segment files (events-<seq>.ndjson) in the
+spool directory; a new segment is started once the current one reaches
+segment_bytes, and on every open, so a torn write from a crash never sits in
+the segment being appended to. Appends are written straight to the kernel and
+fsynced at most every fsync_interval seconds (sync() flushes the rest), so a
+burst of failed batches costs one fsync, not one per batch.
+
+Replay reads the segments oldest first, in chunks of whole lines that can be
+posted to /ingest/stream as-is, without decoding a single event. A cursor
+file records how far delivery got; fully delivered segments are deleted.
+Delivery is at-least-once: a crash between posting a chunk and committing
+it replays that chunk again.
+
+Disk use is bounded by max_bytes: when it is exceeded the oldest segments
+are deleted, undelivered or not, and their events are counted as dropped.
+
+auth-service and api-service ship identical copies of this module; it is
+tested in services/auth, whose tests fail if the two copies differ.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".ndjson"
+CURSOR_FILE = "cursor"
+
+
+@dataclass(frozen=True)
+class SpoolChunk:
+    data: bytes
+    segment: int
+    end: int
+
+
+class EventSpool:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+        fsync_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+
+        self.appended = 0
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        self._sizes: dict[int, int] = {}
+        for name in os.listdir(directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                self._sizes[seq] = os.path.getsize(self._path(seq))
+
+        self._cursor_segment, self._cursor_offset = self._load_cursor()
+        for seq in [seq for seq in self._sizes if seq < self._cursor_segment]:
+            # Delivered, but deleting it was interrupted
+            os.remove(self._path(seq))
+            del self._sizes[seq]
+
+        self._active_seq = max(self._sizes, default=0) + 1
+        self._active = None
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    # -- paths and cursor ---------------------------------------------------
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _load_cursor(self) -> tuple[int, int]:
+        first = min(self._sizes, default=1)
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                segment, offset = (int(part) for part in f.read().split())
+        except (OSError, ValueError):
+            return first, 0
+        if segment not in self._sizes:
+            # That segment was finished (or dropped) after the cursor was saved
+            return first, 0
+        return segment, offset
+
+    def _save_cursor(self) -> None:
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{self._cursor_segment} {self._cursor_offset}")
+        os.replace(tmp, path)
+
+    # -- appending ----------------------------------------------------------
+
+    @property
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._pending_bytes()
+
+    def _pending_bytes(self) -> int:
+        return sum(
+            size - (self._cursor_offset if seq == self._cursor_segment else 0)
+            for seq, size in self._sizes.items()
+            if seq >= self._cursor_segment
+        )
+
+    def has_pending(self) -> bool:
+        return self.pending_bytes > 0
+
+    def append(self, events: list[dict]) -> None:
+        data = b"".join(json.dumps(event, separators=(",", ":")).encode() + b"\n" for event in events)
+        with self._lock:
+            size = self._sizes.get(self._active_seq, 0)
+            if self._active is None or (size and size + len(data) > self.segment_bytes):
+                self._rotate()
+            self._active.write(data)
+            self._sizes[self._active_seq] += len(data)
+            self.appended += len(events)
+            self._dirty = True
+
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+            self._enforce_limit()
+
+    def sync(self) -> None:
+        """fsync whatever was appended since the last fsync."""
+        with self._lock:
+            self._fsync()
+
+    def close(self) -> None:
+        with self._lock:
+            self._fsync()
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+
+    def _fsync(self) -> None:
+        if self._dirty and self._active is not None:
+            os.fsync(self._active.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self) -> None:
+        if self._active is not None:
+            self._fsync()
+            self._active.close()
+            self._active_seq += 1
+        self._active = open(self._path(self._active_seq), "ab", buffering=0)
+        self._sizes.setdefault(self._active_seq, 0)
+        if not self._pending_bytes():
+            # Everything before the new segment was delivered
+            for seq in [seq for seq in self._sizes if seq != self._active_seq]:
+                os.remove(self._path(seq))
+                del self._sizes[seq]
+            self._cursor_segment, self._cursor_offset = self._active_seq, 0
+            self._save_cursor()
+
+    def _enforce_limit(self) -> None:
+        while sum(self._sizes.values()) > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            start = self._cursor_offset if oldest == self._cursor_segment else 0
+            if oldest >= self._cursor_segment:
+                self.dropped += self._count_lines(oldest, start)
+            self._delete(oldest)
+
+    def _count_lines(self, seq: int, start: int) -> int:
+        lines = 0
+        with open(self._path(seq), "rb") as f:
+            f.seek(start)
+            while block := f.read(1024 * 1024):
+                lines += block.count(b"\n")
+        return lines
+
+    def _delete(self, seq: int) -> None:
+        os.remove(self._path(seq))
+        del self._sizes[seq]
+        if seq == self._cursor_segment:
+            self._cursor_segment, self._cursor_offset = min(self._sizes, default=seq + 1), 0
+            self._save_cursor()
+
+    # -- replay -------------------------------------------------------------
+
+    def read_chunk(self, max_bytes: int = 1024 * 1024) -> SpoolChunk | None:
+        """The next undelivered whole lines, oldest first; None if nothing is pending."""
+        with self._lock:
+            while True:
+                seq, offset = self._cursor_segment, self._cursor_offset
+                if seq not in self._sizes:
+                    return None
+                size = self._sizes[seq]
+                if offset < size:
+                    break
+                if seq == self._active_seq:
+                    return None
+                # Fully delivered and no longer appended to
+                self._delete(seq)
+
+            active = seq == self._active_seq
+
+        try:
+            f = open(self._path(seq), "rb")
+        except FileNotFoundError:
+            # Dropped by the size limit since the cursor was read
+            return self.read_chunk(max_bytes)
+        with f:
+            f.seek(offset)
+            data = f.read(min(max_bytes, size - offset))
+            cut = data.rfind(b"\n") + 1
+            if cut == 0 and offset + len(data) < size:
+                # A single line longer than max_bytes: send it whole
+                data += f.read(size - offset - len(data))
+                cut = data.find(b"\n") + 1 or len(data)
+            elif cut == 0 or not active and offset + len(data) == size:
+                # The end of a closed segment may be a torn last line; send it as is
+                cut = len(data)
+
+        data = data[:cut]
+        return SpoolChunk(data, seq, offset + len(data))
+
+    def commit(self, chunk: SpoolChunk) -> None:
+        """Mark a chunk from read_chunk() as delivered."""
+        with self._lock:
+            if chunk.segment != self._cursor_segment:
+                # Dropped by the size limit meanwhile
+                return
+            self._cursor_offset = chunk.end
+            if chunk.end >= self._sizes.get(chunk.segment, 0) and chunk.segment != self._active_seq:
+                self._delete(chunk.segment)
+            else:
+                self._save_cursor()
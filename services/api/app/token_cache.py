@@ -0,0 +1,115 @@
+"""
+Cache of verified tokens.
+
+Clients send the same bearer token on every call for its whole lifetime,
+and verifying its RS256 signature each time is the bulk of the cost of an
+authenticated request. Once a token has verified, its claims are kept,
+keyed by the SHA-256 of the token, until its `exp`; a token without `exp`
+is not cached.
+
+The same class, given explicit expiry times, is the negative cache of
+recently rejected tokens, so the same garbage token sent again is turned
+away without being parsed.
+
+The cache is bounded to max_entries, evicting the least recently used
+token. It belongs to one KeySet: when the verification keys are refreshed
+(a key was rotated out or revoked) the whole cache is dropped, so no token
+is accepted on the strength of a key that is gone.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from .keys import KeySet
+
+
+class TokenCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[float, object]] = OrderedDict()
+        self._keys: KeySet | None = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "invalidations": self.invalidations,
+        }
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _bind(self, keys: KeySet) -> None:
+        if keys is not self._keys:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._keys = keys
+
+    def get(self, token: str, keys: KeySet):
+        """What was stored for a token under these keys, unless it has expired since; else None."""
+        if not self.enabled:
+            return None
+        digest = self._digest(token)
+        with self._lock:
+            self._bind(keys)
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return value
+
+    def put(self, token: str, keys: KeySet, value, expires_at: float | None = None) -> None:
+        """
+        Store a value for a token until expires_at (epoch seconds); by default
+        until the `exp` of the claims being stored.
+        """
+        if not self.enabled:
+            return
+        if expires_at is None:
+            expires_at = value.get("exp")
+        if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._bind(keys)
+            self._entries[digest] = (expires_at, value)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Measure what a flood of bad bearer tokens costs api-service per request:
+verifying every token and reporting every rejection (before the structural
+pre-check, the rejected-token cache and aggregated reporting) against the
+current decode_token + rejection reporter.
+
+Usage:
+  poetry run python benchmarks/invalid_token_flood.py
+  poetry run python benchmarks/invalid_token_flood.py --requests 20000
+
+Notes:
+- A throwaway localhost server plays auth-service's JWKS endpoint and
+  log-service's /ingest/batch; the background shipper is running, as in
+  production, so reporting an event costs a queue put.
+- Three floods: the same malformed token (attacks/invalid_token_burst.py
+  sends "not.a.valid.jwt"), the same well-formed token with a bad
+  signature (the expensive case before: a full RS256 verify each time), and
+  a different well-formed bad token on every request (nothing to cache; only
+  the pre-check helps when the kid is unknown).
+- Only token handling is timed, not HTTP; "events" is what was handed to
+  the shipper for log-service.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from me_throughput import generate_key  # noqa: E402
+
+
+def make_handler(jwks: dict):
+    jwks_body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._reply(jwks_body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply(b'{"status":"ok"}')
+
+        def _reply(self, body: bytes):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark api-service under a flood of bad tokens.")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per flood and variant (default: 5000)")
+    args = parser.parse_args()
+
+    _, _, jwks = generate_key()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(jwks))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["LOG_SERVICE_URL"] = url
+    os.environ["JWKS_URL"] = f"{url}/.well-known/jwks.json"
+    os.environ["EVENT_SPOOL_DIR"] = ""
+
+    from jose import JWTError, jwt
+
+    from app import auth, log_client
+    from app.settings import settings
+
+    auth.jwks_manager.refresh()
+    log_client.shipper.start()
+    ip, path = "203.0.113.7", "/api/me"
+
+    def verify_every_time(token: str) -> None:
+        # Before: full parse and verify attempt, one event per rejection
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            jwt.decode(token, auth.current_keys().candidates(kid), algorithms=[settings.JWT_ALG])
+        except JWTError:
+            log_client.send_event(event="invalid_token", ip=ip, path=path, user_id=None, meta={})
+
+    def current(token: str) -> None:
+        try:
+            auth.decode_token(token)
+        except JWTError as e:
+            auth.rejections.report(event="invalid_token", ip=ip, path=path, reason=getattr(e, "reason", "invalid"))
+
+    header = b64url(json.dumps({"alg": "RS256", "typ": "JWT"}).encode())
+    claims = b64url(json.dumps({"sub": "1", "role": "admin"}).encode())
+    bad_signature = f"{header}.{claims}.{b64url(os.urandom(256))}"
+    floods = {
+        "same malformed token": lambda i: "not.a.valid.jwt",
+        "same bad signature": lambda i: bad_signature,
+        "unique bad signatures": lambda i: f"{header}.{b64url(json.dumps({'sub': str(i)}).encode())}.{b64url(os.urandom(256))}",
+    }
+
+    print(f"{args.requests} requests per flood")
+    for flood, make_token in floods.items():
+        tokens = [make_token(i) for i in range(args.requests)]
+        print(f"\n{flood}")
+        results = {}
+        for label, handle in (("verify every time", verify_every_time), ("pre-check + caches", current)):
+            auth.rejected_tokens.clear()
+            auth.rejections.clear()
+            enqueued = log_client.shipper.enqueued
+            started = time.perf_counter()
+            for token in tokens:
+                handle(token)
+            elapsed = time.perf_counter() - started
+            auth.rejections.flush(everything=True)
+            events = log_client.shipper.enqueued - enqueued
+            results[label] = elapsed
+            print(
+                f"  {label:<20} {elapsed / len(tokens) * 1e6:8.1f}us/request  "
+                f"{len(tokens) / elapsed:10,.0f} requests/s  events {events}"
+            )
+        print(f"  {'':<20} {results['verify every time'] / results['pre-check + caches']:.1f}x")
+
+    log_client.shipper.stop()
+    log_client.close_client()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
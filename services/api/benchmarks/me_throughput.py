@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Measure /me throughput with the cached, kid-indexed verification keys
+against parsing the PEM public key on every request (the original
+behaviour), and with the verified-token cache on top.
+
+Usage:
+  poetry run python benchmarks/me_throughput.py
+  poetry run python benchmarks/me_throughput.py --requests 20000
+
+Notes:
+- A throwaway localhost server plays auth-service's JWKS endpoint for a key
+  generated here; tokens are signed with it the way auth-service does.
+- Requests go through the ASGI app in-process with TestClient, so the
+  numbers are the service's own cost (routing, dependency injection, token
+  verification) without a network or server in between. The verification
+  step alone is timed as well, since that is where the two variants differ.
+- The per-request variant swaps get_current_user for the old one through
+  app.dependency_overrides; everything else is identical. The key set
+  variant runs with the token cache disabled; the token cache variant
+  reuses one token, as a client does for the token's lifetime.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_jwks_handler(jwks: dict):
+    body = json.dumps(jwks).encode()
+
+    class JWKSHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return JWKSHandler
+
+
+def generate_key():
+    import base64
+
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+
+    def b64(n: int) -> str:
+        return base64.urlsafe_b64encode(n.to_bytes((n.bit_length() + 7) // 8, "big")).rstrip(b"=").decode()
+
+    numbers = private_key.public_key().public_numbers()
+    jwks = {"keys": [{
+        "kty": "RSA", "use": "sig", "kid": "bench-key-1", "alg": "RS256",
+        "n": b64(numbers.n), "e": b64(numbers.e),
+    }]}
+    return private_pem, public_pem, jwks
+
+
+def timed(fn, count: int) -> list[float]:
+    for _ in range(min(100, count)):
+        fn()
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> float:
+    us = sorted(s * 1e6 for s in samples)
+    rate = len(samples) / sum(samples)
+    print(
+        f"{label:<34} {rate:9,.0f}/s  p50 {us[len(us) // 2]:7.1f}us  "
+        f"p99 {us[int(len(us) * 0.99)]:7.1f}us  mean {statistics.mean(us):7.1f}us"
+    )
+    return rate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark /me with cached vs per-request key parsing.")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per variant (default: 5000)")
+    args = parser.parse_args()
+
+    private_pem, public_pem, jwks = generate_key()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_jwks_handler(jwks))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["JWKS_URL"] = f"http://127.0.0.1:{server.server_address[1]}/.well-known/jwks.json"
+    os.environ["EVENT_SHIPPER_ENABLED"] = "false"
+
+    from fastapi import Depends, Request
+    from fastapi.testclient import TestClient
+    from jose import jwt
+
+    from app import auth
+    from app.auth import decode_token, get_bearer_token, get_current_user
+    from app.keys import load_public_key
+    from app.main import app
+    from app.settings import settings
+    from app.token_cache import TokenCache
+
+    auth.jwks_manager.refresh()
+    print(f"keys fetched from JWKS: {auth.jwks_manager.keys.kids}")
+
+    token = jwt.encode(
+        {
+            "sub": "bench-user",
+            "role": "user",
+            "exp": int((datetime.now(timezone.utc) + timedelta(hours=1)).timestamp()),
+        },
+        private_pem,
+        algorithm="RS256",
+    )
+
+    def decode_parsing_pem(token: str) -> dict:
+        # What get_current_user did before: parse the PEM for every request
+        return jwt.decode(token, load_public_key(public_pem), algorithms=[settings.JWT_ALG])
+
+    def old_get_current_user(request: Request, token: str = Depends(get_bearer_token)) -> dict:
+        payload = decode_parsing_pem(token)
+        return {"user_id": payload["sub"], "role": payload["role"]}
+
+    token_cache = auth.token_cache
+    variants = [("cached key set", TokenCache(0)), ("cached key set + token cache", token_cache)]
+
+    print(f"\ntoken verification, {args.requests} tokens")
+    old = report("parse PEM per request", timed(lambda: decode_parsing_pem(token), args.requests))
+    for label, cache in variants:
+        auth.token_cache = cache
+        new = report(label, timed(lambda: decode_token(token), args.requests))
+        print(f"{'':<34} {new / old:.2f}x")
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def get_me():
+        response = client.get("/me", headers=headers)
+        assert response.status_code == 200, response.text
+
+    print(f"\nGET /me, {args.requests} sequential requests in-process")
+    app.dependency_overrides[get_current_user] = old_get_current_user
+    old = report("parse PEM per request", timed(get_me, args.requests))
+    app.dependency_overrides.clear()
+    for label, cache in variants:
+        auth.token_cache = cache
+        new = report(label, timed(get_me, args.requests))
+        print(f"{'':<34} {new / old:.2f}x")
+    print(f"\ntoken cache: {token_cache.stats()}")
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
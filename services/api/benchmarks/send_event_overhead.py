@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Measure the per-event cost of send_event in the request path: a new
+httpx.Client per event (the original behaviour), the shared keep-alive
+client, and queueing for the background shipper.
+
+Usage:
+  poetry run python benchmarks/send_event_overhead.py
+  poetry run python benchmarks/send_event_overhead.py --events 5000
+  poetry run python benchmarks/send_event_overhead.py --url http://localhost:8003
+
+Notes:
+- By default events go to a throwaway HTTP/1.1 keep-alive server on
+  localhost that answers every request with 200, so the numbers are the
+  client-side overhead only; --url points at a real log-service instead.
+- Over a real network the gap grows with the connect round trip (and TLS,
+  if any), which the pooled client only pays once per connection.
+- The local server counts accepted TCP connections, to show the reuse.
+- The shipper variant only times send_event (the queue put); the batches
+  it posts meanwhile are reported separately, along with the time to
+  drain the queue on stop.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send each response in one segment; otherwise keep-alive requests
+    # stall on Nagle + delayed ACK and the stub, not the client, is measured
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        IngestHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # Enough for both /ingest and /ingest/batch callers, which only check the status
+        body = b'{"status":"ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(label: str, send, events: int) -> None:
+    # Warm up imports, DNS and the first connection
+    for _ in range(10):
+        send()
+
+    before = IngestHandler.connections
+    samples = []
+    for _ in range(events):
+        started = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - started)
+
+    us = [s * 1e6 for s in samples]
+    print(
+        f"{label:<24} mean {statistics.mean(us):8.1f}us  p50 {percentile(us, 50):8.1f}us  "
+        f"p99 {percentile(us, 99):8.1f}us  connections {IngestHandler.connections - before}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark send_event per-event overhead.")
+    parser.add_argument("--events", type=int, default=2000, help="Events per variant (default: 2000)")
+    parser.add_argument("--url", default=None, help="log-service URL (default: local stub server)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), IngestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ["LOG_SERVICE_URL"] = url
+
+    import httpx
+    from app import log_client
+
+    event = {"event": "invalid_token", "ip": "203.0.113.7", "path": "/me", "user_id": None, "meta": {}}
+
+    def per_event_client():
+        # What send_event did before: a new client, and so a new connection, per event
+        payload = {"v": 1, "ts": log_client._now_iso(), "service": "api", **event}
+        try:
+            with httpx.Client(timeout=1.0) as client:
+                client.post(f"{url}/ingest", json=payload)
+        except Exception:
+            pass
+
+    def pooled_client():
+        log_client.send_event(**event)
+
+    print(f"{args.events} sequential events to {url}")
+    run("new client per event", per_event_client, args.events)
+    run("pooled keep-alive client", pooled_client, args.events)
+
+    log_client.shipper.start()
+    run("background shipper", pooled_client, args.events)
+    started = time.perf_counter()
+    log_client.shipper.stop()
+    stats = log_client.shipper.stats()
+    print(
+        f"{'':<24} drained in {(time.perf_counter() - started) * 1e3:.1f}ms: "
+        f"{stats['sent']} events in {stats['batches']} batches, {stats['dropped']} dropped"
+    )
+
+    log_client.close_client()
+    if server is not None:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Fill the on-disk event spool and time replaying it to log-service.
+
+Usage:
+  poetry run python benchmarks/spool_replay.py
+  poetry run python benchmarks/spool_replay.py --events 200000 --chunk-bytes 262144
+  poetry run python benchmarks/spool_replay.py --url http://localhost:8003
+
+Notes:
+- The spool lives in a temp directory and is filled in batches of
+  EVENT_BATCH_SIZE, as the shipper does while log-service is down, with the
+  configured fsync interval; the append rate is reported too.
+- Replay posts the spooled NDJSON chunks to /ingest/stream with
+  log_client.send_ndjson, exactly as the shipper does. By default they go to
+  a throwaway localhost server that only counts lines, so the numbers are
+  the spool + client side; --url points at a real log-service, where
+  storing the events dominates.
+- The target is 1M spooled events replayed in under a minute; the exit
+  status is 1 if replay takes longer than --target-seconds.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    lines = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StreamHandler.lines += body.count(b"\n")
+        reply = b'{"accepted":0,"rejected":0,"errors":[],"errors_truncated":false}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark replaying the event spool.")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Events to spool (default: 1M)")
+    parser.add_argument("--chunk-bytes", type=int, default=None, help="Replay chunk size (default: from settings)")
+    parser.add_argument("--url", default=None, help="log-service URL (default: local stub server)")
+    parser.add_argument("--target-seconds", type=float, default=60.0, help="Replay time budget (default: 60)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["LOG_SERVICE_URL"] = url
+    os.environ["EVENT_SPOOL_DIR"] = tmpdir.name
+
+    from app import log_client
+    from app.settings import settings
+
+    spool = log_client.open_spool()
+    chunk_bytes = args.chunk_bytes or settings.EVENT_SPOOL_REPLAY_CHUNK_BYTES
+    batch_size = settings.EVENT_BATCH_SIZE
+
+    def event(n: int) -> dict:
+        return {
+            "v": 1, "ts": log_client._now_iso(), "service": "api", "event": "invalid_token",
+            "ip": f"203.0.113.{n % 256}", "path": "/me", "user_id": None, "meta": {"reason": "expired"},
+        }
+
+    started = time.perf_counter()
+    for start in range(0, args.events, batch_size):
+        spool.append([event(n) for n in range(start, min(start + batch_size, args.events))])
+    spool.sync()
+    elapsed = time.perf_counter() - started
+    size = spool.pending_bytes
+    print(
+        f"spooled  {args.events:,} events, {size / 2**20:.0f} MiB in {elapsed:.1f}s "
+        f"({args.events / elapsed:,.0f} events/s)"
+    )
+
+    replayed = chunks = 0
+    started = time.perf_counter()
+    while (chunk := spool.read_chunk(chunk_bytes)) is not None:
+        log_client.send_ndjson(chunk.data)
+        spool.commit(chunk)
+        replayed += chunk.data.count(b"\n")
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    print(
+        f"replayed {replayed:,} events in {chunks} chunks of <= {chunk_bytes // 1024} KiB in {elapsed:.1f}s "
+        f"({replayed / elapsed:,.0f} events/s, {size / 2**20 / elapsed:.0f} MiB/s)"
+    )
+    if server is not None:
+        print(f"server received {StreamHandler.lines:,} lines")
+
+    ok = replayed == args.events and elapsed <= args.target_seconds
+    print("within target" if ok else f"MISSED target of {args.target_seconds:.0f}s for {args.events:,} events")
+
+    spool.close()
+    log_client.close_client()
+    tmpdir.cleanup()
+    if server is not None:
+        server.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,6 +12,17 @@ def utcnow():
     return datetime.now(timezone.utc)
 
 
+@pytest.fixture(autouse=True)
+def reset_auth_state():
+    """Start every test with empty token caches and no open rejection windows."""
+    from app import auth
+
+    auth.token_cache.clear()
+    auth.rejected_tokens.clear()
+    auth.rejections.clear()
+    yield
+
+
 @pytest.fixture
 def rsa_keys():
     """Generate RSA keypair for testing."""
@@ -93,12 +104,8 @@ def api_client(test_settings, rsa_keys):
     
     # Start patches and keep them active during test
     # Patch where functions are USED, not where they're DEFINED
-    fetch_patcher = patch("app.keys.fetch_public_key_from_jwks")
     send_patcher = patch("app.auth.send_event")  # auth.py imports send_event directly
     
-    mock_fetch = fetch_patcher.start()
-    mock_fetch.return_value = rsa_keys["public"]
-    
     mock_send = send_patcher.start()
     
     try:
@@ -109,7 +116,6 @@ def api_client(test_settings, rsa_keys):
         client._mock_send_event = mock_send
         yield client
     finally:
-        fetch_patcher.stop()
         send_patcher.stop()
 
 
@@ -119,14 +125,6 @@ def mock_send_event(api_client):
     return api_client._mock_send_event
 
 
-@pytest.fixture
-def mock_fetch_public_key(rsa_keys):
-    """Mock the fetch_public_key_from_jwks function globally."""
-    def mock_fn(*args, **kwargs):
-        return rsa_keys["public"]
-    return mock_fn
-
-
 @pytest.fixture
 def authenticated_client(api_client, create_token):
     """Create a test client with authentication headers."""
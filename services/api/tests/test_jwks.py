@@ -0,0 +1,283 @@
+"""Tests for the background JWKS manager."""
+
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.jwks import JWKSManager, parse_max_age
+from tests.test_keys import jwk_for
+
+
+JWKS_URL = "http://auth:8001/.well-known/jwks.json"
+
+
+class FakeAuthService:
+    """Serves a JWKS through httpx.MockTransport; can be switched off."""
+
+    def __init__(self, jwks: dict, headers: dict | None = None):
+        self.jwks = jwks
+        self.headers = headers or {}
+        self.up = True
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if not self.up:
+            raise httpx.ConnectError("auth-service down", request=request)
+        etag = self.headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers=self.headers)
+        return httpx.Response(200, json=self.jwks, headers=self.headers)
+
+
+def make_manager(service: FakeAuthService, **options) -> JWKSManager:
+    client = httpx.Client(transport=httpx.MockTransport(service))
+    return JWKSManager(JWKS_URL, client=client, **options)
+
+
+@pytest.fixture
+def jwks(rsa_keys):
+    return {"keys": [jwk_for(rsa_keys["public_key_obj"], "key-1")]}
+
+
+@pytest.fixture
+def other_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestParseMaxAge:
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("", None),
+        ("public, max-age=600", 600.0),
+        ("max-age=\"60\"", 60.0),
+        ("Max-Age=60, must-revalidate", 60.0),
+        ("no-store", 0.0),
+        ("no-cache, max-age=600", 0.0),
+        ("max-age=soon", None),
+        ("public", None),
+    ])
+    def test_parses(self, header, expected):
+        assert parse_max_age(header) == expected
+
+
+class TestRefresh:
+    def test_loads_keys(self, jwks):
+        manager = make_manager(FakeAuthService(jwks))
+
+        manager.refresh()
+
+        assert manager.keys.kids == ["key-1"]
+
+    def test_fetches_the_configured_url(self, jwks):
+        service = FakeAuthService(jwks)
+
+        make_manager(service).refresh()
+
+        assert [str(request.url) for request in service.requests] == [JWKS_URL]
+
+    def test_own_client_uses_the_timeout(self):
+        manager = JWKSManager(JWKS_URL, timeout=1.5)
+
+        assert manager._get_client().timeout == httpx.Timeout(1.5)
+        manager.stop()
+
+    def test_selects_keys_by_any_kid(self, jwks, other_key):
+        service = FakeAuthService({"keys": jwks["keys"] + [jwk_for(other_key.public_key(), "custom-key-id")]})
+        manager = make_manager(service)
+
+        manager.refresh()
+
+        assert len(manager.keys.candidates("custom-key-id")) == 1
+        assert manager.keys.candidates("custom-key-id") != manager.keys.candidates("key-1")
+
+    def test_keeps_current_keys_when_jwks_is_not_json(self, jwks):
+        service = FakeAuthService(jwks)
+        manager = make_manager(service)
+        manager.refresh()
+        before = manager.keys
+
+        manager._client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<html>")))
+        manager.refresh()
+
+        assert manager.keys is before
+        assert manager.errors == 1
+
+    def test_swaps_in_a_new_key_set(self, jwks, other_key):
+        service = FakeAuthService(jwks)
+        manager = make_manager(service)
+        manager.refresh()
+        before = manager.keys
+
+        service.jwks = {"keys": [jwk_for(other_key.public_key(), "key-2")]}
+        manager.refresh()
+
+        assert manager.keys is not before
+        assert manager.keys.kids == ["key-2"]
+
+    @pytest.mark.parametrize("cache_control, ttl", [
+        (None, 300.0),
+        ("max-age=600", 600.0),
+        ("max-age=5", 30.0),
+        ("max-age=86400", 3600.0),
+        ("no-store", 30.0),
+    ])
+    def test_next_fetch_honors_cache_control(self, jwks, cache_control, ttl):
+        headers = {"Cache-Control": cache_control} if cache_control else {}
+        manager = make_manager(FakeAuthService(jwks, headers))
+
+        assert manager.refresh() == ttl
+
+    def test_revalidates_with_etag(self, jwks):
+        service = FakeAuthService(jwks, {"ETag": '"v1"', "Cache-Control": "max-age=60"})
+        manager = make_manager(service)
+        manager.refresh()
+        before = manager.keys
+
+        assert manager.refresh() == 60.0
+
+        assert service.requests[1].headers["If-None-Match"] == '"v1"'
+        assert manager.keys is before
+        assert manager.not_modified == 1
+
+    def test_keeps_current_keys_when_fetch_fails(self, jwks):
+        service = FakeAuthService(jwks)
+        manager = make_manager(service)
+        manager.refresh()
+        before = manager.keys
+
+        service.up = False
+        manager.refresh()
+
+        assert manager.keys is before
+        assert manager.errors == 1
+
+    def test_keeps_current_keys_when_jwks_has_no_usable_key(self, jwks):
+        service = FakeAuthService(jwks)
+        manager = make_manager(service)
+        manager.refresh()
+        before = manager.keys
+
+        service.jwks = {"keys": []}
+        manager.refresh()
+
+        assert manager.keys is before
+
+    def test_backs_off_exponentially_up_to_the_cap(self, jwks):
+        service = FakeAuthService(jwks)
+        service.up = False
+        manager = make_manager(service, retry_initial=1.0, retry_max=8.0)
+
+        with patch("app.jwks.random.uniform", return_value=1.0):
+            delays = [manager.refresh() for _ in range(6)]
+            service.up = True
+            after_recovery = manager.refresh()
+
+        assert delays == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+        assert after_recovery == 300.0
+        assert manager.stats()["consecutive_failures"] == 0
+
+
+class TestBackgroundRefresh:
+    def test_start_does_not_wait_for_auth_service(self, jwks):
+        service = FakeAuthService(jwks)
+        service.up = False
+        manager = make_manager(service, retry_initial=0.01, retry_max=0.02)
+
+        started = time.perf_counter()
+        manager.start()
+        try:
+            assert time.perf_counter() - started < 0.1
+            assert len(manager.keys) == 0
+
+            service.up = True
+            assert wait_until(lambda: len(manager.keys) == 1)
+        finally:
+            manager.stop()
+
+        assert not manager.running
+
+    def test_request_refresh_wakes_the_thread(self, jwks, other_key):
+        service = FakeAuthService(jwks, {"Cache-Control": "max-age=3600"})
+        manager = make_manager(service, min_ttl=0.0)
+        manager.start()
+        try:
+            assert wait_until(lambda: manager.keys.kids == ["key-1"])
+            service.jwks = {"keys": [jwk_for(other_key.public_key(), "key-2")]}
+
+            manager.request_refresh()
+
+            assert wait_until(lambda: manager.keys.kids == ["key-2"])
+        finally:
+            manager.stop()
+
+    def test_request_refresh_is_rate_limited(self, jwks):
+        service = FakeAuthService(jwks, {"Cache-Control": "max-age=3600"})
+        manager = make_manager(service, min_ttl=60.0)
+        manager.start()
+        try:
+            assert wait_until(lambda: len(service.requests) == 1)
+            for _ in range(10):
+                manager.request_refresh()
+            time.sleep(0.1)
+        finally:
+            manager.stop()
+
+        assert len(service.requests) == 1
+
+
+class TestDecodeTokenUsesManager:
+    def test_unknown_kid_asks_for_a_refresh(self, rsa_keys, test_settings):
+        from jose import jwt
+        from app.auth import TokenRejected, decode_token
+
+        token = jwt.encode({"sub": "u"}, rsa_keys["private"], algorithm="RS256", headers={"kid": "rotated-in"})
+
+        with patch("app.auth.settings", test_settings), patch("app.auth.jwks_manager") as manager:
+            with pytest.raises(TokenRejected):
+                decode_token(token)
+
+        manager.request_refresh.assert_called_once()
+
+    def test_verifies_with_fetched_keys(self, rsa_keys, test_settings, jwks, create_token):
+        from app.auth import decode_token
+
+        manager = make_manager(FakeAuthService(jwks))
+        manager.refresh()
+        object.__setattr__(test_settings, "_public_key_pem", None)
+
+        with patch("app.auth.settings", test_settings), patch("app.auth.jwks_manager", manager):
+            assert decode_token(create_token())["sub"] == "test-user-1"
+
+    def test_no_keys_yet_rejects_without_blocking(self, test_settings, create_token):
+        from app.auth import TokenRejected, decode_token
+
+        object.__setattr__(test_settings, "_public_key_pem", None)
+        manager = make_manager(FakeAuthService({"keys": []}))
+
+        with patch("app.auth.settings", test_settings), patch("app.auth.jwks_manager", manager):
+            with pytest.raises(TokenRejected) as exc_info:
+                decode_token(create_token())
+
+        assert exc_info.value.reason == "no_keys"
+
+    def test_settings_do_not_fetch_on_import(self):
+        from app.settings import Settings
+
+        with patch("app.jwks.httpx.Client") as client:
+            Settings()
+
+        client.assert_not_called()
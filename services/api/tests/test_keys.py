@@ -1,7 +1,6 @@
 """Tests for key management module."""
 
 import pytest
-from unittest.mock import patch, MagicMock
 
 
 class TestLoadPublicKey:
@@ -79,189 +78,104 @@ class TestLoadPublicKey:
             pytest.fail("Signature verification failed")
 
 
-class TestFetchPublicKeyFromJWKS:
-    """Test suite for fetch_public_key_from_jwks function."""
-    
-    def test_fetches_key_from_jwks_endpoint(self, rsa_keys):
-        """Should fetch public key from JWKS endpoint."""
-        from app.keys import fetch_public_key_from_jwks
-        import base64
-        
-        # Convert real RSA key components to base64url for JWKS response
-        
-        # Extract public numbers from our test key
-        public_key = rsa_keys["public_key_obj"]
-        public_numbers = public_key.public_numbers()
-        
-        # Convert to base64url format for JWKS
-        def int_to_base64url(n: int) -> str:
-            b = n.to_bytes((n.bit_length() + 7) // 8, byteorder='big')
-            # Remove padding for base64url
-            b64 = base64.urlsafe_b64encode(b).decode('utf-8')
-            return b64.rstrip('=')
-        
-        jwks_response = {
-            "keys": [
-                {
-                    "kid": "sentinel-auth-key-1",
-                    "kty": "RSA",
-                    "n": int_to_base64url(public_numbers.n),
-                    "e": int_to_base64url(public_numbers.e),
-                }
-            ]
-        }
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.json.return_value = jwks_response
-            mock_client.get.return_value = mock_response
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            result = fetch_public_key_from_jwks("http://auth:8001/.well-known/jwks.json")
-            
-            # verify it tried to fetch the right URL
-            mock_client.get.assert_called_once_with("http://auth:8001/.well-known/jwks.json")
-            # Should return a PEM string
-            assert result is not None
-            assert "-----BEGIN PUBLIC KEY-----" in result
-    
-    def test_returns_none_on_network_error(self):
-        """Should return None if JWKS endpoint is unreachable."""
-        from app.keys import fetch_public_key_from_jwks
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client.get.side_effect = Exception("Network error")
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            result = fetch_public_key_from_jwks("http://invalid:9999/.well-known/jwks.json")
-            
-            assert result is None
-    
-    def test_returns_none_if_key_not_found(self):
-        """Should return None if kid is not found in JWKS."""
-        from app.keys import fetch_public_key_from_jwks
-        
-        jwks_response = {
-            "keys": [
-                {
-                    "kid": "different-key",
-                    "kty": "RSA",
-                    "n": "value",
-                    "e": "AQAB",
-                }
-            ]
-        }
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.json.return_value = jwks_response
-            mock_client.get.return_value = mock_response
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            result = fetch_public_key_from_jwks(
-                "http://auth:8001/.well-known/jwks.json",
-                kid="sentinel-auth-key-1",
-            )
-            
-            assert result is None
-    
-    def test_respects_custom_kid(self, rsa_keys):
-        """Should search for custom kid value."""
-        from app.keys import fetch_public_key_from_jwks
-        import base64
-        
-        # Extract public numbers from real test key
-        public_key = rsa_keys["public_key_obj"]
-        public_numbers = public_key.public_numbers()
-        
-        # Convert to base64url format
-        def int_to_base64url(n: int) -> str:
-            b = n.to_bytes((n.bit_length() + 7) // 8, byteorder='big')
-            b64 = base64.urlsafe_b64encode(b).decode('utf-8')
-            return b64.rstrip('=')
-        
-        jwks_response = {
-            "keys": [
-                {
-                    "kid": "custom-key-id",
-                    "kty": "RSA",
-                    "n": int_to_base64url(public_numbers.n),
-                    "e": int_to_base64url(public_numbers.e),
-                }
-            ]
-        }
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.json.return_value = jwks_response
-            mock_client.get.return_value = mock_response
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            result = fetch_public_key_from_jwks(
-                "http://auth:8001/.well-known/jwks.json",
-                kid="custom-key-id",
-            )
-            
-            # verify it found and parsed the custom kid
-            mock_client.get.assert_called_once()
-            assert result is not None
-            assert "-----BEGIN PUBLIC KEY-----" in result
-    
-    def test_handles_malformed_jwks_response(self):
-        """Should handle malformed JWKS response gracefully."""
-        from app.keys import fetch_public_key_from_jwks
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.json.side_effect = ValueError("Invalid JSON")
-            mock_client.get.return_value = mock_response
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            result = fetch_public_key_from_jwks("http://auth:8001/.well-known/jwks.json")
-            
-            assert result is None
-    
-    def test_uses_timeout(self):
-        """Should set timeout for HTTP requests."""
-        from app.keys import fetch_public_key_from_jwks
-        
-        with patch("app.keys.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.json.return_value = {"keys": []}
-            mock_client.get.return_value = mock_response
-            mock_client_class.return_value.__enter__.return_value = mock_client
-            
-            fetch_public_key_from_jwks("http://auth:8001/.well-known/jwks.json")
-            
-            # Verify timeout was set
-            mock_client_class.assert_called_once()
-            call_kwargs = mock_client_class.call_args[1]
-            assert call_kwargs.get("timeout", None) == 3.0
-
-
-class TestBase64UrlConversion:
-    """Test suite for base64url conversion in JWKS parsing."""
-    
-    def test_base64url_to_int_conversion(self):
-        """Should correctly convert base64url strings to integers."""
-        # This tests the internal function used by fetch_public_key_from_jwks
-        import base64
-        
-        # Test with a known value
-        test_int = 65537  # Common RSA exponent
-        b = test_int.to_bytes((test_int.bit_length() + 7) // 8, byteorder="big")
-        test_b64url = base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
-        
-        # Manually convert back
-        padding = (4 - len(test_b64url) % 4) % 4
-        padded = test_b64url + "=" * padding
-        decoded = base64.urlsafe_b64decode(padded)
-        result = int.from_bytes(decoded, byteorder="big")
-        
-        assert result == test_int
+def base64url_decode(value: str) -> bytes:
+    import base64
+
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def jwk_for(public_key, kid: str) -> dict:
+    """JWKS entry for an RSA public key."""
+    import base64
+
+    def int_to_base64url(n: int) -> str:
+        b = n.to_bytes((n.bit_length() + 7) // 8, byteorder="big")
+        return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+
+    numbers = public_key.public_numbers()
+    return {
+        "kty": "RSA",
+        "use": "sig",
+        "kid": kid,
+        "alg": "RS256",
+        "n": int_to_base64url(numbers.n),
+        "e": int_to_base64url(numbers.e),
+    }
+
+
+@pytest.fixture
+def other_rsa_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class TestKeySet:
+    """Test suite for the kid-indexed KeySet."""
+
+    def test_parses_every_signing_key(self, rsa_keys, other_rsa_key):
+        from app.keys import KeySet
+
+        keys = KeySet.from_jwks({"keys": [
+            jwk_for(rsa_keys["public_key_obj"], "key-1"),
+            jwk_for(other_rsa_key.public_key(), "key-2"),
+        ]})
+
+        assert keys.kids == ["key-1", "key-2"]
+        assert len(keys.candidates("key-2")) == 1
+
+    def test_skips_unusable_entries(self, rsa_keys):
+        from app.keys import KeySet
+
+        keys = KeySet.from_jwks({"keys": [
+            {"kid": "broken", "kty": "RSA", "n": "!!", "e": "AQAB"},
+            {"kid": "ec", "kty": "EC", "crv": "P-256", "x": "x", "y": "y"},
+            {**jwk_for(rsa_keys["public_key_obj"], "enc"), "use": "enc"},
+            jwk_for(rsa_keys["public_key_obj"], "good"),
+        ]})
+
+        assert keys.kids == ["good"]
+
+    def test_candidates(self, rsa_keys, other_rsa_key):
+        from app.keys import KeySet
+
+        keys = KeySet.from_jwks({"keys": [
+            jwk_for(rsa_keys["public_key_obj"], "key-1"),
+            jwk_for(other_rsa_key.public_key(), "key-2"),
+        ]})
+
+        assert keys.candidates("key-1") != keys.candidates("key-2")
+        assert len(keys.candidates(None)) == 2
+        assert keys.candidates("unknown") == ()
+
+    def test_from_pem_uses_thumbprint_kid(self, rsa_keys):
+        from app.keys import KeySet, jwk_thumbprint
+
+        keys = KeySet.from_pem(rsa_keys["public"])
+
+        assert keys.kids == [jwk_thumbprint(rsa_keys["public_key_obj"])]
+
+    def test_thumbprint_matches_rfc7638_example(self):
+        """The example key of RFC 7638 section 3.1."""
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from app.keys import jwk_thumbprint
+
+        n = (
+            "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECP"
+            "ebWKRXjBZCiFV4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY"
+            "368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0f"
+            "M4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw"
+        )
+        numbers = rsa.RSAPublicNumbers(65537, int.from_bytes(base64url_decode(n), "big"))
+
+        assert jwk_thumbprint(numbers.public_key()) == "NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs"
+
+    def test_parsed_key_verifies_tokens(self, rsa_keys):
+        from jose import jwt
+        from app.keys import KeySet
+
+        keys = KeySet.from_jwks({"keys": [jwk_for(rsa_keys["public_key_obj"], "key-1")]})
+        token = jwt.encode({"sub": "1"}, rsa_keys["private"], algorithm="RS256", headers={"kid": "key-1"})
+
+        assert jwt.decode(token, keys.candidates("key-1"), algorithms=["RS256"]) == {"sub": "1"}
+
@@ -0,0 +1,71 @@
+"""
+Tests for api-service's send_event.
+
+The pooled client, the shipper and the spool work as in auth-service and are
+tested there; these cover what api-service's send_event does differently.
+"""
+
+import json
+import logging
+
+import httpx
+import pytest
+
+from app import log_client
+from app.event_shipper import EventShipper
+
+
+@pytest.fixture
+def log_requests():
+    """Route the shared client through a mock transport and record requests."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    log_client.close_client()
+    log_client._client = httpx.Client(
+        base_url="http://log.test",
+        transport=httpx.MockTransport(handler),
+    )
+    yield requests
+    log_client.close_client()
+
+
+class TestSendEvent:
+    def test_posts_to_ingest(self, log_requests):
+        log_client.send_event(event="invalid_token", ip="1.2.3.4", path="/me", user_id=None)
+
+        assert len(log_requests) == 1
+        assert log_requests[0].url.path == "/ingest"
+        payload = json.loads(log_requests[0].content)
+        assert payload["service"] == "api"
+        assert payload["meta"] == {}
+
+    def test_queues_while_the_shipper_runs(self, monkeypatch):
+        batches = []
+        shipper = EventShipper(batches.append, max_queue=10, batch_size=10, flush_interval=5.0)
+        monkeypatch.setattr(log_client, "shipper", shipper)
+        shipper.start()
+        try:
+            log_client.send_event(event="invalid_token", ip="1.2.3.4", path="/me", user_id=None)
+            assert shipper.enqueued == 1
+        finally:
+            shipper.stop()
+
+        assert [event["service"] for batch in batches for event in batch] == ["api"]
+
+    def test_delivery_failure_is_logged(self, caplog):
+        def handler(request):
+            raise httpx.ConnectError("log-service down", request=request)
+
+        log_client.close_client()
+        log_client._client = httpx.Client(base_url="http://log.test", transport=httpx.MockTransport(handler))
+        try:
+            with caplog.at_level(logging.WARNING, logger=log_client.__name__):
+                log_client.send_event(event="invalid_token", ip="1.2.3.4", path="/me", user_id=None)
+        finally:
+            log_client.close_client()
+
+        assert "send_event failed" in caplog.text
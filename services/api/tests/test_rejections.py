@@ -0,0 +1,125 @@
+"""Tests for aggregated rejection reporting."""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.rejections import RejectionReporter
+
+
+@pytest.fixture
+def send():
+    return MagicMock()
+
+
+def make_reporter(send, **options) -> RejectionReporter:
+    options = {"interval": 60.0, "burst": 3, "max_keys": 100, **options}
+    return RejectionReporter(send, **options)
+
+
+def flood(reporter: RejectionReporter, count: int, ip: str = "203.0.113.7", reason: str = "malformed") -> None:
+    for _ in range(count):
+        reporter.report(event="invalid_token", ip=ip, path="/me", reason=reason)
+
+
+class TestRejectionReporter:
+    def test_reports_first_burst_individually(self, send):
+        reporter = make_reporter(send)
+
+        flood(reporter, 3)
+
+        assert send.call_count == 3
+        assert send.call_args.kwargs == {
+            "event": "invalid_token",
+            "ip": "203.0.113.7",
+            "path": "/me",
+            "user_id": None,
+            "meta": {"reason": "malformed"},
+        }
+
+    def test_aggregates_the_rest_into_one_summary(self, send):
+        reporter = make_reporter(send)
+        flood(reporter, 3)
+        flood(reporter, 500)
+        flood(reporter, 100, reason="expired")
+        assert send.call_count == 3
+
+        reporter.flush(everything=True)
+
+        assert send.call_count == 4
+        assert send.call_args.kwargs["meta"] == {"aggregated": 600, "reasons": {"malformed": 500, "expired": 100}}
+        assert reporter.stats() == {"open_windows": 0, "reported": 3, "aggregated": 600, "summaries": 1}
+
+    def test_windows_are_per_event_and_ip(self, send):
+        reporter = make_reporter(send)
+
+        flood(reporter, 5, ip="203.0.113.7")
+        flood(reporter, 5, ip="203.0.113.8")
+        reporter.report(event="missing_token", ip="203.0.113.7", path="/me", reason="missing")
+
+        assert send.call_count == 3 + 3 + 1
+
+    def test_new_window_after_interval(self, send):
+        reporter = make_reporter(send, interval=0.05)
+        flood(reporter, 5)
+
+        time.sleep(0.1)
+        flood(reporter, 1)
+
+        # The summary of the first window, then the first event of the next
+        assert send.call_count == 3 + 1 + 1
+        assert send.call_args_list[3].kwargs["meta"]["aggregated"] == 2
+        assert send.call_args.kwargs["meta"] == {"reason": "malformed"}
+
+    def test_flush_only_sends_ended_windows(self, send):
+        reporter = make_reporter(send, interval=0.05)
+        flood(reporter, 5)
+
+        reporter.flush()
+        assert send.call_count == 3
+        time.sleep(0.1)
+        reporter.flush()
+
+        assert send.call_count == 4
+
+    def test_no_summary_when_nothing_was_aggregated(self, send):
+        reporter = make_reporter(send)
+        flood(reporter, 2)
+
+        reporter.flush(everything=True)
+
+        assert send.call_count == 2
+
+    def test_key_limit_closes_all_windows(self, send):
+        reporter = make_reporter(send, burst=1, max_keys=2)
+        flood(reporter, 2, ip="203.0.113.1")
+        flood(reporter, 2, ip="203.0.113.2")
+
+        flood(reporter, 1, ip="203.0.113.3")
+
+        assert reporter.stats()["open_windows"] == 1
+        assert reporter.summaries == 2
+
+    def test_background_thread_sends_summaries(self, send):
+        reporter = make_reporter(send, interval=0.05)
+        reporter.start()
+        try:
+            flood(reporter, 5)
+            deadline = time.monotonic() + 2
+            while send.call_count < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            reporter.stop()
+
+        assert send.call_count == 4
+
+    def test_stop_sends_pending_summaries(self, send):
+        reporter = make_reporter(send)
+        reporter.start()
+        flood(reporter, 5)
+
+        reporter.stop()
+
+        assert send.call_count == 4
+        assert not reporter.running
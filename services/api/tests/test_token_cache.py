@@ -0,0 +1,96 @@
+"""Tests for the verified-token cache."""
+
+import time
+
+import pytest
+
+from app.keys import KeySet
+from app.token_cache import TokenCache
+
+
+def claims(ttl: float = 60, **extra) -> dict:
+    return {"sub": "user-1", "role": "user", "exp": time.time() + ttl, **extra}
+
+
+@pytest.fixture
+def keys():
+    return KeySet()
+
+
+class TestTokenCache:
+    def test_miss_then_hit(self, keys):
+        cache = TokenCache(10)
+
+        assert cache.get("token", keys) is None
+        cache.put("token", keys, claims())
+
+        assert cache.get("token", keys)["sub"] == "user-1"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_entry_expires_with_token(self, keys):
+        cache = TokenCache(10)
+        cache.put("token", keys, claims(ttl=0.05))
+
+        time.sleep(0.1)
+
+        assert cache.get("token", keys) is None
+        assert cache.expired == 1
+        assert len(cache) == 0
+
+    def test_does_not_cache_tokens_without_future_exp(self, keys):
+        cache = TokenCache(10)
+        cache.put("no-exp", keys, {"sub": "user-1", "role": "user"})
+        cache.put("expired", keys, claims(ttl=-1))
+
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, keys):
+        cache = TokenCache(2)
+        cache.put("a", keys, claims())
+        cache.put("b", keys, claims())
+        cache.get("a", keys)
+
+        cache.put("c", keys, claims())
+
+        assert cache.get("b", keys) is None
+        assert cache.get("a", keys) is not None
+        assert cache.get("c", keys) is not None
+        assert cache.evicted == 1
+
+    def test_new_key_set_invalidates_everything(self, keys):
+        cache = TokenCache(10)
+        cache.put("token", keys, claims())
+
+        assert cache.get("token", KeySet()) is None
+        assert cache.invalidations == 1
+        assert len(cache) == 0
+
+    def test_keys_by_hash_not_token(self, keys):
+        cache = TokenCache(10)
+        cache.put("secret-token", keys, claims())
+
+        assert "secret-token" not in cache._entries
+
+    def test_zero_entries_disables(self, keys):
+        cache = TokenCache(0)
+        cache.put("token", keys, claims())
+
+        assert cache.get("token", keys) is None
+        assert cache.stats()["misses"] == 0
+
+    def test_stats(self, keys):
+        cache = TokenCache(10)
+        cache.get("token", keys)
+        cache.put("token", keys, claims())
+        cache.get("token", keys)
+
+        assert cache.stats() == {
+            "size": 1,
+            "max_entries": 10,
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5,
+            "expired": 0,
+            "evicted": 0,
+            "invalidations": 0,
+        }
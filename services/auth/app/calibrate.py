@@ -0,0 +1,124 @@
+"""
+Pick Argon2id costs for this host.
+
+Verifying a password should take about --target-ms here: long enough to
+make guessing expensive, short enough for the login latency budget and for
+ARGON2_WORKERS to keep up. Memory is the cost that hurts attackers most
+(RFC 9106), so the search keeps as much of --max-memory-mib as the target
+allows and then adds passes while they still fit:
+
+- with one pass, halve memory until a verify fits in the target
+- then raise time_cost while a verify still fits
+
+Run it on the hardware (and with the CPU limits) the service runs with:
+
+  python -m app.calibrate                          # 250 ms, at most 64 MiB
+  python -m app.calibrate --target-ms 100 --max-memory-mib 32
+
+and put the printed ARGON2_* lines in the service's environment. Existing
+hashes keep verifying and are rehashed with the new costs at each user's
+next successful login.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+
+from argon2 import PasswordHasher
+
+MIN_MEMORY_KIB = 8 * 1024
+MAX_TIME_COST = 20
+
+
+@dataclass(frozen=True)
+class Argon2Params:
+    time_cost: int
+    memory_cost_kib: int
+    parallelism: int
+
+    def env(self) -> str:
+        return (
+            f"ARGON2_TIME_COST={self.time_cost}\n"
+            f"ARGON2_MEMORY_COST_KIB={self.memory_cost_kib}\n"
+            f"ARGON2_PARALLELISM={self.parallelism}"
+        )
+
+
+def measure_verify(params: Argon2Params, rounds: int = 5) -> float:
+    """Median seconds to verify a password hashed with these costs."""
+    hasher = PasswordHasher(
+        time_cost=params.time_cost,
+        memory_cost=params.memory_cost_kib,
+        parallelism=params.parallelism,
+    )
+    password_hash = hasher.hash("calibration-password")
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.verify(password_hash, "calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target: float,
+    max_memory_kib: int,
+    parallelism: int,
+    rounds: int = 5,
+    measure=measure_verify,
+    report=lambda params, seconds: None,
+) -> tuple[Argon2Params, float]:
+    """The costs chosen for a verify time of target seconds, and the time they measured."""
+    memory = max(max_memory_kib, MIN_MEMORY_KIB)
+    params = Argon2Params(1, memory, parallelism)
+    seconds = measure(params, rounds)
+    report(params, seconds)
+    while seconds > target and params.memory_cost_kib > MIN_MEMORY_KIB:
+        params = Argon2Params(1, max(params.memory_cost_kib // 2, MIN_MEMORY_KIB), parallelism)
+        seconds = measure(params, rounds)
+        report(params, seconds)
+
+    while params.time_cost < MAX_TIME_COST:
+        candidate = Argon2Params(params.time_cost + 1, params.memory_cost_kib, parallelism)
+        candidate_seconds = measure(candidate, rounds)
+        report(candidate, candidate_seconds)
+        if candidate_seconds > target:
+            break
+        params, seconds = candidate, candidate_seconds
+    return params, seconds
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.calibrate",
+        description="Pick Argon2id costs for a target verify time on this host.",
+    )
+    parser.add_argument("--target-ms", type=float, default=250.0, help="verify time to aim for")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="memory per hash, at most")
+    parser.add_argument("--parallelism", type=int, default=4, help="Argon2 lanes")
+    parser.add_argument("--rounds", type=int, default=5, help="verifies timed per candidate (median)")
+    args = parser.parse_args(argv)
+
+    def report(params: Argon2Params, seconds: float) -> None:
+        print(
+            f"  time_cost={params.time_cost:<3} memory={params.memory_cost_kib // 1024:>4} MiB "
+            f"parallelism={params.parallelism}: {seconds * 1000:7.1f} ms",
+            file=sys.stderr,
+        )
+
+    target = args.target_ms / 1000
+    params, seconds = calibrate(target, args.max_memory_mib * 1024, args.parallelism, args.rounds, report=report)
+
+    if seconds > target:
+        print(f"even the cheapest costs take {seconds * 1000:.0f} ms here, over the {args.target_ms:.0f} ms target",
+              file=sys.stderr)
+    print(f"# verify takes about {seconds * 1000:.0f} ms on this host "
+          f"({1 / seconds:.1f} per second per ARGON2_WORKERS thread)")
+    print(params.env())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
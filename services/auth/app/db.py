@@ -1,11 +1,73 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .settings import settings
 
-# sqlite needs this flag for multi-threaded access
-connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(settings.DATABASE_URL, future=True, echo=False, connect_args=connect_args)
+def _sqlite_in_memory(database: str | None) -> bool:
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+
+def sqlite_pragmas(database: str | None) -> list[str]:
+    """
+    PRAGMAs run on every new connection to a SQLite database.
+
+    WAL lets logins read while a signup writes, and with synchronous=NORMAL
+    a commit appends to the WAL without an fsync (the WAL is synced at
+    checkpoints): a power loss may drop the last commits, never corrupt the
+    file. busy_timeout makes a writer wait for the lock instead of failing
+    with "database is locked". An in-memory database keeps its own journal.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE_MIB * 1024 * 1024}",
+        # Negative: in KiB rather than pages
+        f"PRAGMA cache_size = -{settings.SQLITE_CACHE_SIZE_KIB}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not _sqlite_in_memory(database):
+        pragmas.insert(1, "PRAGMA journal_mode = WAL")
+    return pragmas
+
+
+def make_engine(url: str) -> Engine:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            future=True,
+            echo=False,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            # A restarted Postgres would otherwise fail the first request on
+            # every pooled connection
+            pool_pre_ping=True,
+        )
+
+    pragmas = sqlite_pragmas(url.database)
+    options = {}
+    if not _sqlite_in_memory(url.database):
+        # A file database: keep the connections (and their caches) open
+        # rather than reopening the file for every request past pool_size
+        options = {"pool_size": settings.DATABASE_POOL_SIZE, "max_overflow": settings.DATABASE_MAX_OVERFLOW}
+    # sqlite needs this flag for multi-threaded access
+    engine = create_engine(url, future=True, echo=False, connect_args={"check_same_thread": False}, **options)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+engine = make_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
@@ -19,3 +81,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(bind):
+    """The INSERT construct of bind's dialect, with ON CONFLICT (Postgres and SQLite)."""
+    return postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
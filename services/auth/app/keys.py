@@ -1,11 +1,25 @@
 """
 RSA key management for JWT signing/verification.
+
+Parsing a PKCS8 private key takes tens of milliseconds (the RSA key is
+checked for consistency on load), far more than signing a token with it.
+Signer holds keys parsed once and is reused for every token.
+
+The Signer's JWKS document is likewise serialized once, with an ETag, so
+serving it to every polling api replica is just writing out bytes.
 """
 
+import base64
+import hashlib
+import json
 import os
+from dataclasses import dataclass, field
+
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
+from jose import jwk, jwt
+from jose.backends.base import Key
 
 
 def generate_rsa_keypair() -> tuple[str, str]:
@@ -72,3 +86,97 @@ def get_or_generate_keys(private_key_env_var: str = "AUTH_PRIVATE_KEY") -> tuple
     else:
         # Generate new keys
         return generate_rsa_keypair()
+
+
+def _int_to_base64url(n: int, length: int) -> str:
+    return base64.urlsafe_b64encode(n.to_bytes(length, byteorder="big")).rstrip(b"=").decode("ascii")
+
+
+def jwk_thumbprint(public_key: rsa.RSAPublicKey) -> str:
+    """
+    RFC 7638 SHA-256 thumbprint of an RSA public key, used as its kid: the
+    same key gets the same kid in every process and after every restart.
+    """
+    numbers = public_key.public_numbers()
+    members = {
+        "e": _int_to_base64url(numbers.e, (numbers.e.bit_length() + 7) // 8),
+        "kty": "RSA",
+        "n": _int_to_base64url(numbers.n, (public_key.key_size + 7) // 8),
+    }
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    alg: str
+    # Parsed once; jose signs with it as is
+    jose_key: Key
+    public_key: rsa.RSAPublicKey
+    # Kept to persist the key
+    private_pem: str = field(repr=False)
+
+    @classmethod
+    def from_pem(cls, pem: str, kid: str | None = None, alg: str = "RS256") -> "SigningKey":
+        """Parse a private key; its kid is its thumbprint unless given."""
+        private_key = load_private_key(pem)
+        if kid is None:
+            kid = jwk_thumbprint(private_key.public_key())
+        return cls(
+            kid=kid,
+            alg=alg,
+            jose_key=jwk.construct(private_key, alg),
+            public_key=private_key.public_key(),
+            private_pem=pem,
+        )
+
+    @property
+    def public_pem(self) -> str:
+        return self.public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode("utf-8")
+
+    def public_jwk(self) -> dict:
+        numbers = self.public_key.public_numbers()
+        return {
+            "kty": "RSA",
+            "use": "sig",
+            "kid": self.kid,
+            "n": _int_to_base64url(numbers.n, (self.public_key.key_size + 7) // 8),
+            "e": _int_to_base64url(numbers.e, 3),
+            "alg": self.alg,
+        }
+
+
+class Signer:
+    """
+    Mints tokens with the first (active) key. The other keys do not sign
+    but are published in the JWKS: keys that no longer sign, so tokens they
+    signed keep verifying until they expire, and the next key, so verifiers
+    have it before the first token signed with it arrives.
+    """
+
+    def __init__(self, keys: list[SigningKey]):
+        if not keys:
+            raise ValueError("Signer needs at least one key")
+        kids = [key.kid for key in keys]
+        if len(set(kids)) != len(kids):
+            raise ValueError(f"Duplicate kid in {kids}")
+        self.keys = tuple(keys)
+        # Keys never change for a Signer (a new key set means a new Signer),
+        # so neither does its JWKS
+        self.jwks_json = json.dumps(self.jwks(), separators=(",", ":")).encode()
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_json).hexdigest()[:32] + '"'
+
+    @property
+    def active(self) -> SigningKey:
+        return self.keys[0]
+
+    def sign(self, claims: dict) -> str:
+        key = self.active
+        return jwt.encode(claims, key.jose_key, algorithm=key.alg, headers={"kid": key.kid})
+
+    def jwks(self) -> dict:
+        return {"keys": [key.public_jwk() for key in self.keys]}
@@ -0,0 +1,264 @@
+"""
+Signing keys over time: the active key, the next one and previous ones.
+
+KeyStore holds the active key (signs new tokens), optionally the next key
+and the previous keys, and exposes them as an immutable Signer that is
+replaced whenever the set changes. Every key in it is in the JWKS.
+
+With a rotation interval, a background thread (start/stop from lifespan)
+rotates on schedule:
+
+- publish_ahead seconds before the active key is due for rotation, a new
+  key is generated and published as the next key, so api replicas fetch it
+  (JWKS max-age) before any token is signed with it; when that moment was
+  missed (the process slept or was down), rotation waits publish_ahead
+  from when the key is actually published
+- at rotation the next key becomes active and the active one previous
+- a previous key is dropped retain_for seconds later, once every token it
+  signed has expired
+
+Restarts do not change kids: a kid is the key's thumbprint, not a counter.
+
+KeyStore.open keeps the keys in a file (under the /data volume): generated
+once, on the first start, and loaded on every start after that, so a
+restart neither spends CPU on a new RSA key nor invalidates the tokens
+signed before it. The file is written atomically, readable by its owner
+only, and rewritten whenever the keys rotate. Keys passed in as previous
+(from configuration) are not written to it.
+"""
+
+import json
+import logging
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from .keys import Signer, SigningKey, generate_rsa_keypair
+
+logger = logging.getLogger(__name__)
+
+
+def _generate_private_pem() -> str:
+    return generate_rsa_keypair()[0]
+
+
+class KeyStore:
+    def __init__(
+        self,
+        active: SigningKey,
+        previous: list[SigningKey] | None = None,
+        *,
+        rotation_interval: float = 0.0,
+        publish_ahead: float = 900.0,
+        retain_for: float = 960.0,
+        generate: Callable[[], str] = _generate_private_pem,
+        now: float | None = None,
+        path: Path | None = None,
+    ):
+        self.rotation_interval = rotation_interval
+        self.publish_ahead = min(publish_ahead, rotation_interval)
+        self.retain_for = retain_for
+        self._generate = generate
+        self.path = path
+
+        self._active = active
+        self._activated_at = time.time() if now is None else now
+        self._next: SigningKey | None = None
+        # (key, drop at); configured previous keys are kept (drop at None)
+        self._previous: list[tuple[SigningKey, float | None]] = [(key, None) for key in previous or ()]
+        self._lock = threading.Lock()
+        self._signer = self._build_signer()
+
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.rotations = 0
+        self.retired = 0
+
+    @property
+    def signer(self) -> Signer:
+        return self._signer
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active.kid,
+            "next": self._next.kid if self._next else None,
+            "previous": [key.kid for key, _ in self._previous],
+            "rotations": self.rotations,
+            "retired": self.retired,
+        }
+
+    def _build_signer(self) -> Signer:
+        keys = [self._active]
+        if self._next is not None:
+            keys.append(self._next)
+        keys += [key for key, _ in self._previous]
+        return Signer(keys)
+
+    def tick(self, now: float | None = None) -> float | None:
+        """
+        Make the changes that are due: publish the next key, rotate, drop
+        previous keys. Returns the seconds until the next change is due,
+        None if nothing is scheduled.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            changed = False
+            if self.rotation_interval > 0:
+                rotate_at = self._activated_at + self.rotation_interval
+                if self._next is None and now >= rotate_at - self.publish_ahead:
+                    # Tens of milliseconds of CPU, off the request path
+                    self._next = SigningKey.from_pem(self._generate(), alg=self._active.alg)
+                    logger.info("Published next signing key %s", self._next.kid)
+                    changed = True
+                    if now > rotate_at - self.publish_ahead:
+                        # Late (a long sleep, a restart): the new key still gets
+                        # its full publish_ahead in the JWKS before it signs
+                        rotate_at = now + self.publish_ahead
+                        self._activated_at = rotate_at - self.rotation_interval
+                if now >= rotate_at:
+                    self._previous.insert(0, (self._active, now + self.retain_for))
+                    self._active, self._next = self._next, None
+                    self._activated_at = now
+                    self.rotations += 1
+                    logger.info("Rotated signing key to %s", self._active.kid)
+                    changed = True
+
+            kept = [(key, drop_at) for key, drop_at in self._previous if drop_at is None or now < drop_at]
+            if len(kept) != len(self._previous):
+                self.retired += len(self._previous) - len(kept)
+                self._previous = kept
+                changed = True
+
+            if changed:
+                self._signer = self._build_signer()
+                if self.path is not None:
+                    self._save()
+            return self._next_change(now)
+
+    def _next_change(self, now: float) -> float | None:
+        due = [drop_at for _, drop_at in self._previous if drop_at is not None]
+        if self.rotation_interval > 0:
+            rotate_at = self._activated_at + self.rotation_interval
+            due.append(rotate_at if self._next is not None else rotate_at - self.publish_ahead)
+        return max(0.0, min(due) - now) if due else None
+
+    @classmethod
+    def open(
+        cls,
+        path: Path,
+        previous: list[SigningKey] | None = None,
+        *,
+        alg: str = "RS256",
+        generate: Callable[[], str] = _generate_private_pem,
+        **options,
+    ) -> "KeyStore":
+        """
+        Load the keys kept at path, or generate an active key and create the
+        file if there is none yet. Raises OSError when the file cannot be
+        read or created.
+        """
+        path = Path(path)
+        try:
+            return cls._load(path, previous, alg=alg, generate=generate, **options)
+        except FileNotFoundError:
+            pass
+
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        store = cls(SigningKey.from_pem(generate(), alg=alg), previous, generate=generate, path=path, **options)
+        try:
+            with store._lock:
+                store._save(replace=False)
+        except FileExistsError:
+            # Another process created it first: use its keys
+            return cls._load(path, previous, alg=alg, generate=generate, **options)
+        logger.info("Generated signing key %s, kept in %s", store._active.kid, path)
+        return store
+
+    @classmethod
+    def _load(cls, path: Path, previous: list[SigningKey] | None, *, alg: str, **options) -> "KeyStore":
+        with open(path, "rb") as f:
+            mode = os.fstat(f.fileno()).st_mode
+            state = json.loads(f.read())
+        if mode & (stat.S_IRWXG | stat.S_IRWXO):
+            logger.warning("Signing keys in %s are accessible to other users; chmod 600 it", path)
+
+        store = cls(
+            SigningKey.from_pem(state["active"]["pem"], alg=alg),
+            previous,
+            now=state["active"]["activated_at"],
+            path=path,
+            **options,
+        )
+        if state.get("next"):
+            store._next = SigningKey.from_pem(state["next"]["pem"], alg=alg)
+        store._previous[:0] = [
+            (SigningKey.from_pem(entry["pem"], alg=alg), entry["drop_at"]) for entry in state.get("previous", [])
+        ]
+        store._signer = store._build_signer()
+        return store
+
+    def _save(self, replace: bool = True) -> None:
+        """Write the keys to self.path (caller holds the lock); without replace, FileExistsError if it exists."""
+        state = {
+            "active": {"pem": self._active.private_pem, "activated_at": self._activated_at},
+            "next": {"pem": self._next.private_pem} if self._next else None,
+            "previous": [
+                {"pem": key.private_pem, "drop_at": drop_at} for key, drop_at in self._previous if drop_at is not None
+            ],
+        }
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        # Created 0600: private keys are never readable by anyone else, not even briefly
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(state, indent=2).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            if replace:
+                os.replace(tmp, self.path)
+            else:
+                # Atomic create-if-absent
+                os.link(tmp, self.path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        dir_fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="key-rotation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.running:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        delay = 0.0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                delay = self.tick()
+            except Exception:
+                logger.exception("Signing key rotation failed")
+                delay = 60.0
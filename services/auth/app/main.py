@@ -1,73 +1,102 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-import base64
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
 
-from .db import Base, engine, get_db
+from .db import Base, dialect_insert, engine, get_db
 from .models import User
 from .schemas import SignupRequest, LoginRequest, TokenResponse
-from .security import hash_password, verify_password, create_access_token
-from .log_client import send_event
+from .password_pool import PoolFull
+from .security import hash_password, verify_password, rehash_if_needed, create_access_token, password_pool
+from .log_client import send_event, get_client, close_client, open_spool, shipper
 from .settings import settings
-
-app = FastAPI(title="auth-service")
+from .throttle import build_login_throttle
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the signing keys and serialize the JWKS before the first request
+    keystore = settings.keystore
+    if settings.AUTH_KEY_ROTATION_SECONDS > 0:
+        keystore.start()
+    password_pool.start()
+    # One pooled keep-alive client to log-service for the app's lifetime
+    get_client()
+    if settings.EVENT_SHIPPER_ENABLED:
+        shipper.spool = open_spool()
+        shipper.start()
+    yield
+    keystore.stop()
+    password_pool.stop()
+    shipper.stop()
+    if shipper.spool is not None:
+        shipper.spool.close()
+    close_client()
+
+
+app = FastAPI(title="auth-service", lifespan=lifespan)
 
 # v1: create tables on startup (simple). Later: Alembic migrations.
 Base.metadata.create_all(bind=engine)
 
+login_throttle = build_login_throttle(engine)
+
+
+@app.exception_handler(PoolFull)
+async def password_pool_full(request: Request, exc: PoolFull):
+    # Shed signup/login load at once rather than queue it behind Argon2
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service busy, retry later"},
+        headers={"Retry-After": "1"},
+    )
 
+
+# async: answered on the event loop, never waits for a request thread
 @app.get("/healthz")
-def healthz():
+async def healthz():
     return {"status": "ok"}
 
 
+# Not proxied by nginx: for operators and monitoring inside the network
+@app.get("/stats")
+async def stats():
+    return {"shipper": shipper.stats(), "login_throttle": login_throttle.stats()}
+
+
 @app.get("/.well-known/jwks.json")
-def get_jwks():
-    """Expose public key in JWKS format for JWT verification."""
-    public_key_pem = settings.public_key_pem
-    
-    # Load the public key
-    public_key = serialization.load_pem_public_key(
-        public_key_pem.encode("utf-8"),
-        backend=default_backend(),
-    )
-    
-    # Extract RSA numbers
-    public_numbers = public_key.public_numbers()
-    
-    # Convert to base64url without padding (JWKS format)
-    def int_to_base64url(n: int, length: int) -> str:
-        """Convert integer to base64url string of specified byte length."""
-        b = n.to_bytes(length, byteorder='big')
-        return base64.urlsafe_b64encode(b).rstrip(b'=').decode('ascii')
-    
-    # Calculate byte lengths for RSA key components
-    key_bit_length = public_key.key_size
-    key_byte_length = (key_bit_length + 7) // 8
-    
-    jwks = {
-        "keys": [
-            {
-                "kty": "RSA",
-                "use": "sig",
-                "kid": "sentinel-auth-key-1",
-                "n": int_to_base64url(public_numbers.n, key_byte_length),
-                "e": int_to_base64url(public_numbers.e, 3),
-                "alg": "RS256",
-            }
-        ]
+async def get_jwks(request: Request):
+    """Expose the signer's public keys in JWKS format for JWT verification."""
+    signer = settings.signer
+    headers = {
+        "ETag": signer.jwks_etag,
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
     }
-    return jwks
+    if etag_matches(request.headers.get("if-none-match"), signer.jwks_etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(signer.jwks_json, media_type="application/json", headers=headers)
 
 
 @app.post("/signup", status_code=status.HTTP_201_CREATED)
 def signup(request: Request, payload: SignupRequest, db: Session = Depends(get_db)):
     email = payload.email.lower().strip()
+    password_hash = hash_password(payload.password)
+
+    # One statement: the unique index on users.email decides, so there is no
+    # check-then-insert race and no read back
+    insert = dialect_insert(db.get_bind())
+    user = db.execute(
+        insert(User)
+        .values(email=email, password_hash=password_hash, role="user")
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.email, User.role)
+    ).first()
+    db.commit()
 
-    existing = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-    if existing:
+    if user is None:
         send_event(
             event="signup_conflict",
             ip=client_ip(request),
@@ -77,15 +106,6 @@ def signup(request: Request, payload: SignupRequest, db: Session = Depends(get_d
         )
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    user = User(
-        email=email,
-        password_hash=hash_password(payload.password),
-        role="user",
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
     send_event(
         event="signup_success",
         ip=client_ip(request),
@@ -101,6 +121,17 @@ def signup(request: Request, payload: SignupRequest, db: Session = Depends(get_d
 def login(request: Request, payload: LoginRequest, db: Session = Depends(get_db)):
     email = payload.email.lower().strip()
 
+    # Before the lookup and Argon2: a throttled attempt costs next to nothing
+    throttled = login_throttle.check(client_ip(request), email)
+    if throttled:
+        # Which limit it was (ip or email) is counted in login_throttle.stats(), see /stats
+        _, retry_after = throttled
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
     user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
 
     # generic error to avoid user enumeration
@@ -114,6 +145,12 @@ def login(request: Request, payload: LoginRequest, db: Session = Depends(get_db)
         )
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Upgrade a hash made with older Argon2 parameters while we have the password
+    new_hash = rehash_if_needed(payload.password, user.password_hash)
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+
     token = create_access_token(user_id=user.id, role=user.role)
 
     send_event(
@@ -135,3 +172,12 @@ def client_ip(request: Request) -> str:
 def original_path(request: Request) -> str:
     # nginx sets X-Original-URI with full path; fallback to url.path
     return request.headers.get("x-original-uri") or str(request.url.path)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
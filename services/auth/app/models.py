@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, func
+from sqlalchemy import String, DateTime, Float, func
 from sqlalchemy.orm import Mapped, mapped_column
 from .db import Base
 
@@ -12,3 +12,14 @@ class User(Base):
     role: Mapped[str] = mapped_column(String(32), default="user", nullable=False)
 
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ThrottleBucket(Base):
+    """Login throttle state shared by auth replicas (LOGIN_THROTTLE_BACKEND=sql)."""
+
+    __tablename__ = "login_throttle"
+
+    # Digest of scope and ip/email, never the email itself
+    key: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # GCRA theoretical arrival time, epoch seconds
+    tat: Mapped[float] = mapped_column(Float, nullable=False, index=True)
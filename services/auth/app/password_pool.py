@@ -0,0 +1,90 @@
+"""
+Bounded pool for Argon2 work.
+
+Hashing or verifying a password is deliberately expensive (tens to hundreds
+of milliseconds of CPU). Run on Starlette's request threadpool, a wave of
+login attempts would occupy all of its threads and every CPU, and /healthz
+and the JWKS would stall behind it.
+
+PasswordPool runs that work on its own few threads (workers, by default one
+CPU short of all of them; argon2 releases the GIL while it hashes) and
+admits at most max_queue more calls waiting for a thread (by default four per
+worker, a wait of a few hashes). A call beyond
+that raises PoolFull at once instead of queueing, which the app answers
+with 503, so only a bounded number of request threads are ever waiting on
+Argon2 and the rest of the service keeps its threads and a CPU.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class PoolFull(Exception):
+    """Every worker is busy and the queue is full."""
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class PasswordPool:
+    def __init__(self, workers: int | None = None, max_queue: int | None = None):
+        self.workers = workers or default_workers()
+        self.max_queue = 4 * self.workers if max_queue is None else max_queue
+        # Running plus queued calls
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        # rejected: raised PoolFull without running
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="argon2")
+            return self._executor
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(*args) on a pool thread and wait for its result. Raises PoolFull when saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolFull("Password hashing is saturated")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def start(self) -> None:
+        self._get_executor()
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
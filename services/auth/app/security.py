@@ -1,25 +1,50 @@
 from datetime import datetime, timedelta, timezone
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
-from jose import jwt
+from .password_pool import PasswordPool, PoolFull
 from .settings import settings
-from .keys import load_private_key
 
-# Argon2id by default in argon2-cffi’s PasswordHasher
-_hasher = PasswordHasher()
+# Argon2id by default in argon2-cffi’s PasswordHasher; costs sized for this
+# hardware with `python -m app.calibrate`
+_hasher = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
 
-
-def hash_password(password: str) -> str:
-    return _hasher.hash(password)
+# Argon2 runs here, not on the request threads; raises PoolFull when saturated
+password_pool = PasswordPool(settings.ARGON2_WORKERS, settings.ARGON2_QUEUE_MAX)
 
 
-def verify_password(password: str, password_hash: str) -> bool:
+def _verify(password: str, password_hash: str) -> bool:
     try:
         return _hasher.verify(password_hash, password)
     except VerifyMismatchError:
         return False
 
 
+def hash_password(password: str) -> str:
+    return password_pool.run(_hasher.hash, password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return password_pool.run(_verify, password, password_hash)
+
+
+def rehash_if_needed(password: str, password_hash: str) -> str | None:
+    """
+    After a successful verify: a new hash of the password with the current
+    parameters if password_hash was made with others, else None. Also None
+    when the pool is saturated; the hash is upgraded on a later login.
+    """
+    if not _hasher.check_needs_rehash(password_hash):
+        return None
+    try:
+        return hash_password(password)
+    except PoolFull:
+        return None
+
+
 def create_access_token(*, user_id: int, role: str) -> str:
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=settings.ACCESS_TOKEN_TTL_MIN)
@@ -30,7 +55,4 @@ def create_access_token(*, user_id: int, role: str) -> str:
         "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
     }
-    
-    # Sign with RS256 using private key
-    private_key = load_private_key(settings.private_key_pem)
-    return jwt.encode(payload, private_key, algorithm=settings.JWT_ALG)
+    return settings.signer.sign(payload)
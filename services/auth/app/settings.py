@@ -1,5 +1,13 @@
+import logging
+import os
+from pathlib import Path
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from .keys import get_or_generate_keys
+from .keys import Signer, SigningKey, get_or_generate_keys
+from .keystore import KeyStore
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
@@ -9,39 +17,138 @@ class Settings(BaseSettings):
     JWT_ALG: str = "RS256"
     ACCESS_TOKEN_TTL_MIN: int = 15
 
+    # How long api replicas may use the JWKS before asking again (they
+    # revalidate with If-None-Match, answered with a bodiless 304)
+    JWKS_MAX_AGE_SECONDS: int = 300
+
+    # Without AUTH_PRIVATE_KEY, the signing keys are generated once and kept
+    # here (owner-only permissions), so restarts reuse them. Set empty to
+    # generate a key on every start instead (restarts then log everyone out).
+    AUTH_KEY_DIR: str | None = "/data/keys"
+
+    # A key that no longer signs but whose tokens must still verify, e.g.
+    # the old AUTH_PRIVATE_KEY after switching to a new one
+    AUTH_PREVIOUS_PRIVATE_KEY: str | None = None
+    # Rotate the signing key this often (0: never). The next key is published
+    # AUTH_KEY_PUBLISH_AHEAD_SECONDS before it signs, which must exceed
+    # JWKS_MAX_AGE_SECONDS so every api replica has it by then; the old key
+    # is published until the tokens it signed expire.
+    AUTH_KEY_ROTATION_SECONDS: int = 0
+    AUTH_KEY_PUBLISH_AHEAD_SECONDS: int = 900
+
     DATABASE_URL: str = "sqlite:////data/auth.db"
+    # Connections kept open, and how many more may be opened (and closed
+    # again) under load. 20 + 20 covers the 40 request threads, so none
+    # waits for a connection; SQLAlchemy's 5 + 10 reopened one per request.
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 20
+    # SQLite only, applied to every connection (see db.sqlite_pragmas). The
+    # database itself is always switched to WAL. NORMAL skips the fsync per
+    # commit: a power loss may lose the last commits, not the database.
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE_MIB: int = 256
+    # Page cache per connection, on top of the memory-mapped file
+    SQLITE_CACHE_SIZE_KIB: int = 8192
+
+    # Argon2 hashing/verification pool: worker threads (unset: one per CPU
+    # but one) and how many more calls may wait for one (unset: four per
+    # worker) before signup/login answer 503. Keep the sum well below the
+    # 40 request threads.
+    ARGON2_WORKERS: int | None = None
+    ARGON2_QUEUE_MAX: int | None = None
+    # Login throttling before any lookup or Argon2 (burst 0 disables one):
+    # `burst` attempts at once, then `per_minute`, per client IP and per
+    # email. memory: per process, at most LOGIN_THROTTLE_MAX_KEYS buckets
+    # (about 110 bytes each); sql: shared by every replica through the
+    # database.
+    LOGIN_THROTTLE_BACKEND: Literal["memory", "sql"] = "memory"
+    LOGIN_THROTTLE_IP_BURST: int = 20
+    LOGIN_THROTTLE_IP_PER_MINUTE: float = 10
+    LOGIN_THROTTLE_EMAIL_BURST: int = 10
+    LOGIN_THROTTLE_EMAIL_PER_MINUTE: float = 5
+    LOGIN_THROTTLE_MAX_KEYS: int = 200_000
+
+    # Argon2id costs (argon2-cffi's defaults). Pick them for the hardware
+    # with `python -m app.calibrate`; hashes made with other costs are
+    # upgraded on the user's next successful login.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 65536
+    ARGON2_PARALLELISM: int = 4
 
     LOG_SERVICE_URL: str = "http://log:8003"
+    # Pooled keep-alive client used by send_event
+    LOG_SERVICE_TIMEOUT_SECONDS: float = 1.0
+    LOG_CLIENT_MAX_CONNECTIONS: int = 20
+    LOG_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LOG_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    # Background event shipping: send_event queues, a worker posts batches
+    EVENT_SHIPPER_ENABLED: bool = True
+    EVENT_QUEUE_MAX: int = 10_000
+    EVENT_BATCH_SIZE: int = 200
+    EVENT_FLUSH_INTERVAL_SECONDS: float = 0.5
+    EVENT_QUEUE_OVERFLOW: Literal["drop_oldest", "drop_newest", "block"] = "drop_oldest"
+    EVENT_QUEUE_BLOCK_TIMEOUT_SECONDS: float = 0.1
 
-    # RSA keys (loaded/generated at startup)
+    # Spool for events log-service did not accept; replayed once it is back.
+    # Set EVENT_SPOOL_DIR empty to disable (failed events are then lost).
+    EVENT_SPOOL_DIR: str | None = "/data/event-spool"
+    EVENT_SPOOL_SEGMENT_BYTES: int = 8 * 1024 * 1024
+    EVENT_SPOOL_MAX_BYTES: int = 512 * 1024 * 1024
+    EVENT_SPOOL_FSYNC_INTERVAL_SECONDS: float = 1.0
+    EVENT_SPOOL_REPLAY_CHUNK_BYTES: int = 1024 * 1024
+    EVENT_SPOOL_REPLAY_TIMEOUT_SECONDS: float = 30.0
+    EVENT_SPOOL_RETRY_SECONDS: float = 2.0
+
+    # AUTH_PRIVATE_KEY, or a generated key when there is no key file
     _private_key_pem: str | None = None
     _public_key_pem: str | None = None
-
-    def __init__(self, **data):
-        super().__init__(**data)
-        # Load or generate keys on first instantiation
-        if not self._private_key_pem:
-            private_pem, public_pem = get_or_generate_keys()
-            self._private_key_pem = private_pem
-            self._public_key_pem = public_pem
+    # Opened on first use (lifespan), not at import: loading or generating
+    # keys costs CPU that importing the settings should not
+    _keystore: KeyStore | None = None
 
     @property
     def private_key_pem(self) -> str:
-        """Get the private key PEM."""
-        if not self._private_key_pem:
-            private_pem, public_pem = get_or_generate_keys()
-            self._private_key_pem = private_pem
-            self._public_key_pem = public_pem
-        return self._private_key_pem
+        """PEM of the active signing key."""
+        return self.keystore.signer.active.private_pem
 
     @property
     def public_key_pem(self) -> str:
-        """Get the public key PEM."""
-        if not self._public_key_pem:
-            private_pem, public_pem = get_or_generate_keys()
-            self._private_key_pem = private_pem
-            self._public_key_pem = public_pem
-        return self._public_key_pem
+        """PEM of the active signing key's public key."""
+        return self.keystore.signer.active.public_pem
+
+    @property
+    def keystore(self) -> KeyStore:
+        if self._keystore is None:
+            self._keystore = self._open_keystore()
+        return self._keystore
+
+    def _open_keystore(self) -> KeyStore:
+        previous = []
+        if self.AUTH_PREVIOUS_PRIVATE_KEY:
+            previous.append(SigningKey.from_pem(self.AUTH_PREVIOUS_PRIVATE_KEY, alg=self.JWT_ALG))
+        options = dict(
+            rotation_interval=self.AUTH_KEY_ROTATION_SECONDS,
+            publish_ahead=self.AUTH_KEY_PUBLISH_AHEAD_SECONDS,
+            # Every token the old key signed has expired by then (plus clock skew)
+            retain_for=self.ACCESS_TOKEN_TTL_MIN * 60 + 60,
+        )
+
+        if not self._private_key_pem and not os.environ.get("AUTH_PRIVATE_KEY") and self.AUTH_KEY_DIR:
+            path = Path(self.AUTH_KEY_DIR) / "keystore.json"
+            try:
+                return KeyStore.open(path, previous, alg=self.JWT_ALG, **options)
+            except OSError as e:
+                logger.warning("Signing keys cannot be kept in %s, using a key that lasts until restart: %r", path, e)
+
+        if not self._private_key_pem:
+            self._private_key_pem, self._public_key_pem = get_or_generate_keys()
+        return KeyStore(SigningKey.from_pem(self._private_key_pem, alg=self.JWT_ALG), previous, **options)
+
+    @property
+    def signer(self) -> Signer:
+        return self.keystore.signer
 
 
 settings = Settings()
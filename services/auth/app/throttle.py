@@ -0,0 +1,196 @@
+"""
+Login throttling per client IP and per account.
+
+Checked before the user lookup and the Argon2 verify, so a throttled
+attempt costs a dict lookup (or one SQL statement), not a password hash.
+nginx's limit_req is the coarse outer limit; this one also follows an
+account across IPs, which spraying one victim from many addresses needs.
+
+Each key is a GCRA bucket (the token bucket expressed as one number, its
+"theoretical arrival time"): `burst` attempts at once, then one every
+60/per_minute seconds. Only allowed attempts advance it, so an attacker who
+keeps hammering is let through at the sustained rate and no faster, and a
+user is never locked out for longer than one interval after they stop.
+
+Keys are digests of scope and ip/email, so neither memory nor the table
+holds the emails themselves. Two backends (LOGIN_THROTTLE_BACKEND):
+
+- memory: a dict of 8-byte key -> float per process, kept in last-use
+  order and cut back to max_keys by dropping the least recently used. A
+  bucket untouched for burst intervals is full again, so dropping it loses
+  nothing unless max_keys keys were all active within that time.
+- sql: the login_throttle table in auth's database, updated with a single
+  upsert per check, so every replica sees the same buckets. Expired rows
+  are deleted once a minute.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+
+from .models import ThrottleBucket
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Rate:
+    burst: int
+    per_minute: float
+
+    @property
+    def enabled(self) -> bool:
+        return self.burst > 0 and self.per_minute > 0
+
+    @property
+    def interval(self) -> float:
+        return 60.0 / self.per_minute
+
+    @property
+    def tolerance(self) -> float:
+        # How far ahead of now the bucket may run and still admit an attempt
+        return (self.burst - 1) * self.interval
+
+
+def throttle_key(scope: str, value: str) -> bytes:
+    return hashlib.blake2b(f"{scope}\0{value}".encode(), digest_size=16).digest()
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # Insertion order is last-use order: every hit re-inserts its key
+        self._tat: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        # Keys dropped to stay under max_keys
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def hit(self, key: bytes, rate: Rate, now: float) -> float:
+        """Count an attempt: 0.0 if allowed, else the seconds until one would be."""
+        k = int.from_bytes(key[:8], "big")
+        with self._lock:
+            tat = self._tat.pop(k, now)
+            if tat - now > rate.tolerance:
+                self._tat[k] = tat
+                return tat - now - rate.tolerance
+            self._tat[k] = max(tat, now) + rate.interval
+            if len(self._tat) > self.max_keys:
+                # In batches: one pass over the oldest keys per max_keys/10 new ones
+                oldest = list(islice(self._tat, max(1, self.max_keys // 10)))
+                for old in oldest:
+                    del self._tat[old]
+                self.evicted += len(oldest)
+            return 0.0
+
+
+class SQLBuckets:
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, engine: Engine):
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            self._insert, self._greatest = postgresql.insert, func.greatest
+        elif dialect == "sqlite":
+            self._insert, self._greatest = sqlite.insert, func.max
+        else:
+            raise ValueError(f"LOGIN_THROTTLE_BACKEND=sql needs Postgres or SQLite, not {dialect}")
+        self.engine = engine
+        self._last_prune = 0.0
+
+    def hit(self, key: bytes, rate: Rate, now: float) -> float:
+        table = ThrottleBucket.__table__
+        hex_key = key.hex()
+        # Advance the bucket only if it admits the attempt; RETURNING yields
+        # no row when the WHERE turned the update down
+        stmt = (
+            self._insert(table)
+            .values(key=hex_key, tat=now + rate.interval)
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"tat": self._greatest(table.c.tat, now) + rate.interval},
+                where=table.c.tat - now <= rate.tolerance,
+            )
+            .returning(table.c.tat)
+        )
+        with self.engine.begin() as conn:
+            if conn.execute(stmt).first() is not None:
+                wait = 0.0
+            else:
+                tat = conn.execute(select(table.c.tat).where(table.c.key == hex_key)).scalar_one()
+                wait = max(tat - now - rate.tolerance, 0.001)
+            if now - self._last_prune >= self.PRUNE_INTERVAL:
+                self._last_prune = now
+                conn.execute(delete(table).where(table.c.tat < now))
+        return wait
+
+
+class LoginThrottle:
+    def __init__(self, buckets: MemoryBuckets | SQLBuckets, ip_rate: Rate, email_rate: Rate):
+        self.buckets = buckets
+        self.ip_rate = ip_rate
+        self.email_rate = email_rate
+
+        # Each check lands in exactly one: errors failed open
+        self.allowed = 0
+        self.throttled_ip = 0
+        self.throttled_email = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "throttled_ip": self.throttled_ip,
+            "throttled_email": self.throttled_email,
+            "errors": self.errors,
+        }
+
+    def check(self, ip: str, email: str, now: float | None = None) -> tuple[str, float] | None:
+        """
+        Count a login attempt. None if it may go ahead, else ("ip" or
+        "email", seconds to wait). An attempt throttled by IP is not counted
+        against the account, so a flood from one address does not lock its
+        victim out everywhere else.
+        """
+        now = time.time() if now is None else now
+        for scope, value, rate in (("ip", ip, self.ip_rate), ("email", email, self.email_rate)):
+            if not rate.enabled:
+                continue
+            try:
+                wait = self.buckets.hit(throttle_key(scope, value), rate, now)
+            except Exception:
+                # Fail open: Argon2 is still bounded by the password pool
+                self.errors += 1
+                logger.exception("Login throttle check failed")
+                return None
+            if wait > 0:
+                if scope == "ip":
+                    self.throttled_ip += 1
+                else:
+                    self.throttled_email += 1
+                return scope, wait
+        self.allowed += 1
+        return None
+
+
+def build_login_throttle(engine: Engine) -> LoginThrottle:
+    if settings.LOGIN_THROTTLE_BACKEND == "sql":
+        buckets = SQLBuckets(engine)
+    else:
+        buckets = MemoryBuckets(settings.LOGIN_THROTTLE_MAX_KEYS)
+    return LoginThrottle(
+        buckets,
+        ip_rate=Rate(settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE),
+        email_rate=Rate(settings.LOGIN_THROTTLE_EMAIL_BURST, settings.LOGIN_THROTTLE_EMAIL_PER_MINUTE),
+    )
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure auth-service cold start: from launching the process to the first
+JWKS response, with a signing key generated on every start against keys
+kept in a key file and loaded.
+
+Usage:
+  poetry run python benchmarks/cold_start.py
+  poetry run python benchmarks/cold_start.py --runs 20
+
+Notes:
+- Each start is a fresh interpreter that imports app.main, runs the
+  lifespan startup and serves GET /.well-known/jwks.json in-process with
+  TestClient, as the container does before its first healthcheck passes.
+- "generated" runs with AUTH_KEY_DIR empty, which is how every start went
+  before the key file: a new 2048-bit RSA key each time (and a new kid, so
+  every token issued before the restart stopped verifying). "key file"
+  runs share one AUTH_KEY_DIR; its first run creates the file and is
+  reported separately.
+- The database is a throwaway SQLite file and log shipping is off, so the
+  times are import, startup and key handling only.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    kid = client.get("/.well-known/jwks.json").json()["keys"][0]["kid"]
+    ready = time.perf_counter()
+print(json.dumps({"import": imported - t0, "startup": ready - imported, "kid": kid}))
+"""
+
+
+def start_once(env: dict) -> dict:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def summarize(label: str, runs: list[dict]) -> None:
+    def ms(key):
+        return statistics.median(run[key] for run in runs) * 1000
+
+    kids = {run["kid"] for run in runs}
+    print(
+        f"{label:<22} total {ms('total'):7.1f} ms   import {ms('import'):6.1f} ms   "
+        f"startup+first JWKS {ms('startup'):6.1f} ms   distinct kids {len(kids)}/{len(runs)}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="starts per variant (median reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.pop("AUTH_PRIVATE_KEY", None)
+        env.update(
+            DATABASE_URL=f"sqlite:///{tmp}/auth.db",
+            EVENT_SHIPPER_ENABLED="false",
+            EVENT_SPOOL_DIR="",
+        )
+
+        generated = [start_once({**env, "AUTH_KEY_DIR": ""}) for _ in range(args.runs)]
+
+        key_dir = {**env, "AUTH_KEY_DIR": f"{tmp}/keys"}
+        first = start_once(key_dir)
+        loaded = [start_once(key_dir) for _ in range(args.runs)]
+
+    print(f"cold start, median of {args.runs} runs")
+    summarize("generated every start", generated)
+    summarize("key file, first start", [first])
+    summarize("key file, loaded", loaded)
+    same = all(run["kid"] == first["kid"] for run in loaded)
+    print(f"key file kid unchanged across restarts: {same}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Load test: /healthz and JWKS latency while /login is flooded with wrong
+passwords for a real account (every attempt costs an Argon2 verify).
+
+Usage:
+  poetry run python benchmarks/login_flood.py
+  poetry run python benchmarks/login_flood.py --clients 64 --seconds 15
+
+Notes:
+- Runs the real service under uvicorn in a subprocess (one worker, as in
+  the container), with a throwaway SQLite database and log-service
+  unreachable (events are dropped).
+- Healthz and JWKS are sampled one request at a time, every --interval
+  seconds, first idle and then during the flood. A probe that takes longer
+  than --probe-timeout counts as failed, as a container healthcheck would.
+- Login responses are counted by status: 401 is a verified wrong password,
+  503 an attempt shed by the Argon2 pool without hashing.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+EMAIL = "victim@example.com"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, tmp: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite:///{tmp}/auth.db",
+        AUTH_KEY_DIR=f"{tmp}/keys",
+        EVENT_SPOOL_DIR="",
+        LOG_SERVICE_URL="http://127.0.0.1:9",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("auth-service did not start")
+
+
+def probe(client: httpx.Client, path: str, seconds: float, interval: float, timeout: float) -> tuple[list[float], int]:
+    latencies, failures = [], 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        started = time.perf_counter()
+        try:
+            client.get(path, timeout=timeout).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            failures += 1
+        time.sleep(interval)
+    return latencies, failures
+
+
+def flood(base: str, stop: threading.Event, statuses: Counter, lock: threading.Lock) -> None:
+    with httpx.Client(base_url=base, timeout=30) as client:
+        while not stop.is_set():
+            try:
+                status = client.post("/login", json={"email": EMAIL, "password": "wrong-password-123"}).status_code
+            except httpx.HTTPError:
+                status = "error"
+            with lock:
+                statuses[status] += 1
+
+
+def describe(label: str, latencies: list[float], failures: int) -> str:
+    if not latencies:
+        return f"{label:<26} no successful probes, {failures} failed"
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (
+        f"{label:<26} p50 {statistics.median(latencies) * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms   "
+        f"max {latencies[-1] * 1000:8.1f} ms   failed {failures}/{len(latencies) + failures}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=64, help="concurrent login flooders")
+    parser.add_argument("--seconds", type=float, default=10.0, help="flood duration")
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between probes")
+    parser.add_argument("--probe-timeout", type=float, default=3.0, help="probe deadline (healthcheck timeout)")
+    args = parser.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(port, tmp)
+        try:
+            with httpx.Client(base_url=base) as client:
+                client.post("/signup", json={"email": EMAIL, "password": "correct-password-123"}).raise_for_status()
+
+                idle = {path: probe(client, path, 2.0, args.interval, args.probe_timeout)
+                        for path in ("/healthz", "/.well-known/jwks.json")}
+
+                stop, lock, statuses = threading.Event(), threading.Lock(), Counter()
+                flooders = [threading.Thread(target=flood, args=(base, stop, statuses, lock)) for _ in range(args.clients)]
+                for thread in flooders:
+                    thread.start()
+                time.sleep(1.0)  # let the flood build up
+
+                results = {}
+                probers = [
+                    threading.Thread(
+                        target=lambda path=path: results.__setitem__(
+                            path, probe(httpx.Client(base_url=base), path, args.seconds, args.interval, args.probe_timeout)
+                        )
+                    )
+                    for path in ("/healthz", "/.well-known/jwks.json")
+                ]
+                for thread in probers:
+                    thread.start()
+                for thread in probers:
+                    thread.join()
+                stop.set()
+                for thread in flooders:
+                    thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"login flood: {args.clients} clients for {args.seconds:.0f}s, probes every {args.interval * 1000:.0f} ms")
+    for path in ("/healthz", "/.well-known/jwks.json"):
+        print(describe(f"{path} idle", *idle[path]))
+        print(describe(f"{path} under flood", *results[path]))
+    total = sum(statuses.values())
+    rate = total / (args.seconds + 1.0)
+    print(f"login responses: {dict(statuses)} ({rate:,.0f}/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
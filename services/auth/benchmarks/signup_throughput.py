@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Measure the database side of signup: the old lookup-then-insert pattern
+against the single INSERT ... ON CONFLICT DO NOTHING RETURNING, on SQLite
+and (optionally) Postgres.
+
+Usage:
+  poetry run python benchmarks/signup_throughput.py
+  poetry run python benchmarks/signup_throughput.py --signups 5000 --threads 8 \\
+      --postgres-url postgresql+psycopg://postgres@localhost/bench
+
+Notes:
+- Both patterns run exactly the statements signup issues, through a
+  Session per signup as get_db provides. The password hash is a fixed
+  string: Argon2 costs the same in both and would hide the difference.
+- --duplicates is the share of signups for an email that already exists
+  (409s); those are the ones the old pattern answered from its lookup.
+- Each pattern starts from an empty users table. SQLite uses a file in a
+  temporary directory; Postgres uses the given database and leaves it as
+  it found it (the table is created and dropped here).
+- "statements" counts what reached the driver per signup; "round trips"
+  adds each COMMIT or ROLLBACK (and leaves out BEGIN, which drivers may
+  or may not send on its own).
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import Base, dialect_insert  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD_HASH = "$argon2id$v=19$m=65536,t=3,p=4$" + "x" * 22 + "$" + "y" * 43
+
+
+def signup_before(db, email: str):
+    """What signup did: lookup, insert, commit, read back."""
+    existing = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    if existing:
+        return None
+    user = User(email=email, password_hash=PASSWORD_HASH, role="user")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user.id
+
+
+def signup_after(db, email: str):
+    """What signup does now: one INSERT ... ON CONFLICT DO NOTHING RETURNING."""
+    insert = dialect_insert(db.get_bind())
+    user = db.execute(
+        insert(User)
+        .values(email=email, password_hash=PASSWORD_HASH, role="user")
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.email, User.role)
+    ).first()
+    db.commit()
+    return user.id if user else None
+
+
+def run(engine, signup, emails: list[str], threads: int) -> dict:
+    Base.metadata.drop_all(engine, tables=[User.__table__])
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    statements = [0]
+    transactions = [0]
+
+    def count_statement(*args):
+        statements[0] += 1
+
+    def count_commit(conn):
+        transactions[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    event.listen(engine, "rollback", count_commit)
+
+    created = [0]
+    lock = threading.Lock()
+    chunks = [emails[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        ok = 0
+        for email in chunk:
+            with Session() as db:
+                if signup(db, email) is not None:
+                    ok += 1
+        with lock:
+            created[0] += ok
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    event.remove(engine, "before_cursor_execute", count_statement)
+    event.remove(engine, "commit", count_commit)
+    event.remove(engine, "rollback", count_commit)
+    Base.metadata.drop_all(engine, tables=[User.__table__])
+    return {
+        "rate": len(emails) / elapsed,
+        "created": created[0],
+        "statements": statements[0] / len(emails),
+        "round_trips": (statements[0] + transactions[0]) / len(emails),
+    }
+
+
+def bench(label: str, engine, emails: list[str], threads: int) -> None:
+    for name, signup in (("before", signup_before), ("after", signup_after)):
+        result = run(engine, signup, emails, threads)
+        print(
+            f"{label:<9} {name:<7} {result['rate']:8,.0f} signups/s   "
+            f"{result['statements']:.2f} statements, {result['round_trips']:.2f} round trips per signup   "
+            f"({result['created']:,} created)"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of signups for a taken email")
+    parser.add_argument("--postgres-url", help="also run against this Postgres database")
+    args = parser.parse_args()
+
+    unique = int(args.signups * (1 - args.duplicates))
+    emails = [f"user{i}@example.com" for i in range(unique)]
+    emails += random.choices(emails, k=args.signups - unique)
+    random.shuffle(emails)
+
+    print(f"{args.signups:,} signups, {args.threads} threads, {args.duplicates:.0%} duplicates")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/auth.db", connect_args={"check_same_thread": False})
+        bench("sqlite", engine, emails, args.threads)
+        engine.dispose()
+    if args.postgres_url:
+        engine = create_engine(args.postgres_url, pool_size=args.threads)
+        bench("postgres", engine, emails, args.threads)
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
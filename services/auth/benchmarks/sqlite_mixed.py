@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Mixed signup/login load on a SQLite file: the engine auth-service used to
+create (rollback journal, default pool, only check_same_thread) against
+db.make_engine (WAL, synchronous=NORMAL, busy_timeout, mmap, cache, pool).
+
+Usage:
+  poetry run python benchmarks/sqlite_mixed.py
+  poetry run python benchmarks/sqlite_mixed.py --threads 32 --seconds 10 --signup-share 0.2
+
+Notes:
+- Each thread opens a Session per request, as get_db does, and runs the
+  statements of the endpoint: a signup is the INSERT ... ON CONFLICT DO
+  NOTHING RETURNING and its COMMIT; a login looks the user up by email.
+  The password hash is a fixed string: Argon2 runs outside the database
+  and would hide it.
+- The users table starts with --users accounts; logins pick one at random.
+- The database file lives in --dir (default: a temporary directory), so
+  run it on the disk the service uses: with a rollback journal every commit
+  costs several fsyncs, and how much that hurts depends on the disk.
+- "errors" are requests that raised, e.g. "database is locked".
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import Base, dialect_insert, make_engine  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD_HASH = "$argon2id$v=19$m=65536,t=3,p=4$" + "x" * 22 + "$" + "y" * 43
+
+
+def signup(db, email: str) -> None:
+    insert = dialect_insert(db.get_bind())
+    db.execute(
+        insert(User)
+        .values(email=email, password_hash=PASSWORD_HASH, role="user")
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.email, User.role)
+    ).first()
+    db.commit()
+
+
+def login(db, email: str) -> None:
+    db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+
+
+def seed(engine, users: int) -> None:
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [{"email": f"user{i}@example.com", "password_hash": PASSWORD_HASH, "role": "user"} for i in range(users)],
+        )
+
+
+def run(engine, args) -> dict:
+    seed(engine, args.users)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = {"signup": [], "login": []}
+    errors = [0]
+    counter = iter(range(10**9))
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        mine = {"signup": [], "login": []}
+        failed = 0
+        while not stop.is_set():
+            if rng.random() < args.signup_share:
+                kind, email = "signup", f"new{next(counter)}@example.com"
+            else:
+                kind, email = "login", f"user{rng.randrange(args.users)}@example.com"
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    (signup if kind == "signup" else login)(db, email)
+            except Exception:
+                failed += 1
+                continue
+            mine[kind].append(time.perf_counter() - started)
+        with lock:
+            for kind in mine:
+                latencies[kind].extend(mine[kind])
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {"latencies": latencies, "errors": errors[0]}
+
+
+def describe(label: str, latencies: list[float], seconds: float) -> str:
+    if not latencies:
+        return f"  {label:<7} none completed"
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (
+        f"  {label:<7} {len(latencies) / seconds:8,.0f}/s   p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+        f"p99 {p99 * 1000:7.2f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration per engine")
+    parser.add_argument("--signup-share", type=float, default=0.1, help="share of requests that are signups")
+    parser.add_argument("--users", type=int, default=10_000, help="accounts in the table at the start")
+    parser.add_argument("--dir", help="directory for the database files (default: a temporary one)")
+    args = parser.parse_args()
+
+    engines = {
+        "before": lambda path: create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}),
+        "after": lambda path: make_engine(f"sqlite:///{path}"),
+    }
+    print(f"{args.threads} threads for {args.seconds:.0f}s each, {args.signup_share:.0%} signups, "
+          f"{args.users:,} accounts")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for name, build in engines.items():
+            engine = build(Path(tmp) / f"{name}.db")
+            result = run(engine, args)
+            engine.dispose()
+            total = sum(len(values) for values in result["latencies"].values())
+            print(f"{name:<7} {total / args.seconds:8,.0f} requests/s   errors {result['errors']}")
+            for kind in ("signup", "login"):
+                print(describe(kind, result["latencies"][kind], args.seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 """Pytest configuration and shared fixtures for auth service tests."""
 
+import os
 from unittest.mock import patch
 
 import pytest
@@ -9,6 +10,12 @@ from sqlalchemy.orm import sessionmaker, Session
 # Delay imports of app modules to avoid initializing db engine
 # They are imported inside fixtures as needed
 
+# Signing keys live in memory only: tests never create a key file under /data
+os.environ.setdefault("AUTH_KEY_DIR", "")
+# Importing app.main creates the tables of app.db's engine: keep it in memory
+# too (requests get the db_session fixture's database instead)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
 
 # ==============================================================================
 # Database and Session Fixtures
@@ -19,6 +26,7 @@ from sqlalchemy.orm import sessionmaker, Session
 def db_engine():
     """Create an in-memory SQLite engine for testing with StaticPool."""
     from app.db import Base
+    from app import models  # noqa: F401  (registers the tables on Base)
     from sqlalchemy.pool import StaticPool
     
     # StaticPool ensures all connections use the same in-memory database
@@ -62,9 +70,9 @@ def test_settings():
         ACCESS_TOKEN_TTL_MIN=15,
         DATABASE_URL="sqlite:///:memory:",
         LOG_SERVICE_URL="http://localhost:8003",
-        _private_key_pem=private_key_pem,
-        _public_key_pem=public_key_pem,
     )
+    settings._private_key_pem = private_key_pem
+    settings._public_key_pem = public_key_pem
     return settings
 
 
@@ -210,119 +218,18 @@ def app_with_mocks(test_settings, db_session, mock_send_event):
 
 @pytest.fixture
 def fastapi_client(db_engine, db_session, mock_send_event):
-    """Create a FastAPI TestClient with test endpoints and test database."""
-    from fastapi import FastAPI, Depends, HTTPException, status, Request
+    """TestClient for the app in app.main, on the test database with send_event mocked."""
     from fastapi.testclient import TestClient
-    from sqlalchemy.orm import Session
-    from sqlalchemy import select
-    import base64
-    from cryptography.hazmat.primitives import serialization
-    from cryptography.hazmat.backends import default_backend
+    from app import main
+    from app.db import get_db
+    from app.throttle import build_login_throttle
 
-    from app.models import User
-    from app.schemas import SignupRequest, LoginRequest, TokenResponse
-    from app.security import hash_password, verify_password, create_access_token
-    from app.log_client import send_event
-    from app.settings import settings
-
-    # Create fresh app instance for testing
-    app = FastAPI(title="auth-service-test")
-
-    @app.get("/healthz")
-    def healthz():
-        return {"status": "ok"}
-
-    @app.get("/.well-known/jwks.json")
-    def get_jwks():
-        """Expose public key in JWKS format for JWT verification."""
-        public_key_pem = settings.public_key_pem
-        public_key = serialization.load_pem_public_key(
-            public_key_pem.encode("utf-8"),
-            backend=default_backend(),
-        )
-        public_numbers = public_key.public_numbers()
-
-        def int_to_base64url(n: int, length: int) -> str:
-            b = n.to_bytes(length, byteorder='big')
-            return base64.urlsafe_b64encode(b).rstrip(b'=').decode('ascii')
-
-        key_bit_length = public_key.key_size
-        key_byte_length = (key_bit_length + 7) // 8
-
-        return {
-            "keys": [
-                {
-                    "kty": "RSA",
-                    "use": "sig",
-                    "kid": "sentinel-auth-key-1",
-                    "n": int_to_base64url(public_numbers.n, key_byte_length),
-                    "e": int_to_base64url(public_numbers.e, 3),
-                    "alg": "RS256",
-                }
-            ]
-        }
-
-    def _get_db():
+    def override_get_db():
         yield db_session
 
-    @app.post("/signup", status_code=status.HTTP_201_CREATED)
-    def signup(request: Request, payload: SignupRequest, db: Session = Depends(_get_db)):
-        email = payload.email.lower().strip()
-        existing = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-        if existing:
-            send_event(
-                event="signup_conflict",
-                ip="127.0.0.1",
-                path="/signup",
-                user_id=None,
-                meta={"email": email},
-            )
-            raise HTTPException(status_code=409, detail="Email already registered")
-
-        user = User(
-            email=email,
-            password_hash=hash_password(payload.password),
-            role="user",
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-
-        send_event(
-            event="signup_success",
-            ip="127.0.0.1",
-            path="/signup",
-            user_id=str(user.id),
-            meta={"email": user.email},
-        )
-
-        return {"id": user.id, "email": user.email, "role": user.role}
-
-    @app.post("/login", response_model=TokenResponse)
-    def login(request: Request, payload: LoginRequest, db: Session = Depends(_get_db)):
-        email = payload.email.lower().strip()
-        user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-
-        if not user or not verify_password(payload.password, user.password_hash):
-            send_event(
-                event="login_failed",
-                ip="127.0.0.1",
-                path="/login",
-                user_id=None,
-                meta={"email": email},
-            )
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        token = create_access_token(user_id=user.id, role=user.role)
-
-        send_event(
-            event="login_success",
-            ip="127.0.0.1",
-            path="/login",
-            user_id=str(user.id),
-            meta={"email": user.email},
-        )
-
-        return TokenResponse(access_token=token)
-
-    return TestClient(app)
+    main.app.dependency_overrides[get_db] = override_get_db
+    # main imported send_event by name; fresh throttle buckets for every test
+    with patch.object(main, "send_event", mock_send_event), \
+            patch.object(main, "login_throttle", build_login_throttle(db_engine)):
+        yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
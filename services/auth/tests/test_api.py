@@ -1,5 +1,7 @@
 """Tests for API endpoints."""
 
+import pytest
+
 
 
 
@@ -18,6 +20,16 @@ class TestHealthzEndpoint:
         assert response.headers["content-type"] == "application/json"
 
 
+class TestStatsEndpoint:
+    """Test /stats endpoint."""
+
+    def test_reports_the_event_shipper(self, fastapi_client):
+        """GET /stats should return the shipper counters."""
+        response = fastapi_client.get("/stats")
+        assert response.status_code == 200
+        assert "queue_depth" in response.json()["shipper"]
+
+
 class TestJWKSEndpoint:
     """Test /.well-known/jwks.json endpoint."""
 
@@ -63,6 +75,65 @@ class TestJWKSEndpoint:
         assert response.status_code == 200
 
 
+class TestJWKSCaching:
+    """JWKS served precomputed, with an ETag, answering revalidation with 304."""
+
+    URL = "/.well-known/jwks.json"
+
+    def test_serves_precomputed_body_with_cache_headers(self, fastapi_client):
+        from app.settings import settings
+
+        response = fastapi_client.get(self.URL)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == settings.signer.jwks_json
+        assert response.headers["etag"] == settings.signer.jwks_etag
+        assert response.headers["cache-control"] == f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"
+
+    def test_matching_etag_gets_304(self, fastapi_client):
+        etag = fastapi_client.get(self.URL).headers["etag"]
+
+        response = fastapi_client.get(self.URL, headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert "max-age" in response.headers["cache-control"]
+
+    @pytest.mark.parametrize("header", ['"stale", {etag}', "W/{etag}", "*"])
+    def test_if_none_match_forms(self, fastapi_client, header):
+        etag = fastapi_client.get(self.URL).headers["etag"]
+
+        response = fastapi_client.get(self.URL, headers={"If-None-Match": header.format(etag=etag)})
+
+        assert response.status_code == 304
+
+    def test_stale_etag_gets_full_body(self, fastapi_client):
+        response = fastapi_client.get(self.URL, headers={"If-None-Match": '"stale"'})
+
+        assert response.status_code == 200
+        assert response.json()["keys"]
+
+    @pytest.mark.parametrize("header, matches", [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        (' "x" , W/"abc" ', True),
+        ("*", True),
+        (" * ", True),
+        ('"abcd"', False),
+        ('"ab"', False),
+        ("abc", False),
+        ('"x", "y"', False),
+    ])
+    def test_etag_matches(self, header, matches):
+        from app.main import etag_matches
+
+        assert etag_matches(header, '"abc"') is matches
+
+
 class TestSignupEndpoint:
     """Test /signup endpoint."""
 
@@ -144,6 +215,39 @@ class TestSignupEndpoint:
         call_kwargs = mock_send_event.call_args[1]
         assert call_kwargs["event"] == "signup_conflict"
 
+    def test_signup_is_one_statement(self, create_user, fastapi_client, db_engine, mock_send_event):
+        """Signup inserts with ON CONFLICT DO NOTHING RETURNING: no lookup, no read back."""
+        from sqlalchemy import event
+
+        create_user(email="existing@example.com")
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement.split()[0].upper())
+
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            created = fastapi_client.post("/signup", json={"email": "new@example.com", "password": "secure_password_123"})
+            conflict = fastapi_client.post(
+                "/signup", json={"email": "existing@example.com", "password": "other_password_456"}
+            )
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
+
+        assert created.status_code == 201
+        assert created.json()["email"] == "new@example.com"
+        assert conflict.status_code == 409
+        assert statements == ["INSERT", "INSERT"]
+
+    def test_signup_conflict_keeps_existing_password(self, create_user, fastapi_client, db_session, mock_send_event):
+        user = create_user(email="existing@example.com", password="original_password_1")
+
+        fastapi_client.post("/signup", json={"email": "existing@example.com", "password": "other_password_456"})
+
+        db_session.refresh(user)
+        from app.security import verify_password
+        assert verify_password("original_password_1", user.password_hash)
+
     def test_signup_invalid_email_format(self, fastapi_client):
         """Invalid email should return 422."""
         response = fastapi_client.post(
@@ -466,6 +570,117 @@ class TestLoginEndpoint:
         assert response.status_code == 422
 
 
+class TestLoginRehash:
+    """Login upgrades hashes made with older Argon2 costs."""
+
+    def test_login_rehashes_stale_hash(self, fastapi_client, db_session, mock_send_event):
+        from argon2 import PasswordHasher
+        from app.models import User
+
+        stale = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("correct_password_123")
+        user = User(email="old@example.com", password_hash=stale, role="user")
+        db_session.add(user)
+        db_session.commit()
+
+        response = fastapi_client.post(
+            "/login",
+            json={"email": "old@example.com", "password": "correct_password_123"},
+        )
+
+        assert response.status_code == 200
+        db_session.refresh(user)
+        assert user.password_hash != stale
+        assert "m=65536" in user.password_hash
+
+    def test_login_keeps_current_hash(self, create_user, fastapi_client, db_session, mock_send_event):
+        user = create_user(email="user@example.com", password="correct_password_123")
+        current = user.password_hash
+
+        response = fastapi_client.post(
+            "/login",
+            json={"email": "user@example.com", "password": "correct_password_123"},
+        )
+
+        assert response.status_code == 200
+        db_session.refresh(user)
+        assert user.password_hash == current
+
+
+class TestLoginThrottling:
+    """Login attempts beyond the per-account burst get 429 before any password check."""
+
+    def test_repeated_failures_throttled(self, create_user, fastapi_client, mock_send_event):
+        from app.settings import settings
+
+        create_user(email="user@example.com", password="correct_password_123")
+
+        statuses = [
+            fastapi_client.post("/login", json={"email": "user@example.com", "password": "wrong_password_1"}).status_code
+            for _ in range(settings.LOGIN_THROTTLE_EMAIL_BURST)
+        ]
+        response = fastapi_client.post(
+            "/login", json={"email": "user@example.com", "password": "correct_password_123"}
+        )
+
+        assert statuses == [401] * settings.LOGIN_THROTTLE_EMAIL_BURST
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        # Only the attempts that got a password check were reported
+        assert mock_send_event.call_count == settings.LOGIN_THROTTLE_EMAIL_BURST
+        # Throttled attempts are counted instead
+        assert fastapi_client.get("/stats").json()["login_throttle"]["throttled_email"] == 1
+
+    def test_ip_limit_keys_on_x_real_ip(self, create_user, fastapi_client, mock_send_event):
+        """Behind nginx every request comes from the proxy: the client is X-Real-IP."""
+        from unittest.mock import patch
+        from app.throttle import LoginThrottle, MemoryBuckets, Rate
+
+        create_user(email="user@example.com", password="correct_password_123")
+        throttle = LoginThrottle(MemoryBuckets(100), ip_rate=Rate(2, 1), email_rate=Rate(0, 0))
+
+        def attempt(ip):
+            return fastapi_client.post(
+                "/login",
+                json={"email": "user@example.com", "password": "wrong_password_1"},
+                headers={"X-Real-IP": ip, "X-Original-URI": "/auth/login"},
+            ).status_code
+
+        with patch("app.main.login_throttle", throttle):
+            statuses = [attempt("203.0.113.5") for _ in range(3)]
+            # Same TCP peer (the proxy), another client
+            other = attempt("203.0.113.6")
+
+        assert statuses == [401, 401, 429]
+        assert other == 401
+        assert throttle.stats()["throttled_ip"] == 1
+        assert [call.kwargs["ip"] for call in mock_send_event.call_args_list] == [
+            "203.0.113.5", "203.0.113.5", "203.0.113.6",
+        ]
+        assert mock_send_event.call_args.kwargs["path"] == "/auth/login"
+
+
+class TestPasswordPoolSaturation:
+    """Signup and login shed load with 503 when Argon2 is saturated."""
+
+    @pytest.mark.parametrize("path", ["/signup", "/login"])
+    def test_saturated_pool_answers_503(self, create_user, fastapi_client, mock_send_event, path):
+        from unittest.mock import patch
+        from app.password_pool import PoolFull
+
+        create_user(email="user@example.com", password="correct_password_123")
+        email = "user@example.com" if path == "/login" else "new@example.com"
+
+        with patch("app.security.password_pool.run", side_effect=PoolFull("busy")):
+            response = fastapi_client.post(
+                path,
+                json={"email": email, "password": "correct_password_123"},
+            )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        mock_send_event.assert_not_called()
+
+
 class TestRequestVariations:
     """Test various request edge cases."""
 
@@ -0,0 +1,40 @@
+"""Tests for the Argon2 cost calibration."""
+
+from app.calibrate import MIN_MEMORY_KIB, Argon2Params, calibrate, main
+
+
+def linear_cost(ms_per_pass_mib: float):
+    """A fake host where a verify takes time_cost * MiB * ms_per_pass_mib."""
+    def measure(params: Argon2Params, rounds: int) -> float:
+        return params.time_cost * params.memory_cost_kib / 1024 * ms_per_pass_mib / 1000
+    return measure
+
+
+class TestCalibrate:
+    def test_keeps_memory_and_adds_passes_on_fast_host(self):
+        # 64 MiB pass = 64 ms
+        params, seconds = calibrate(0.25, 64 * 1024, 4, measure=linear_cost(1.0))
+
+        assert params == Argon2Params(3, 64 * 1024, 4)
+        assert seconds <= 0.25
+
+    def test_halves_memory_on_slow_host(self):
+        # 64 MiB pass = 640 ms, 16 MiB = 160 ms
+        params, seconds = calibrate(0.25, 64 * 1024, 2, measure=linear_cost(10.0))
+
+        assert params == Argon2Params(1, 16 * 1024, 2)
+        assert seconds <= 0.25
+
+    def test_stops_at_minimum_memory(self):
+        params, seconds = calibrate(0.001, 64 * 1024, 1, measure=linear_cost(10.0))
+
+        assert params == Argon2Params(1, MIN_MEMORY_KIB, 1)
+        assert seconds > 0.001
+
+    def test_command_prints_settings(self, capsys):
+        assert main(["--target-ms", "5", "--max-memory-mib", "8", "--parallelism", "1", "--rounds", "1"]) == 0
+
+        out = capsys.readouterr().out
+        assert "ARGON2_TIME_COST=" in out
+        assert "ARGON2_MEMORY_COST_KIB=8192" in out
+        assert "ARGON2_PARALLELISM=1" in out
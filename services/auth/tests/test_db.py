@@ -0,0 +1,99 @@
+"""Tests for the database engine setup."""
+
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+
+from app.db import make_engine, sqlite_pragmas
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/auth.db")
+    yield engine
+    engine.dispose()
+
+
+def pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+class TestSQLitePragmas:
+    """Every connection to a SQLite file gets the performance profile."""
+
+    def test_file_database_uses_wal(self, file_engine):
+        with file_engine.connect() as conn:
+            assert pragma(conn, "journal_mode") == "wal"
+
+    def test_connection_settings(self, file_engine):
+        from app.settings import settings
+
+        with file_engine.connect() as conn:
+            assert pragma(conn, "synchronous") == 1  # NORMAL
+            assert pragma(conn, "busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma(conn, "mmap_size") == settings.SQLITE_MMAP_SIZE_MIB * 1024 * 1024
+            assert pragma(conn, "cache_size") == -settings.SQLITE_CACHE_SIZE_KIB
+            assert pragma(conn, "temp_store") == 2  # MEMORY
+
+    def test_applied_to_every_pooled_connection(self, file_engine):
+        """Connections opened concurrently each run the PRAGMAs."""
+        conns = [file_engine.connect() for _ in range(3)]
+        try:
+            assert [pragma(conn, "synchronous") for conn in conns] == [1, 1, 1]
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def test_in_memory_database_keeps_its_journal(self):
+        assert not any("journal_mode" in p for p in sqlite_pragmas(":memory:"))
+        assert not any("journal_mode" in p for p in sqlite_pragmas(None))
+        assert any("journal_mode" in p for p in sqlite_pragmas("/data/auth.db"))
+
+        engine = make_engine("sqlite:///:memory:")
+        with engine.connect() as conn:
+            assert pragma(conn, "journal_mode") == "memory"
+            assert pragma(conn, "synchronous") == 1
+        engine.dispose()
+
+
+class TestPool:
+    def test_file_database_pool_size(self, file_engine):
+        from app.settings import settings
+
+        assert isinstance(file_engine.pool, QueuePool)
+        assert file_engine.pool.size() == settings.DATABASE_POOL_SIZE
+
+    def test_connections_are_reused(self, file_engine):
+        """Returning a connection keeps it open for the next request."""
+        connects = []
+        event.listen(file_engine, "connect", lambda *args: connects.append(1))
+        for _ in range(5):
+            with file_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        assert len(connects) == 1
+
+    def test_concurrent_writers_wait_instead_of_failing(self, file_engine):
+        with file_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (n INTEGER)"))
+
+        errors = []
+
+        def write(n):
+            try:
+                for i in range(20):
+                    with file_engine.begin() as conn:
+                        conn.execute(text("INSERT INTO t VALUES (:n)"), {"n": n * 100 + i})
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with file_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 160
@@ -0,0 +1,270 @@
+"""Tests for the background event shipper."""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app import event_shipper, log_client
+from app.event_shipper import EventShipper
+from app.spool import EventSpool
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+class RecordingSink:
+    def __init__(self, fail: bool = False):
+        self.batches: list[list[dict]] = []
+        self.fail = fail
+
+    def __call__(self, batch: list[dict]) -> None:
+        if self.fail:
+            raise ConnectionError("log-service down")
+        self.batches.append(batch)
+
+    @property
+    def events(self) -> list[dict]:
+        return [event for batch in self.batches for event in batch]
+
+
+def make_shipper(sink, **overrides) -> EventShipper:
+    options = {"max_queue": 100, "batch_size": 10, "flush_interval": 5.0}
+    options.update(overrides)
+    return EventShipper(sink, **options)
+
+
+class TestBatching:
+    def test_full_batch_is_sent_without_waiting(self):
+        sink = RecordingSink()
+        shipper = make_shipper(sink, batch_size=3)
+        shipper.start()
+        try:
+            for i in range(3):
+                shipper.submit({"n": i})
+
+            assert wait_until(lambda: sink.batches, timeout=1.0)
+            assert sink.batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+        finally:
+            shipper.stop()
+
+    def test_partial_batch_is_sent_after_flush_interval(self):
+        sink = RecordingSink()
+        shipper = make_shipper(sink, flush_interval=0.05)
+        shipper.start()
+        try:
+            shipper.submit({"n": 1})
+
+            assert wait_until(lambda: sink.events == [{"n": 1}])
+        finally:
+            shipper.stop()
+
+    def test_stop_sends_what_is_queued(self):
+        sink = RecordingSink()
+        shipper = make_shipper(sink, batch_size=4)
+        shipper.start()
+        for i in range(10):
+            shipper.submit({"n": i})
+
+        shipper.stop()
+
+        assert sink.events == [{"n": i} for i in range(10)]
+        assert shipper.stats()["sent"] == 10
+        assert shipper.depth == 0
+
+    def test_failed_batches_are_counted(self):
+        shipper = make_shipper(RecordingSink(fail=True), batch_size=2)
+        shipper.start()
+        for i in range(4):
+            shipper.submit({"n": i})
+        shipper.stop()
+
+        assert shipper.failed == 4
+        assert shipper.sent == 0
+
+
+class TestOverflow:
+    """The worker is not started, so the queue only fills up."""
+
+    def test_drop_newest_rejects_the_new_event(self):
+        shipper = make_shipper(RecordingSink(), max_queue=2, overflow="drop_newest")
+
+        results = [shipper.submit({"n": i}) for i in range(3)]
+
+        assert results == [True, True, False]
+        assert list(shipper._queue) == [{"n": 0}, {"n": 1}]
+        assert shipper.dropped == 1
+
+    def test_drop_oldest_makes_room(self):
+        shipper = make_shipper(RecordingSink(), max_queue=2, overflow="drop_oldest")
+
+        results = [shipper.submit({"n": i}) for i in range(3)]
+
+        assert results == [True, True, True]
+        assert list(shipper._queue) == [{"n": 1}, {"n": 2}]
+        assert shipper.dropped == 1
+
+    def test_block_gives_up_after_timeout(self):
+        shipper = make_shipper(RecordingSink(), max_queue=1, overflow="block", block_timeout=0.05)
+        shipper.submit({"n": 0})
+
+        started = time.monotonic()
+        accepted = shipper.submit({"n": 1})
+
+        assert not accepted
+        assert time.monotonic() - started >= 0.05
+        assert shipper.dropped == 1
+
+    def test_block_waits_for_room(self):
+        sink = RecordingSink()
+        shipper = make_shipper(sink, max_queue=1, batch_size=1, overflow="block", block_timeout=2.0)
+        shipper.submit({"n": 0})
+
+        threading.Timer(0.05, shipper.start).start()
+        try:
+            assert shipper.submit({"n": 1})
+        finally:
+            wait_until(lambda: len(sink.events) == 2)
+            shipper.stop()
+
+        assert shipper.dropped == 0
+        assert sink.events == [{"n": 0}, {"n": 1}]
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError):
+            make_shipper(RecordingSink(), overflow="drop_everything")
+
+    def test_stats(self):
+        shipper = make_shipper(RecordingSink(), max_queue=1, overflow="drop_newest")
+        shipper.submit({"n": 0})
+        shipper.submit({"n": 1})
+
+        assert shipper.stats() == {
+            "queue_depth": 1,
+            "enqueued": 1,
+            "sent": 0,
+            "dropped": 1,
+            "failed": 0,
+            "batches": 0,
+            "spooled": 0,
+            "replayed": 0,
+            "spool_pending_bytes": 0,
+            "spool_dropped": 0,
+        }
+
+
+class SwitchableSink(RecordingSink):
+    """Fails until `up` is set; records batches and spooled NDJSON alike."""
+
+    def __init__(self):
+        super().__init__()
+        self.up = False
+
+    def __call__(self, batch: list[dict]) -> None:
+        if not self.up:
+            raise ConnectionError("log-service down")
+        self.batches.append(batch)
+
+    def ndjson(self, body: bytes) -> None:
+        self([json.loads(line) for line in body.splitlines()])
+
+
+class TestSpooling:
+    @pytest.fixture
+    def sink(self):
+        return SwitchableSink()
+
+    @pytest.fixture
+    def shipper(self, sink, tmp_path):
+        shipper = make_shipper(
+            sink,
+            batch_size=5,
+            flush_interval=0.01,
+            spool=EventSpool(str(tmp_path / "spool")),
+            send_spooled=sink.ndjson,
+            retry_interval=0.05,
+        )
+        shipper.start()
+        yield shipper
+        shipper.stop()
+        shipper.spool.close()
+
+    def test_failed_batches_are_spooled_not_lost(self, sink, shipper):
+        for i in range(10):
+            shipper.submit({"n": i})
+
+        assert wait_until(lambda: shipper.spooled == 10)
+        assert shipper.failed == 0
+        assert shipper.spool.has_pending()
+
+    def test_spooled_events_are_replayed_in_order(self, sink, shipper):
+        for i in range(10):
+            shipper.submit({"n": i})
+        assert wait_until(lambda: shipper.spooled == 10)
+
+        sink.up = True
+        for i in range(10, 15):
+            shipper.submit({"n": i})
+
+        assert wait_until(lambda: len(sink.events) == 15)
+        assert sink.events == [{"n": i} for i in range(15)]
+        assert not shipper.spool.has_pending()
+
+    def test_spool_outlives_the_shipper(self, sink, shipper, tmp_path):
+        for i in range(3):
+            shipper.submit({"n": i})
+        shipper.stop()
+        shipper.spool.close()
+
+        reopened = EventSpool(str(tmp_path / "spool"))
+        chunk = reopened.read_chunk()
+
+        assert [json.loads(line) for line in chunk.data.splitlines()] == [{"n": i} for i in range(3)]
+
+    @pytest.mark.parametrize("method", ["read_chunk", "sync"])
+    def test_disk_errors_do_not_stop_the_worker(self, sink, shipper, monkeypatch, method):
+        def broken(*args, **kwargs):
+            raise OSError("I/O error")
+
+        monkeypatch.setattr(shipper.spool, method, broken)
+        shipper.submit({"n": 0})
+        assert wait_until(lambda: shipper.spooled == 1)
+        time.sleep(0.1)
+        assert shipper.running
+
+        monkeypatch.undo()
+        sink.up = True
+        shipper.submit({"n": 1})
+
+        assert wait_until(lambda: sink.events == [{"n": 0}, {"n": 1}])
+
+
+class TestSendEventQueues:
+    def test_send_event_returns_after_queueing(self, monkeypatch):
+        sink = RecordingSink()
+        shipper = make_shipper(sink)
+        monkeypatch.setattr(log_client, "shipper", shipper)
+        shipper.start()
+        try:
+            log_client.send_event(event="login_failed", ip="1.2.3.4", path="/login", user_id=None, meta={})
+            assert shipper.enqueued == 1
+        finally:
+            shipper.stop()
+
+        assert [event["event"] for event in sink.events] == ["login_failed"]
+
+
+API_COPY = Path(__file__).resolve().parents[2] / "api" / "app" / "event_shipper.py"
+
+
+@pytest.mark.skipif(not API_COPY.exists(), reason="api-service sources not available")
+def test_api_service_copy_is_identical():
+    assert API_COPY.read_bytes() == Path(event_shipper.__file__).read_bytes()
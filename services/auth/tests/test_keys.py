@@ -1,9 +1,13 @@
 """Tests for RSA key management."""
 
+import base64
+
 import pytest
 from cryptography.hazmat.primitives import serialization
 
 from app.keys import (
+    Signer,
+    SigningKey,
     generate_rsa_keypair,
     load_private_key,
     load_public_key,
@@ -260,3 +264,92 @@ class TestKeyIntegration:
 
         # Should verify successfully
         public_key.verify(signature, data, padding.PKCS1v15(), hashes.SHA256())
+
+
+@pytest.fixture(scope="module")
+def two_private_pems():
+    return generate_rsa_keypair()[0], generate_rsa_keypair()[0]
+
+
+class TestSigner:
+    """Tests for the signer that holds parsed signing keys."""
+
+    def test_signs_with_active_key_and_kid(self, two_private_pems):
+        from jose import jwt
+
+        active, previous = two_private_pems
+        signer = Signer([SigningKey.from_pem(active, "key-2"), SigningKey.from_pem(previous, "key-1")])
+
+        token = signer.sign({"sub": "1"})
+
+        assert jwt.get_unverified_header(token)["kid"] == "key-2"
+        public_pem = load_private_key(active).public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        assert jwt.decode(token, public_pem.decode(), algorithms=["RS256"]) == {"sub": "1"}
+
+    def test_jwks_publishes_every_key(self, two_private_pems):
+        active, previous = two_private_pems
+        signer = Signer([SigningKey.from_pem(active, "key-2"), SigningKey.from_pem(previous, "key-1")])
+
+        jwks = signer.jwks()
+
+        assert [key["kid"] for key in jwks["keys"]] == ["key-2", "key-1"]
+        assert all(key["kty"] == "RSA" and key["alg"] == "RS256" for key in jwks["keys"])
+
+    def test_jwks_key_verifies_tokens(self, two_private_pems):
+        from jose import jwt
+
+        signer = Signer([SigningKey.from_pem(two_private_pems[0])])
+
+        token = signer.sign({"sub": "1"})
+
+        assert jwt.decode(token, signer.jwks()["keys"][0], algorithms=["RS256"]) == {"sub": "1"}
+
+    def test_rejects_no_keys_and_duplicate_kids(self, two_private_pems):
+        key = SigningKey.from_pem(two_private_pems[0], "key-1")
+
+        with pytest.raises(ValueError):
+            Signer([])
+        with pytest.raises(ValueError):
+            Signer([key, SigningKey.from_pem(two_private_pems[1], "key-1")])
+
+    def test_jwks_serialized_once_with_etag(self, two_private_pems):
+        import json
+
+        key_1 = SigningKey.from_pem(two_private_pems[0], "key-1")
+        key_2 = SigningKey.from_pem(two_private_pems[1], "key-2")
+
+        signer = Signer([key_1])
+
+        assert json.loads(signer.jwks_json) == signer.jwks()
+        assert signer.jwks_etag.startswith('"') and signer.jwks_etag.endswith('"')
+        assert Signer([key_1]).jwks_etag == signer.jwks_etag
+        assert Signer([key_2, key_1]).jwks_etag != signer.jwks_etag
+
+
+class TestThumbprintKid:
+    """Tests for kids derived from the key (RFC 7638 thumbprints)."""
+
+    def test_rfc7638_example(self):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from app.keys import jwk_thumbprint
+
+        n = (
+            "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiFV4n3oknjhMstn64tZ_2W"
+            "-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qN"
+            "Lyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw"
+        )
+        modulus = int.from_bytes(base64.urlsafe_b64decode(n + "=" * (-len(n) % 4)), "big")
+
+        public_key = rsa.RSAPublicNumbers(65537, modulus).public_key()
+
+        assert jwk_thumbprint(public_key) == "NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs"
+
+    def test_same_key_same_kid(self, two_private_pems):
+        first = SigningKey.from_pem(two_private_pems[0])
+
+        assert SigningKey.from_pem(two_private_pems[0]).kid == first.kid
+        assert SigningKey.from_pem(two_private_pems[1]).kid != first.kid
+        assert first.public_jwk()["kid"] == first.kid
@@ -0,0 +1,221 @@
+"""Tests for the keystore: active, next and previous keys and scheduled rotation."""
+
+import time
+from itertools import cycle
+
+import pytest
+from jose import jwt
+
+from app.keys import SigningKey, generate_rsa_keypair
+from app.keystore import KeyStore
+
+ROTATE = 3600.0
+AHEAD = 600.0
+RETAIN = 960.0
+
+
+@pytest.fixture(scope="module")
+def private_pems():
+    return [generate_rsa_keypair()[0] for _ in range(3)]
+
+
+@pytest.fixture
+def store(private_pems):
+    # Rotation hands out these keys in turn instead of generating new ones
+    pems = cycle(private_pems[1:])
+    return KeyStore(
+        SigningKey.from_pem(private_pems[0]),
+        rotation_interval=ROTATE,
+        publish_ahead=AHEAD,
+        retain_for=RETAIN,
+        generate=lambda: next(pems),
+        now=0.0,
+    )
+
+
+def jwks_kids(store):
+    return [key["kid"] for key in store.signer.jwks()["keys"]]
+
+
+class TestKeyStore:
+    def test_without_rotation_nothing_is_scheduled(self, private_pems):
+        active = SigningKey.from_pem(private_pems[0])
+        previous = SigningKey.from_pem(private_pems[1])
+        store = KeyStore(active, [previous])
+
+        assert store.tick() is None
+        assert store.signer.active is active
+        assert jwks_kids(store) == [active.kid, previous.kid]
+
+    def test_next_key_published_ahead_of_rotation(self, store):
+        active = store.signer.active.kid
+
+        assert store.tick(now=0.0) == ROTATE - AHEAD
+        assert jwks_kids(store) == [active]
+
+        assert store.tick(now=ROTATE - AHEAD) == AHEAD
+        kids = jwks_kids(store)
+        assert len(kids) == 2
+        # Published, but not signing yet
+        assert store.signer.active.kid == active
+        assert store.stats()["next"] == kids[1]
+
+    def test_rotation_keeps_previous_key_until_its_tokens_expire(self, store):
+        old = store.signer.active
+        token = store.signer.sign({"sub": "1"})
+        store.tick(now=ROTATE - AHEAD)
+        upcoming = store.stats()["next"]
+
+        assert store.tick(now=ROTATE) == RETAIN
+
+        assert store.signer.active.kid == upcoming
+        assert jwks_kids(store) == [upcoming, old.kid]
+        assert jwt.get_unverified_header(store.signer.sign({"sub": "1"}))["kid"] == upcoming
+        published = {key["kid"]: key for key in store.signer.jwks()["keys"]}
+        assert jwt.decode(token, published[old.kid], algorithms=["RS256"]) == {"sub": "1"}
+
+        store.tick(now=ROTATE + RETAIN)
+
+        assert jwks_kids(store) == [upcoming]
+        assert store.stats()["rotations"] == 1
+        assert store.stats()["retired"] == 1
+
+    def test_signer_replaced_only_on_change(self, store):
+        signer = store.signer
+
+        store.tick(now=1.0)
+        assert store.signer is signer
+
+        store.tick(now=ROTATE - AHEAD)
+        assert store.signer is not signer
+        assert store.signer.jwks_etag != signer.jwks_etag
+
+    def test_late_tick_publishes_but_waits_to_rotate(self, store):
+        """Well past rotation (long sleep, restart): the new key is published ahead all the same."""
+        active = store.signer.active.kid
+        late = ROTATE * 3
+
+        assert store.tick(now=late) == AHEAD
+
+        assert store.stats()["rotations"] == 0
+        assert store.signer.active.kid == active
+        upcoming = store.stats()["next"]
+        assert jwks_kids(store) == [active, upcoming]
+
+        # Not even a tick just before the new key's publish_ahead is up rotates
+        store.tick(now=late + AHEAD - 1)
+        assert store.stats()["rotations"] == 0
+
+        store.tick(now=late + AHEAD)
+        assert store.signer.active.kid == upcoming
+        assert store.stats()["rotations"] == 1
+        # The next key is due a full interval after this rotation
+        store.tick(now=late + ROTATE - 1)
+        assert store.stats()["next"] is None
+        store.tick(now=late + ROTATE)
+        assert store.stats()["next"] is not None
+
+    def test_background_thread_rotates(self, private_pems):
+        pems = cycle(private_pems)
+        store = KeyStore(
+            SigningKey.from_pem(next(pems)),
+            rotation_interval=0.2,
+            publish_ahead=0.1,
+            retain_for=0.1,
+            generate=lambda: next(pems),
+        )
+        store.start()
+        try:
+            deadline = time.monotonic() + 5
+            while store.rotations == 0 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            store.stop()
+
+        assert store.rotations >= 1
+        assert not store.running
+
+
+class TestKeyStoreFile:
+    """Tests for keys kept in a file across restarts."""
+
+    def test_generated_once_then_loaded(self, tmp_path, private_pems):
+        path = tmp_path / "keys" / "keystore.json"
+        generated = []
+
+        def generate():
+            generated.append(private_pems[0])
+            return private_pems[0]
+
+        first = KeyStore.open(path, generate=generate)
+        second = KeyStore.open(path, generate=generate)
+
+        assert len(generated) == 1
+        assert second.signer.active.kid == first.signer.active.kid
+        assert second.signer.jwks_etag == first.signer.jwks_etag
+
+    def test_file_readable_by_owner_only(self, tmp_path, private_pems):
+        path = tmp_path / "keys" / "keystore.json"
+
+        KeyStore.open(path, generate=lambda: private_pems[0])
+
+        assert path.stat().st_mode & 0o777 == 0o600
+        assert path.parent.stat().st_mode & 0o777 == 0o700
+        assert [p.name for p in path.parent.iterdir()] == ["keystore.json"]
+
+    def test_rotation_survives_restart(self, tmp_path, private_pems):
+        path = tmp_path / "keystore.json"
+        pems = cycle(private_pems)
+        options = dict(rotation_interval=ROTATE, publish_ahead=AHEAD, retain_for=RETAIN, generate=lambda: next(pems))
+        store = KeyStore.open(path, **options)
+        started = store._activated_at
+        old = store.signer.active.kid
+
+        store.tick(now=started + ROTATE - AHEAD)
+        store.tick(now=started + ROTATE)
+        reopened = KeyStore.open(path, **options)
+
+        assert reopened.signer.active.kid == store.signer.active.kid != old
+        assert jwks_kids(reopened) == [store.signer.active.kid, old]
+        # The rotation schedule carries on where it was
+        assert reopened.tick(now=started + ROTATE) == pytest.approx(RETAIN)
+
+    def test_configured_previous_key_not_written(self, tmp_path, private_pems):
+        path = tmp_path / "keystore.json"
+        configured = SigningKey.from_pem(private_pems[1])
+
+        store = KeyStore.open(path, [configured], generate=lambda: private_pems[0])
+
+        assert configured.kid in jwks_kids(store)
+        assert configured.kid not in jwks_kids(KeyStore.open(path))
+
+    def test_warns_about_loose_permissions(self, tmp_path, private_pems, caplog):
+        path = tmp_path / "keystore.json"
+        KeyStore.open(path, generate=lambda: private_pems[0])
+        path.chmod(0o644)
+
+        KeyStore.open(path)
+
+        assert "chmod 600" in caplog.text
+
+
+class TestSettingsKeystore:
+    def test_keys_kept_in_key_dir(self, tmp_path):
+        from app.settings import Settings
+
+        first = Settings(AUTH_KEY_DIR=str(tmp_path)).keystore
+        second = Settings(AUTH_KEY_DIR=str(tmp_path)).keystore
+
+        assert (tmp_path / "keystore.json").exists()
+        assert second.signer.active.kid == first.signer.active.kid
+
+    def test_unusable_key_dir_falls_back_to_generated_key(self, tmp_path):
+        from app.settings import Settings
+
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+
+        keystore = Settings(AUTH_KEY_DIR=str(blocker / "keys")).keystore
+
+        assert keystore.path is None
+        assert len(keystore.signer.keys) == 1
@@ -0,0 +1,80 @@
+"""Tests for the pooled log-service client."""
+
+import httpx
+import pytest
+
+from app import log_client
+
+
+@pytest.fixture
+def log_requests():
+    """Route the shared client through a mock transport and record requests."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    log_client.close_client()
+    log_client._client = httpx.Client(
+        base_url="http://log.test",
+        transport=httpx.MockTransport(handler),
+    )
+    yield requests
+    log_client.close_client()
+
+
+class TestSharedClient:
+    def test_client_is_reused(self):
+        try:
+            assert log_client.get_client() is log_client.get_client()
+        finally:
+            log_client.close_client()
+
+    def test_close_client_starts_fresh(self):
+        first = log_client.get_client()
+        log_client.close_client()
+
+        second = log_client.get_client()
+        log_client.close_client()
+
+        assert first.is_closed
+        assert second is not first
+
+    def test_close_without_client_is_noop(self):
+        log_client.close_client()
+        log_client.close_client()
+
+    def test_client_targets_log_service(self):
+        try:
+            client = log_client.get_client()
+            assert str(client.base_url).rstrip("/") == log_client.settings.LOG_SERVICE_URL.rstrip("/")
+        finally:
+            log_client.close_client()
+
+
+class TestSendEvent:
+    def test_posts_to_ingest(self, log_requests):
+        log_client.send_event(event="login_failed", ip="1.2.3.4", path="/login", user_id=None, meta={"k": "v"})
+
+        assert len(log_requests) == 1
+        assert log_requests[0].url.path == "/ingest"
+
+    def test_events_share_one_client(self, log_requests):
+        client = log_client.get_client()
+        for _ in range(3):
+            log_client.send_event(event="login_failed", ip="1.2.3.4", path="/login", user_id=None, meta={})
+
+        assert len(log_requests) == 3
+        assert log_client.get_client() is client
+
+    def test_delivery_failure_is_swallowed(self):
+        def handler(request):
+            raise httpx.ConnectError("log-service down", request=request)
+
+        log_client.close_client()
+        log_client._client = httpx.Client(base_url="http://log.test", transport=httpx.MockTransport(handler))
+        try:
+            log_client.send_event(event="login_failed", ip="1.2.3.4", path="/login", user_id=None, meta={})
+        finally:
+            log_client.close_client()
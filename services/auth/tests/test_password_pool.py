@@ -0,0 +1,81 @@
+"""Tests for the bounded Argon2 pool."""
+
+import threading
+import time
+
+import pytest
+
+from app.password_pool import PasswordPool, PoolFull
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordPool(workers=2, max_queue=1)
+    yield pool
+    pool.stop()
+
+
+def occupy(pool, count):
+    """Start count calls that block until the returned event is set."""
+    release = threading.Event()
+    threads = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while pool.stats()["in_flight"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return release, threads
+
+
+class TestPasswordPool:
+    def test_runs_on_pool_thread(self, pool):
+        assert pool.run(lambda: threading.current_thread().name).startswith("argon2")
+        assert pool.stats()["completed"] == 1
+
+    def test_exceptions_propagate(self, pool):
+        def boom():
+            raise ValueError("bad hash")
+
+        with pytest.raises(ValueError):
+            pool.run(boom)
+        assert pool.stats()["in_flight"] == 0
+
+    def test_rejects_at_once_when_workers_and_queue_are_full(self, pool):
+        release, threads = occupy(pool, 3)
+        try:
+            started = time.perf_counter()
+            with pytest.raises(PoolFull):
+                pool.run(lambda: None)
+            assert time.perf_counter() - started < 0.1
+            assert pool.stats()["rejected"] == 1
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        assert pool.run(lambda: "ok") == "ok"
+
+    def test_queued_calls_wait_for_a_worker(self, pool):
+        release, threads = occupy(pool, 2)
+        result = []
+        queued = threading.Thread(target=lambda: result.append(pool.run(lambda: "done")))
+        queued.start()
+        time.sleep(0.05)
+        assert result == []
+
+        release.set()
+        queued.join(5)
+        for thread in threads:
+            thread.join()
+        assert result == ["done"]
+
+    def test_usable_again_after_stop(self, pool):
+        pool.start()
+        pool.stop()
+        assert not pool.running
+
+        assert pool.run(lambda: 1) == 1
+        assert pool.running
+
+    def test_default_workers_leave_a_cpu(self):
+        assert PasswordPool().workers >= 1
@@ -5,7 +5,7 @@ import pytest
 from datetime import datetime, timezone
 from jose import jwt, JWTError
 
-from app.security import hash_password, verify_password, create_access_token
+from app.security import hash_password, verify_password, rehash_if_needed, create_access_token
 from app.keys import load_public_key
 
 
@@ -75,6 +75,35 @@ class TestPasswordHashing:
         assert verify_password("securepassword123", password_hash) is False
 
 
+class TestRehash:
+    """Hashes made with other Argon2 costs are upgraded after a successful verify."""
+
+    def test_current_hash_is_kept(self):
+        password_hash = hash_password("password123")
+
+        assert rehash_if_needed("password123", password_hash) is None
+
+    def test_stale_hash_is_replaced(self):
+        from argon2 import PasswordHasher
+
+        stale = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("password123")
+
+        new_hash = rehash_if_needed("password123", stale)
+
+        assert new_hash is not None and new_hash != stale
+        assert verify_password("password123", new_hash) is True
+        assert rehash_if_needed("password123", new_hash) is None
+
+    def test_saturated_pool_skips_rehash(self):
+        from argon2 import PasswordHasher
+        from app.password_pool import PoolFull
+
+        stale = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("password123")
+
+        with patch("app.security.password_pool.run", side_effect=PoolFull("busy")):
+            assert rehash_if_needed("password123", stale) is None
+
+
 class TestAccessTokenCreation:
     """Test JWT access token creation and validation."""
 
@@ -250,3 +279,32 @@ class TestJWTIntegration:
 
                 with pytest.raises(JWTError):
                     jwt.decode(token, public_key, algorithms=["RS256"])
+
+
+class TestTokenMintingThroughput:
+    """Microbenchmark: tokens/sec with the cached signer vs parsing the key per token."""
+
+    def test_cached_signer_outpaces_parsing_per_token(self, test_settings):
+        import time
+        from app.keys import load_private_key
+
+        claims = {"sub": "1", "role": "user"}
+
+        def tokens_per_second(mint, count: int) -> float:
+            mint()
+            started = time.perf_counter()
+            for _ in range(count):
+                mint()
+            return count / (time.perf_counter() - started)
+
+        def parse_per_token():
+            # What create_access_token did before the signer
+            key = load_private_key(test_settings.private_key_pem)
+            return jwt.encode(claims, key, algorithm="RS256")
+
+        with patch("app.security.settings", test_settings):
+            cached = tokens_per_second(lambda: create_access_token(user_id=1, role="user"), 200)
+        parsing = tokens_per_second(parse_per_token, 10)
+
+        print(f"\ntoken minting: {cached:,.0f}/s cached signer, {parsing:,.0f}/s parsing the key per token")
+        assert cached > parsing * 5
@@ -0,0 +1,137 @@
+"""Tests for the on-disk event spool."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app import spool as spool_module
+from app.spool import EventSpool, SEGMENT_PREFIX
+
+
+def events(start: int, count: int) -> list[dict]:
+    return [{"n": n} for n in range(start, start + count)]
+
+
+def drain(spool: EventSpool, max_bytes: int = 1024 * 1024) -> list[dict]:
+    replayed = []
+    while (chunk := spool.read_chunk(max_bytes)) is not None:
+        replayed.extend(json.loads(line) for line in chunk.data.splitlines())
+        spool.commit(chunk)
+    return replayed
+
+
+def segment_files(directory) -> list[str]:
+    return sorted(name for name in os.listdir(directory) if name.startswith(SEGMENT_PREFIX))
+
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return str(tmp_path / "spool")
+
+
+class TestAppendAndReplay:
+    def test_empty_spool_has_nothing_pending(self, spool_dir):
+        spool = EventSpool(spool_dir)
+
+        assert not spool.has_pending()
+        assert spool.read_chunk() is None
+
+    def test_replays_in_order(self, spool_dir):
+        spool = EventSpool(spool_dir)
+        spool.append(events(0, 3))
+        spool.append(events(3, 2))
+
+        assert drain(spool) == events(0, 5)
+        assert not spool.has_pending()
+
+    def test_chunks_hold_whole_lines(self, spool_dir):
+        spool = EventSpool(spool_dir)
+        spool.append(events(0, 100))
+
+        chunk = spool.read_chunk(max_bytes=50)
+
+        assert chunk.data.endswith(b"\n")
+        assert 0 < len(chunk.data) <= 50
+
+    def test_line_longer_than_chunk_is_sent_whole(self, spool_dir):
+        spool = EventSpool(spool_dir)
+        big = {"n": 0, "meta": "x" * 500}
+        spool.append([big, {"n": 1}])
+
+        assert drain(spool, max_bytes=64) == [big, {"n": 1}]
+
+    def test_uncommitted_chunk_is_read_again(self, spool_dir):
+        spool = EventSpool(spool_dir)
+        spool.append(events(0, 3))
+
+        first = spool.read_chunk()
+        again = spool.read_chunk()
+
+        assert first == again
+
+
+class TestSegments:
+    def test_rotates_segments_and_deletes_delivered_ones(self, spool_dir):
+        spool = EventSpool(spool_dir, segment_bytes=100)
+        for start in range(0, 50, 5):
+            spool.append(events(start, 5))
+        assert len(segment_files(spool_dir)) > 3
+
+        assert drain(spool, max_bytes=64) == events(0, 50)
+        # Only the segment still being appended to is left
+        assert len(segment_files(spool_dir)) == 1
+
+    def test_survives_restart(self, spool_dir):
+        spool = EventSpool(spool_dir, segment_bytes=100)
+        for start in range(0, 20, 5):
+            spool.append(events(start, 5))
+        chunk = spool.read_chunk(max_bytes=30)
+        spool.commit(chunk)
+        delivered = len(chunk.data.splitlines())
+        spool.close()
+
+        reopened = EventSpool(spool_dir, segment_bytes=100)
+        reopened.append(events(20, 2))
+
+        assert drain(reopened) == events(delivered, 22 - delivered)
+
+    def test_torn_last_line_of_a_closed_segment_is_replayed(self, spool_dir):
+        spool = EventSpool(spool_dir)
+        spool.append(events(0, 2))
+        spool.close()
+        with open(os.path.join(spool_dir, segment_files(spool_dir)[0]), "ab") as f:
+            f.write(b'{"n": 2, "trunc')
+
+        reopened = EventSpool(spool_dir)
+        chunk = reopened.read_chunk()
+
+        assert chunk.data.endswith(b'{"n": 2, "trunc')
+        reopened.commit(chunk)
+        assert not reopened.has_pending()
+
+    def test_size_limit_drops_oldest_segments(self, spool_dir):
+        spool = EventSpool(spool_dir, segment_bytes=100, max_bytes=300)
+        for start in range(0, 100, 5):
+            spool.append(events(start, 5))
+
+        replayed = drain(spool)
+
+        assert spool.dropped > 0
+        assert len(replayed) + spool.dropped == 100
+        # What survives is the newest events, still in order
+        assert replayed == events(100 - len(replayed), len(replayed))
+
+    def test_directory_is_private(self, spool_dir):
+        EventSpool(spool_dir)
+
+        assert os.stat(spool_dir).st_mode & 0o777 == 0o700
+
+
+API_COPY = Path(__file__).resolve().parents[2] / "api" / "app" / "spool.py"
+
+
+@pytest.mark.skipif(not API_COPY.exists(), reason="api-service sources not available")
+def test_api_service_copy_is_identical():
+    assert API_COPY.read_bytes() == Path(spool_module.__file__).read_bytes()
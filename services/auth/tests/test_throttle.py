@@ -0,0 +1,126 @@
+"""Tests for login throttling (GCRA buckets, memory and SQL backends)."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.throttle import LoginThrottle, MemoryBuckets, Rate, SQLBuckets, throttle_key
+
+# 3 at once, then one every 10s
+RATE = Rate(burst=3, per_minute=6)
+
+
+@pytest.fixture(params=["memory", "sql"])
+def buckets(request, db_engine):
+    if request.param == "memory":
+        return MemoryBuckets(max_keys=1000)
+    return SQLBuckets(db_engine)
+
+
+def hits(buckets, key, now, count):
+    return [buckets.hit(key, RATE, now) for _ in range(count)]
+
+
+class TestBuckets:
+    def test_burst_then_throttled(self, buckets):
+        key = throttle_key("ip", "10.0.0.1")
+
+        results = hits(buckets, key, 1000.0, 4)
+
+        assert results[:3] == [0.0, 0.0, 0.0]
+        assert results[3] == pytest.approx(10.0)
+
+    def test_refills_at_the_sustained_rate(self, buckets):
+        key = throttle_key("ip", "10.0.0.1")
+        hits(buckets, key, 1000.0, 3)
+
+        assert buckets.hit(key, RATE, 1005.0) == pytest.approx(5.0)
+        assert buckets.hit(key, RATE, 1010.0) == 0.0
+        assert buckets.hit(key, RATE, 1010.0) > 0
+
+    def test_throttled_attempts_do_not_extend_the_wait(self, buckets):
+        key = throttle_key("ip", "10.0.0.1")
+        hits(buckets, key, 1000.0, 3)
+
+        hits(buckets, key, 1001.0, 50)
+
+        assert buckets.hit(key, RATE, 1010.0) == 0.0
+
+    def test_keys_are_independent(self, buckets):
+        hits(buckets, throttle_key("ip", "10.0.0.1"), 1000.0, 3)
+
+        assert buckets.hit(throttle_key("ip", "10.0.0.2"), RATE, 1000.0) == 0.0
+        assert buckets.hit(throttle_key("email", "10.0.0.1"), RATE, 1000.0) == 0.0
+
+
+class TestMemoryBuckets:
+    def test_bounded_by_dropping_least_recently_used(self):
+        buckets = MemoryBuckets(max_keys=100)
+        first = throttle_key("ip", "first")
+        hits(buckets, first, 1000.0, 3)
+
+        for i in range(1000):
+            buckets.hit(throttle_key("ip", str(i)), RATE, 1000.0)
+
+        assert len(buckets) <= 100
+        assert buckets.evicted >= 900
+        # Forgotten, so it starts over with a full bucket
+        assert buckets.hit(first, RATE, 1000.0) == 0.0
+
+
+class TestSQLBuckets:
+    def test_prunes_expired_rows(self, db_engine):
+        from sqlalchemy import func, select
+        from app.models import ThrottleBucket
+
+        buckets = SQLBuckets(db_engine)
+        buckets.hit(throttle_key("ip", "old"), RATE, 1000.0)
+        buckets.hit(throttle_key("ip", "new"), RATE, 1000.0 + SQLBuckets.PRUNE_INTERVAL + 1)
+
+        with db_engine.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(ThrottleBucket)).scalar_one() == 1
+
+    def test_rejects_other_databases(self):
+        engine = MagicMock()
+        engine.dialect.name = "mysql"
+
+        with pytest.raises(ValueError):
+            SQLBuckets(engine)
+
+
+class TestLoginThrottle:
+    def make(self, buckets=None, ip=RATE, email=Rate(burst=2, per_minute=6)):
+        return LoginThrottle(buckets or MemoryBuckets(1000), ip_rate=ip, email_rate=email)
+
+    def test_account_throttled_across_ips(self):
+        throttle = self.make()
+
+        assert throttle.check("10.0.0.1", "victim@example.com", now=1000.0) is None
+        assert throttle.check("10.0.0.2", "victim@example.com", now=1000.0) is None
+
+        scope, wait = throttle.check("10.0.0.3", "victim@example.com", now=1000.0)
+        assert scope == "email" and wait == pytest.approx(10.0)
+        assert throttle.stats()["throttled_email"] == 1
+
+    def test_ip_throttled_before_counting_against_account(self):
+        throttle = self.make(email=Rate(burst=5, per_minute=6))
+        for i in range(3):
+            throttle.check("10.0.0.1", f"user{i}@example.com", now=1000.0)
+
+        assert throttle.check("10.0.0.1", "victim@example.com", now=1000.0)[0] == "ip"
+        # The victim's own bucket is untouched
+        for i in range(5):
+            assert throttle.check(f"10.0.1.{i}", "victim@example.com", now=1000.0) is None
+
+    def test_disabled_rate_is_skipped(self):
+        throttle = self.make(ip=Rate(burst=0, per_minute=6), email=Rate(burst=0, per_minute=6))
+
+        assert all(throttle.check("10.0.0.1", "a@example.com", now=1000.0) is None for _ in range(100))
+
+    def test_fails_open_when_backend_errors(self):
+        buckets = MagicMock()
+        buckets.hit.side_effect = RuntimeError("database is down")
+        throttle = self.make(buckets)
+
+        assert throttle.check("10.0.0.1", "a@example.com") is None
+        assert throttle.stats()["errors"] == 1
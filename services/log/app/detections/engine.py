@@ -1,15 +1,160 @@
+"""
+Detection engine.
+
+Rules from rules.json are compiled once into window groups: rules that count
+the same events, grouped by the same key, over the same window share a single
+window, so adding a rule on existing events adds no window update (or count
+query on the SQL backend) per event. A dispatch table keyed by event name
+routes each event straight to the groups that subscribe to it.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from . import brute_force, token_abuse, admin_probing
+
+from ..models import Alert
+from ..settings import settings
+from . import state
+from .rules import ThresholdRule, load_rules
+
+
+@dataclass(frozen=True)
+class WindowGroup:
+    id: str
+    events: frozenset[str]
+    group_by: str
+    window_seconds: int
+    rules: tuple[ThresholdRule, ...]
+
+
+def build_dispatch_table(subscribers) -> dict[str, tuple]:
+    """Map each event name to the subscribers listing it in their `events` set."""
+    table: dict[str, list] = {}
+    for subscriber in subscribers:
+        for event_name in sorted(subscriber.events):
+            table.setdefault(event_name, []).append(subscriber)
+    return {event_name: tuple(subs) for event_name, subs in table.items()}
+
+
+class CompiledRules:
+    def __init__(self, rules: list[ThresholdRule]):
+        self.rules = {rule.name: rule for rule in rules}
+
+        grouped: dict[tuple, list[ThresholdRule]] = {}
+        for rule in rules:
+            grouped.setdefault((rule.events, rule.group_by, rule.window_seconds), []).append(rule)
+
+        self.groups = [
+            WindowGroup(
+                id=f"{'|'.join(sorted(events))}/{group_by}/{window_seconds}",
+                events=events,
+                group_by=group_by,
+                window_seconds=window_seconds,
+                rules=tuple(members),
+            )
+            for (events, group_by, window_seconds), members in grouped.items()
+        ]
+        self.group_of = {rule.name: group for group in self.groups for rule in group.rules}
+
+        # High-volume events like login_success have no entry and skip detection
+        self.dispatch = build_dispatch_table(self.groups)
+
+
+RULES = CompiledRules(load_rules(settings))
+
+
+def activate_rules(rules: list[ThresholdRule]) -> CompiledRules:
+    """Swap in a new rule set (startup reload, tests)."""
+    global RULES
+    RULES = CompiledRules(rules)
+    return RULES
 
 
-# Register detection modules here
-DETECTION_RULES = [
-    brute_force,
-    token_abuse,
-    admin_probing,
-]
+def recent_alert_query(rule: ThresholdRule, ip: str, now_ts):
+    # Served by ix_alerts_rule_ip_created_at
+    return select(Alert.id).where(
+        Alert.rule == rule.name,
+        Alert.ip == ip,
+        Alert.created_at >= (now_ts - timedelta(seconds=rule.cooldown_seconds)),
+    ).limit(1)
+
+
+def _recently_alerted(db: Session, rule: ThresholdRule, ip: str, now_ts) -> bool:
+    return db.execute(recent_alert_query(rule, ip, now_ts)).first() is not None
+
+
+def _evaluate_group(db: Session, group: WindowGroup, rules, event) -> None:
+    active = [rule for rule in rules if not state.is_suppressed(db, rule.name, event.ip, event.ts)]
+
+    if not active and not state.uses_memory():
+        # Every rule is cooling down for this IP and there is no window to feed
+        return
+
+    stats = state.window_stats(db, group.id, group.events, event, group.window_seconds)
+
+    for rule in active:
+        if stats.count < rule.threshold:
+            continue
+
+        # The cooldowns know every alert this process committed, added in this
+        # transaction or loaded at startup.
+        # On the SQL backend other replicas may have alerted too, so check.
+        if not state.uses_memory() and _recently_alerted(db, rule, event.ip, event.ts):
+            continue
+
+        created_at = datetime.now(timezone.utc)
+        db.add(Alert(
+            rule=rule.name,
+            severity=rule.severity,
+            ip=event.ip,
+            window_seconds=rule.window_seconds,
+            threshold=rule.threshold,
+            count=stats.count,
+            first_seen=stats.first_seen,
+            last_seen=stats.last_seen,
+            meta={"note": rule.note},
+            created_at=created_at,
+        ))
+        state.suppress_after_commit(db, rule.name, event.ip, created_at + timedelta(seconds=rule.cooldown_seconds))
+
+
+def evaluate_rule(db: Session, rule_name: str, event) -> None:
+    """Evaluate a single rule, e.g. from the per-rule modules."""
+    rule = RULES.rules[rule_name]
+    if event.event not in rule.events:
+        return
+    _evaluate_group(db, RULES.group_of[rule_name], (rule,), event)
 
 
 def run_detection_pipeline(db: Session, event) -> None:
-    for rule in DETECTION_RULES:
-        rule.evaluate(db, event)
+    for group in RULES.dispatch.get(event.event, ()):
+        _evaluate_group(db, group, group.rules, event)
+
+
+def run_detection_pipeline_batch(db: Session, events) -> None:
+    """
+    Run detection over a batch of events that are already inserted.
+
+    Every event is evaluated, as if it had been ingested on its own. In-memory
+    windows must see every event anyway. On the SQL backend, evaluating only
+    the newest event per (event, ip) would miss a burst earlier in the batch
+    once the batch spans more than a rule window (a replayed spool, a stream);
+    a rule that has alerted is suppressed for the rest of the batch, so the
+    repeats stop costing queries after the first alert.
+    """
+    dispatch = RULES.dispatch
+    for event in events:
+        if event.event not in dispatch:
+            continue
+        run_detection_pipeline(db, event)
+        if db.new and not state.uses_memory():
+            # Make new alerts visible to the suppression checks of later events
+            db.flush()
+
+
+def warm_detection_state(db: Session, now_ts) -> None:
+    state.warm_suppression_cache(db, RULES.rules.values(), now_ts)
+    if state.uses_memory():
+        state.warm_window_store(db, RULES.groups, now_ts)
@@ -0,0 +1,114 @@
+"""
+Declarative threshold rules.
+
+Rules are loaded from a JSON file (rules.json next to this module unless
+DETECTION_RULES_PATH is set). Each rule fires when `threshold` events from
+`events` share the same `group_by` value within `window_seconds`, and then
+stays quiet for that key for `cooldown_seconds` (defaults to the window).
+
+A rule may name a `settings_prefix`; <PREFIX>_THRESHOLD and
+<PREFIX>_WINDOW_SECONDS settings then override the file, which keeps the
+existing environment variables working. They are validated like the file:
+a bad value fails at startup.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_RULES_PATH = Path(__file__).with_name("rules.json")
+
+SEVERITIES = {"low", "medium", "high", "critical"}
+
+# Alerts are stored and suppressed per IP, so that is the only grouping for now
+GROUP_BY_FIELDS = {"ip"}
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    name: str
+    events: frozenset[str]
+    group_by: str
+    window_seconds: int
+    threshold: int
+    severity: str
+    cooldown_seconds: int
+    note: str
+
+
+def _positive_int(spec: dict, field: str, name: str) -> int:
+    value = spec.get(field)
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise ValueError(f"Rule {name!r}: {field} must be a positive integer")
+    return value
+
+
+def _setting_override(settings, setting: str, default: int, name: str) -> int:
+    """The setting's value if it is set (validated like the file's), else default."""
+    value = getattr(settings, setting, None)
+    if value is None:
+        return default
+    return _positive_int({setting: value}, setting, name)
+
+
+def parse_rule(spec: dict, settings=None) -> ThresholdRule:
+    name = spec.get("name")
+    if not isinstance(name, str) or not name or len(name) > 64:
+        raise ValueError("Rule name must be a non-empty string of at most 64 characters")
+
+    events = spec.get("events")
+    if not isinstance(events, list) or not events or not all(isinstance(e, str) and e for e in events):
+        raise ValueError(f"Rule {name!r}: events must be a non-empty list of event names")
+
+    group_by = spec.get("group_by", "ip")
+    if group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"Rule {name!r}: group_by must be one of {sorted(GROUP_BY_FIELDS)}")
+
+    severity = spec.get("severity", "medium")
+    if severity not in SEVERITIES:
+        raise ValueError(f"Rule {name!r}: severity must be one of {sorted(SEVERITIES)}")
+
+    threshold = _positive_int(spec, "threshold", name)
+    window_seconds = _positive_int(spec, "window_seconds", name)
+
+    prefix = spec.get("settings_prefix")
+    if prefix and settings is not None:
+        threshold = _setting_override(settings, f"{prefix}_THRESHOLD", threshold, name)
+        window_seconds = _setting_override(settings, f"{prefix}_WINDOW_SECONDS", window_seconds, name)
+
+    cooldown_seconds = window_seconds
+    if "cooldown_seconds" in spec:
+        cooldown_seconds = _positive_int(spec, "cooldown_seconds", name)
+
+    return ThresholdRule(
+        name=name,
+        events=frozenset(events),
+        group_by=group_by,
+        window_seconds=window_seconds,
+        threshold=threshold,
+        severity=severity,
+        cooldown_seconds=cooldown_seconds,
+        note=spec.get("note", ""),
+    )
+
+
+def load_rules(settings=None, path: str | Path | None = None) -> list[ThresholdRule]:
+    """Load and validate the rule file. Raises ValueError on a malformed file."""
+    if path is None:
+        path = getattr(settings, "DETECTION_RULES_PATH", None) or DEFAULT_RULES_PATH
+
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+
+    specs = document.get("rules") if isinstance(document, dict) else None
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected an object with a 'rules' list")
+
+    rules = [parse_rule(spec, settings) for spec in specs]
+
+    names = [rule.name for rule in rules]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"{path}: duplicate rule names {sorted(duplicates)}")
+
+    return rules
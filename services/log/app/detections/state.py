@@ -0,0 +1,297 @@
+"""
+Sliding-window state for detection rules.
+
+With DETECTION_BACKEND="memory" (default) every window group keeps a
+per-(group, ip) window of event timestamps in process, so evaluating an event is O(1)
+amortized and issues no SQL. The window store is warmed from the events table
+on startup so a restart does not forget an attack in progress.
+
+DETECTION_BACKEND="sql" answers the same question from the events table
+instead. It is the fallback for multi-replica deployments (where each process
+would only see its own events) and the reference the memory backend is
+verified against.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event as orm_event, select, func
+from sqlalchemy.orm import Session
+
+from ..models import Event, Alert
+from ..settings import settings
+
+
+@dataclass(frozen=True)
+class WindowStats:
+    count: int
+    first_seen: datetime | None
+    last_seen: datetime | None
+
+
+def as_utc(ts: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _to_datetime(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class SlidingWindow:
+    """Sorted epoch timestamps of the events seen for one (window group, ip)."""
+
+    __slots__ = ("window_seconds", "timestamps")
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self.timestamps: deque[float] = deque()
+
+    @property
+    def newest(self) -> float | None:
+        return self.timestamps[-1] if self.timestamps else None
+
+    def add(self, ts: float) -> None:
+        timestamps = self.timestamps
+        if not timestamps or ts >= timestamps[-1]:
+            timestamps.append(ts)
+        else:
+            # Late event: rare, so the O(n) insert is fine
+            timestamps.insert(bisect_right(timestamps, ts), ts)
+
+        # Only drop what no in-window event can need any more
+        horizon = timestamps[-1] - self.window_seconds
+        while timestamps[0] < horizon:
+            timestamps.popleft()
+
+    def stats(self, now_ts: float) -> WindowStats:
+        timestamps = self.timestamps
+        start = now_ts - self.window_seconds
+
+        if timestamps and now_ts >= timestamps[-1] and timestamps[0] >= start:
+            # Common case: the newest event, and add() already evicted the rest
+            lo, hi = 0, len(timestamps)
+        else:
+            lo, hi = bisect_left(timestamps, start), bisect_right(timestamps, now_ts)
+
+        if lo >= hi:
+            return WindowStats(0, None, None)
+        return WindowStats(hi - lo, _to_datetime(timestamps[lo]), _to_datetime(timestamps[hi - 1]))
+
+
+class WindowStore:
+    """
+    Sliding windows keyed by (window group id, ip).
+
+    Windows are kept in least-recently-updated order so idle ones can be
+    swept from the front. Once max_keys is exceeded the least recently
+    updated windows are dropped even if they are not expired yet.
+    """
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: dict[tuple[str, str], SlidingWindow] = {}
+        self._lock = threading.Lock()
+        self._records = 0
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def record(self, window_id: str, ip: str, ts: datetime, window_seconds: int) -> WindowStats:
+        epoch = as_utc(ts).timestamp()
+        key = (window_id, ip)
+
+        with self._lock:
+            window = self._windows.pop(key, None)
+            if window is None:
+                window = SlidingWindow(window_seconds)
+            window.window_seconds = window_seconds
+            window.add(epoch)
+            self._windows[key] = window
+
+            self._records += 1
+            if self._records % self.SWEEP_EVERY == 0 or len(self._windows) > self.max_keys:
+                self._sweep(epoch)
+
+            return window.stats(epoch)
+
+    def seed(self, window_id: str, ip: str, timestamps: list[datetime], window_seconds: int) -> None:
+        with self._lock:
+            window = self._windows.pop((window_id, ip), None) or SlidingWindow(window_seconds)
+            for ts in timestamps:
+                window.add(as_utc(ts).timestamp())
+            self._windows[(window_id, ip)] = window
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+            self._records = 0
+
+    def _sweep(self, now_epoch: float) -> None:
+        windows = self._windows
+        for key in list(windows):
+            window = windows[key]
+            expired = window.newest is None or window.newest < now_epoch - window.window_seconds
+            if not expired and len(windows) <= self.max_keys:
+                break
+            del windows[key]
+
+
+class SuppressionCache:
+    """
+    Cooldown expiry per (rule, ip), taken from alerts as they are created.
+
+    Lets an event that cannot alert anyway skip the count and recent-alert
+    queries. Expired entries are swept as new ones are added.
+    """
+
+    SWEEP_EVERY = 256
+
+    def __init__(self):
+        self._until: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._added = 0
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def is_suppressed(self, rule: str, ip: str, ts: datetime) -> bool:
+        until = self._until.get((rule, ip))
+        return until is not None and as_utc(ts).timestamp() <= until
+
+    def remember(self, rule: str, ip: str, until: datetime) -> None:
+        until_epoch = as_utc(until).timestamp()
+        with self._lock:
+            key = (rule, ip)
+            if until_epoch > self._until.get(key, float("-inf")):
+                self._until[key] = until_epoch
+
+            self._added += 1
+            if self._added % self.SWEEP_EVERY == 0:
+                now_epoch = datetime.now(timezone.utc).timestamp()
+                self._until = {k: v for k, v in self._until.items() if v >= now_epoch}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._until.clear()
+            self._added = 0
+
+
+window_store = WindowStore(max_keys=settings.DETECTION_STATE_MAX_KEYS)
+suppression_cache = SuppressionCache()
+
+# Session.info key of the cooldowns of alerts added but not yet committed
+PENDING_SUPPRESSIONS = "pending_suppressions"
+
+
+def suppress_after_commit(db: Session, rule: str, ip: str, until: datetime) -> None:
+    """
+    Start a cooldown for an alert added to db, once db commits it.
+
+    Until then the cooldown only holds within db's transaction, so the rest
+    of the batch does not alert twice; a rollback drops it with the alert.
+    """
+    pending = db.info.setdefault(PENDING_SUPPRESSIONS, {})
+    key = (rule, ip)
+    if key not in pending or until > pending[key]:
+        pending[key] = until
+
+
+def is_suppressed(db: Session, rule: str, ip: str, ts: datetime) -> bool:
+    if suppression_cache.is_suppressed(rule, ip, ts):
+        return True
+    until = db.info.get(PENDING_SUPPRESSIONS, {}).get((rule, ip))
+    return until is not None and as_utc(ts) <= as_utc(until)
+
+
+@orm_event.listens_for(Session, "after_commit")
+def _remember_committed_suppressions(session: Session) -> None:
+    for (rule, ip), until in session.info.pop(PENDING_SUPPRESSIONS, {}).items():
+        suppression_cache.remember(rule, ip, until)
+
+
+@orm_event.listens_for(Session, "after_transaction_end")
+def _drop_uncommitted_suppressions(session: Session, transaction) -> None:
+    # After a commit the entries are gone already; otherwise the outermost
+    # transaction was rolled back or the session closed without committing
+    if transaction.parent is None:
+        session.info.pop(PENDING_SUPPRESSIONS, None)
+
+
+def uses_memory() -> bool:
+    return settings.DETECTION_BACKEND == "memory"
+
+
+def window_stats_query(events: set[str], ip: str, now_ts: datetime, window_seconds: int):
+    # Served by ix_events_event_ip_ts
+    window_start = now_ts - timedelta(seconds=window_seconds)
+    return select(func.count(), func.min(Event.ts), func.max(Event.ts)).where(
+        Event.event.in_(events),
+        Event.ip == ip,
+        Event.ts >= window_start,
+        Event.ts <= now_ts,
+    )
+
+
+def sql_window_stats(db: Session, events: set[str], ip: str, now_ts: datetime, window_seconds: int) -> WindowStats:
+    q = window_stats_query(events, ip, now_ts, window_seconds)
+    count, first_seen, last_seen = db.execute(q).one()
+    return WindowStats(count, first_seen, last_seen)
+
+
+def window_stats(db: Session, window_id: str, events: set[str], event, window_seconds: int) -> WindowStats:
+    """
+    Record `event` and return the count and bounds of its window ending at it.
+
+    The SQL backend assumes the event is already inserted, like the rules
+    always have; the memory backend records it itself.
+    """
+    if uses_memory():
+        return window_store.record(window_id, event.ip, event.ts, window_seconds)
+    return sql_window_stats(db, events, event.ip, event.ts, window_seconds)
+
+
+def recent_alerts_query(cooldowns: dict[str, int], now_ts: datetime):
+    # Served by ix_alerts_created_at
+    return select(Alert.rule, Alert.ip, Alert.created_at).where(
+        Alert.rule.in_(cooldowns),
+        Alert.created_at >= now_ts - timedelta(seconds=max(cooldowns.values())),
+    )
+
+
+def warm_suppression_cache(db: Session, rules, now_ts: datetime) -> None:
+    """Load the cooldowns of recent alerts for the given rules."""
+    cooldowns = {rule.name: rule.cooldown_seconds for rule in rules}
+    if not cooldowns:
+        return
+
+    q = recent_alerts_query(cooldowns, now_ts)
+    for rule, ip, created_at in db.execute(q):
+        suppression_cache.remember(rule, ip, as_utc(created_at) + timedelta(seconds=cooldowns[rule]))
+
+
+def open_windows_query(events: set[str], now_ts: datetime, window_seconds: int):
+    # Served by ix_events_event_ts
+    return select(Event.ip, Event.ts).where(
+        Event.event.in_(events),
+        Event.ts >= now_ts - timedelta(seconds=window_seconds),
+    ).order_by(Event.ts)
+
+
+def warm_window_store(db: Session, groups, now_ts: datetime) -> None:
+    """Load the still-open windows of every window group from the events table."""
+    for group in groups:
+        window_seconds = group.window_seconds
+        q = open_windows_query(group.events, now_ts, window_seconds)
+
+        by_ip: dict[str, list[datetime]] = {}
+        for ip, ts in db.execute(q):
+            by_ip.setdefault(ip, []).append(ts)
+
+        for ip, timestamps in by_ip.items():
+            window_store.seed(group.id, ip, timestamps, window_seconds)
@@ -0,0 +1,86 @@
+"""
+Background detection for INGEST_MODE="deferred".
+
+Ingest commits the events and hands them to this worker, so the HTTP response
+only waits for the insert. The worker drains the queue in batches, runs the
+detection pipeline in its own session and commits the resulting alerts.
+"""
+
+import logging
+import queue
+import threading
+
+from .engine import run_detection_pipeline_batch
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionWorker:
+    def __init__(self, session_factory, max_queue: int, batch_size: int):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="detection-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the queued events, then stop."""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, events) -> bool:
+        """
+        Queue events for detection. Returns False when the worker is not
+        running or the queue is full; the caller must then detect inline.
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(list(events))
+        except queue.Full:
+            return False
+        return True
+
+    def _take_batch(self) -> list:
+        events = self._queue.get(timeout=0.2)
+        while len(events) < self.batch_size:
+            try:
+                events.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                events = self._take_batch()
+            except queue.Empty:
+                continue
+
+            db = self.session_factory()
+            try:
+                run_detection_pipeline_batch(db, events)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Deferred detection failed for %d events", len(events))
+            finally:
+                db.close()
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy import select, func
+import time
+from contextlib import asynccontextmanager
+from typing import Any
+
+from fastapi import FastAPI, Depends, HTTPException, Body, Request
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from sqlalchemy import select, func, insert
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone, timedelta
 
-from .db import Base, engine, get_db
+from .db import SessionLocal, engine, get_db
+from . import migrations
+from .partitions import PartitionMaintainer
 from .models import Event, Alert
-from .schemas import IngestEvent, IngestResponse, AlertOut, AlertUpdate
-from .detections.engine import run_detection_pipeline
-
-app = FastAPI(title="log-service")
-
-Base.metadata.create_all(bind=engine)
+from .schemas import (
+    IngestEvent,
+    IngestResponse,
+    IngestResult,
+    IngestBatchResponse,
+    IngestLineError,
+    IngestStreamResponse,
+    AlertOut,
+    AlertUpdate,
+)
+from .settings import settings
+from .ndjson import LineSplitter
+from .detections.engine import run_detection_pipeline_batch, warm_detection_state
+from .detections.worker import DetectionWorker
 
 
 # TODO : There's another now() function in app/app/log_client.py. 
@@ -19,6 +36,44 @@ def utcnow():
     return datetime.now(timezone.utc)
 
 
+detection_worker = DetectionWorker(
+    SessionLocal,
+    max_queue=settings.DETECTION_QUEUE_MAX_BATCHES,
+    batch_size=settings.DETECTION_WORKER_BATCH_EVENTS,
+)
+
+partition_maintainer = PartitionMaintainer(
+    engine,
+    settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    interval=settings.EVENTS_PARTITION_INTERVAL,
+    ahead=settings.EVENTS_PARTITIONS_AHEAD,
+    retention_days=settings.EVENTS_RETENTION_DAYS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upcoming partitions exist before the first event arrives
+    partition_maintainer.run_once()
+    partition_maintainer.start()
+
+    # Pick up attacks that were in progress before a restart
+    with SessionLocal() as db:
+        warm_detection_state(db, utcnow())
+
+    if settings.INGEST_MODE == "deferred":
+        detection_worker.start()
+    yield
+    detection_worker.stop()
+    partition_maintainer.stop()
+
+
+app = FastAPI(title="log-service", lifespan=lifespan)
+
+if settings.MIGRATE_ON_STARTUP:
+    migrations.upgrade(engine)
+
+
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
@@ -76,28 +131,169 @@ def detect_bruteforce_login_failed(db: Session, *, ip: str, now_ts):
     db.add(alert)
 
 
-@app.post("/ingest", response_model=IngestResponse)
-def ingest(payload: IngestEvent, db: Session = Depends(get_db)):
-    ev = Event(
-        v=payload.v,
-        ts=payload.ts,
-        service=payload.service,
-        event=payload.event,
-        ip=payload.ip,
-        path=payload.path,
-        user_id=payload.user_id,
-        meta=payload.meta,
+def to_event_row(payload: IngestEvent) -> dict:
+    ts = payload.ts
+    if ts.tzinfo is None:
+        # Producers are expected to send UTC; treat naive timestamps as such
+        ts = ts.replace(tzinfo=timezone.utc)
+
+    return {
+        "v": payload.v,
+        "ts": ts,
+        "service": payload.service,
+        "event": payload.event,
+        "ip": payload.ip,
+        "path": payload.path,
+        "user_id": payload.user_id,
+        "meta": payload.meta,
+    }
+
+
+def to_event(payload: IngestEvent) -> Event:
+    return Event(**to_event_row(payload))
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'event'}: {err['msg']}"
+        for err in exc.errors()
     )
-    db.add(ev)
-    db.commit()
 
-    # Run detection pipeline
-    run_detection_pipeline(db, ev)
+
+def store_events(db: Session, payloads: list[IngestEvent]) -> int:
+    """
+    Insert events in one multi-row statement and run detection over them.
+
+    In transactional mode the events and any alerts they cause are committed
+    together. In deferred mode the events are committed first and detection
+    is queued for the background worker, falling back to inline detection
+    when the queue is full.
+    """
+    if not payloads:
+        return 0
+
+    rows = [to_event_row(payload) for payload in payloads]
+    db.execute(insert(Event), rows)
+
+    # Detection only reads event/ip/ts, so transient objects are enough
+    events = [Event(**row) for row in rows]
+
+    if settings.INGEST_MODE == "deferred":
+        db.commit()
+        if detection_worker.submit(events):
+            return len(rows)
+
+    run_detection_pipeline_batch(db, events)
     db.commit()
+    return len(rows)
 
+
+@app.post("/ingest", response_model=IngestResponse)
+def ingest(payload: IngestEvent, db: Session = Depends(get_db)):
+    store_events(db, [payload])
     return IngestResponse(stored=True)
 
 
+@app.post("/ingest/batch", response_model=IngestBatchResponse)
+def ingest_batch(payload: list[Any] = Body(...), db: Session = Depends(get_db)):
+    if len(payload) > settings.INGEST_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.INGEST_BATCH_MAX_EVENTS} events",
+        )
+
+    # Validate each event on its own so one bad event doesn't reject the batch
+    results: list[IngestResult] = []
+    valid: list[IngestEvent] = []
+    for index, item in enumerate(payload):
+        try:
+            valid.append(IngestEvent.model_validate(item))
+        except ValidationError as exc:
+            results.append(IngestResult(index=index, stored=False, error=format_validation_error(exc)))
+        else:
+            results.append(IngestResult(index=index, stored=True))
+
+    store_events(db, valid)
+
+    accepted = len(valid)
+    return IngestBatchResponse(
+        accepted=accepted,
+        rejected=len(payload) - accepted,
+        results=results,
+    )
+
+
+@app.post("/ingest/stream", response_model=IngestStreamResponse)
+async def ingest_stream(request: Request, db: Session = Depends(get_db)):
+    """
+    Ingest a chunked NDJSON body, one event per line.
+
+    Lines are parsed as bytes arrive and stored in micro-batches of at most
+    INGEST_STREAM_FLUSH_EVENTS, so memory does not grow with stream length.
+    Invalid lines are reported (up to INGEST_STREAM_MAX_ERRORS) and skipped.
+    """
+    splitter = LineSplitter(settings.INGEST_STREAM_MAX_LINE_BYTES)
+    pending: list[IngestEvent] = []
+    errors: list[IngestLineError] = []
+    accepted = 0
+    rejected = 0
+    line_no = 0
+    last_flush = time.monotonic()
+
+    def handle(line: bytes | None) -> None:
+        nonlocal line_no, rejected
+        line_no += 1
+
+        if line is None:
+            error = f"line exceeds {settings.INGEST_STREAM_MAX_LINE_BYTES} bytes"
+        elif not line.strip():
+            return
+        else:
+            try:
+                pending.append(IngestEvent.model_validate_json(line))
+                return
+            except ValidationError as exc:
+                error = format_validation_error(exc)
+
+        rejected += 1
+        if len(errors) < settings.INGEST_STREAM_MAX_ERRORS:
+            errors.append(IngestLineError(line=line_no, error=error))
+
+    async def flush() -> None:
+        nonlocal accepted, last_flush
+        batch = pending.copy()
+        pending.clear()
+        last_flush = time.monotonic()
+        accepted += await run_in_threadpool(store_events, db, batch)
+
+    try:
+        async for chunk in request.stream():
+            for line in splitter.feed(chunk):
+                handle(line)
+                if len(pending) >= settings.INGEST_STREAM_FLUSH_EVENTS:
+                    await flush()
+
+            # Slow producers still get their events stored promptly
+            if pending and time.monotonic() - last_flush >= settings.INGEST_STREAM_FLUSH_SECONDS:
+                await flush()
+    except ClientDisconnect:
+        # Keep what was fully received; there is nobody left to answer
+        pass
+    else:
+        for line in splitter.close():
+            handle(line)
+
+    if pending:
+        await flush()
+
+    return IngestStreamResponse(
+        accepted=accepted,
+        rejected=rejected,
+        errors=errors,
+        errors_truncated=rejected > len(errors),
+    )
+
+
 @app.get("/alerts", response_model=list[AlertOut])
 def list_alerts(db: Session = Depends(get_db)):
     q = select(Alert).order_by(Alert.id.desc()).limit(50)
@@ -0,0 +1,114 @@
+"""
+Schema migrations for the log service.
+
+Each migration is a module in this package with a VERSION, a DESCRIPTION and
+an `upgrade(conn)` function, listed in MIGRATIONS in order. Applied versions
+are recorded in the `schema_migrations` table, so `upgrade()` only runs what
+is missing and is safe to call on every startup.
+
+Migrations run in their own transaction unless the module sets
+TRANSACTIONAL = False (e.g. Postgres CREATE INDEX CONCURRENTLY, which cannot
+run inside one); those are written to be re-runnable instead.
+
+  python -m app.migrations            # apply pending migrations
+  python -m app.migrations current    # print the applied versions
+"""
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection, Engine
+
+from . import (
+    m0001_initial_schema,
+    m0002_detection_indexes,
+    m0003_partition_events,
+    m0004_alerts_created_at_index,
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_detection_indexes,
+    m0003_partition_events,
+    m0004_alerts_created_at_index,
+]
+
+# Arbitrary key for pg_advisory_lock so replicas starting together migrate once
+ADVISORY_LOCK_KEY = 0x5E17_0001
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(256), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@contextmanager
+def _migration_lock(conn: Connection):
+    if conn.dialect.name != "postgresql":
+        yield
+        return
+
+    conn.exec_driver_sql(f"SELECT pg_advisory_lock({ADVISORY_LOCK_KEY})")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        conn.exec_driver_sql(f"SELECT pg_advisory_unlock({ADVISORY_LOCK_KEY})")
+        conn.commit()
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    versions = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    conn.commit()
+    return versions
+
+
+def _record(conn: Connection, migration) -> None:
+    conn.execute(schema_migrations.insert().values(
+        version=migration.VERSION,
+        description=migration.DESCRIPTION,
+        applied_at=datetime.now(timezone.utc),
+    ))
+
+
+def _apply(conn: Connection, migration) -> None:
+    if getattr(migration, "TRANSACTIONAL", True):
+        with conn.begin():
+            migration.upgrade(conn)
+            _record(conn, migration)
+        return
+
+    isolation_level = conn.default_isolation_level
+    conn.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        migration.upgrade(conn)
+    finally:
+        # Ends the (no-op) autobegun transaction so the level can be restored
+        conn.commit()
+        conn.execution_options(isolation_level=isolation_level)
+    with conn.begin():
+        _record(conn, migration)
+
+
+def upgrade(engine: Engine) -> list[int]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    applied = []
+    with engine.connect() as conn:
+        with _migration_lock(conn):
+            done = applied_versions(conn)
+            for migration in MIGRATIONS:
+                if migration.VERSION in done:
+                    continue
+                logger.info("Applying migration %04d: %s", migration.VERSION, migration.DESCRIPTION)
+                _apply(conn, migration)
+                applied.append(migration.VERSION)
+    return applied
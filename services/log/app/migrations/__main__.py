@@ -0,0 +1,27 @@
+import sys
+
+from ..db import engine
+from . import MIGRATIONS, applied_versions, upgrade
+
+
+def main(argv: list[str]) -> int:
+    command = argv[0] if argv else "upgrade"
+
+    if command == "upgrade":
+        applied = upgrade(engine)
+        print(f"applied: {', '.join(f'{v:04d}' for v in applied) or 'nothing, already up to date'}")
+        return 0
+
+    if command == "current":
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+        for migration in MIGRATIONS:
+            mark = "x" if migration.VERSION in done else " "
+            print(f"[{mark}] {migration.VERSION:04d} {migration.DESCRIPTION}")
+        return 0
+
+    print(f"unknown command {command!r} (expected: upgrade, current)", file=sys.stderr)
+    return 2
+
+
+raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,56 @@
+"""
+Events and alerts tables as they were created by Base.metadata.create_all.
+
+Tables are created with checkfirst, so databases that predate migrations are
+adopted as-is.
+"""
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "events and alerts tables"
+
+metadata = MetaData()
+
+Table(
+    "events",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("v", Integer, nullable=False),
+    Column("ts", DateTime(timezone=True), nullable=False),
+    Column("service", String(64), nullable=False),
+    Column("event", String(64), nullable=False),
+    Column("ip", String(64), nullable=False),
+    Column("path", String(256), nullable=False),
+    Column("user_id", String(64), nullable=True),
+    Column("meta", JSONB, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+Table(
+    "alerts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("rule", String(64), nullable=False),
+    Column("severity", String(16), nullable=False),
+    Column("ip", String(64), nullable=False),
+    Column("window_seconds", Integer, nullable=False),
+    Column("threshold", Integer, nullable=False),
+    Column("count", Integer, nullable=False),
+    Column("first_seen", DateTime(timezone=True), nullable=False),
+    Column("last_seen", DateTime(timezone=True), nullable=False),
+    Column("meta", JSONB, nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("acknowledged_at", DateTime(timezone=True), nullable=True),
+    Column("acknowledged_by", String(128), nullable=True),
+    Column("closed_at", DateTime(timezone=True), nullable=True),
+    Column("closed_by", String(128), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
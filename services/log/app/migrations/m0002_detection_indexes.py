@@ -0,0 +1,68 @@
+"""
+Indexes for the detection access paths.
+
+- ix_events_event_ip_ts: window counts (event IN ..., ip = ?, ts range);
+  covers count/min/max, so Postgres answers them with an index-only scan.
+- ix_events_event_ts: window warm-up on startup (event IN ..., ts >= ?),
+  with ip included on Postgres.
+- ix_alerts_rule_ip_created_at: cooldown checks (rule, ip, created_at >= ?).
+
+Postgres builds them CONCURRENTLY so ingest keeps writing to a large events
+table meanwhile. That cannot run in a transaction, so the migration is
+re-runnable instead: IF NOT EXISTS, and an index left INVALID by an
+interrupted concurrent build is dropped and built again.
+"""
+
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+VERSION = 2
+DESCRIPTION = "detection indexes on events and alerts"
+TRANSACTIONAL = False
+
+metadata = MetaData()
+
+events = Table(
+    "events",
+    metadata,
+    Column("event", String(64)),
+    Column("ip", String(64)),
+    Column("ts", DateTime(timezone=True)),
+)
+
+alerts = Table(
+    "alerts",
+    metadata,
+    Column("rule", String(64)),
+    Column("ip", String(64)),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+INDEXES = [
+    Index("ix_events_event_ip_ts", events.c.event, events.c.ip, events.c.ts, postgresql_concurrently=True),
+    Index("ix_events_event_ts", events.c.event, events.c.ts, postgresql_include=["ip"], postgresql_concurrently=True),
+    Index(
+        "ix_alerts_rule_ip_created_at",
+        alerts.c.rule,
+        alerts.c.ip,
+        alerts.c.created_at,
+        postgresql_concurrently=True,
+    ),
+]
+
+
+def _drop_if_invalid(conn: Connection, name: str) -> None:
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        conn.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def upgrade(conn: Connection) -> None:
+    for index in INDEXES:
+        if conn.dialect.name == "postgresql":
+            _drop_if_invalid(conn, index.name)
+        conn.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,55 @@
+"""
+Range-partition events by ts (Postgres only; a no-op elsewhere).
+
+The existing table is renamed, a partitioned `events` is created with the
+same columns and id sequence, and the rows are copied over. A partitioned
+table's primary key must contain the partition key, so it becomes (id, ts);
+ids still come from the same sequence and stay unique. Rows older than the
+first partition go to events_default, where retention DELETEs them.
+
+The copy runs in the migration's transaction, so on a large table expect
+ingest to block for its duration.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .. import partitions
+from ..settings import settings
+
+VERSION = 3
+DESCRIPTION = "partition events by ts"
+
+
+def upgrade(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql" or partitions.is_partitioned(conn):
+        return
+
+    for statement in (
+        "ALTER TABLE events RENAME TO events_unpartitioned",
+        "ALTER TABLE events_unpartitioned RENAME CONSTRAINT events_pkey TO events_unpartitioned_pkey",
+        "ALTER INDEX IF EXISTS ix_events_event_ip_ts RENAME TO ix_events_unpartitioned_event_ip_ts",
+        "ALTER INDEX IF EXISTS ix_events_event_ts RENAME TO ix_events_unpartitioned_event_ts",
+        # Keep the id sequence when the old table is dropped
+        "ALTER SEQUENCE events_id_seq OWNED BY NONE",
+        "CREATE TABLE events (LIKE events_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (ts)",
+        "ALTER TABLE events ADD PRIMARY KEY (id, ts)",
+        "ALTER SEQUENCE events_id_seq OWNED BY events.id",
+        f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF events DEFAULT",
+    ):
+        conn.execute(text(statement))
+
+    interval = settings.EVENTS_PARTITION_INTERVAL
+    now = datetime.now(timezone.utc)
+    step = partitions.INTERVALS[interval]
+    until = partitions.bucket_start(now, interval) + step * (settings.EVENTS_PARTITIONS_AHEAD + 1)
+    partitions.ensure_partitions(conn, interval, now, until)
+
+    conn.execute(text("INSERT INTO events SELECT * FROM events_unpartitioned"))
+    conn.execute(text("DROP TABLE events_unpartitioned"))
+
+    # Created on the parent, so every partition (current and future) gets them
+    conn.execute(text("CREATE INDEX ix_events_event_ip_ts ON events (event, ip, ts)"))
+    conn.execute(text("CREATE INDEX ix_events_event_ts ON events (event, ts) INCLUDE (ip)"))
@@ -0,0 +1,25 @@
+"""
+Index alerts by created_at for the cooldown warm-up on startup
+(rule IN ..., created_at >= ?), which ix_alerts_rule_ip_created_at cannot
+serve because ip sits between the two columns.
+"""
+
+from sqlalchemy import Column, DateTime, Index, MetaData, Table
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from .m0002_detection_indexes import _drop_if_invalid
+
+VERSION = 4
+DESCRIPTION = "alerts created_at index"
+TRANSACTIONAL = False
+
+alerts = Table("alerts", MetaData(), Column("created_at", DateTime(timezone=True)))
+
+INDEX = Index("ix_alerts_created_at", alerts.c.created_at, postgresql_concurrently=True)
+
+
+def upgrade(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        _drop_if_invalid(conn, INDEX.name)
+    conn.execute(CreateIndex(INDEX, if_not_exists=True))
@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, func, Integer
+from sqlalchemy import String, DateTime, func, Integer, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from .db import Base
@@ -6,6 +6,12 @@ from .db import Base
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Detection window counts: event IN (...) AND ip = ? AND ts BETWEEN ? AND ?
+        Index("ix_events_event_ip_ts", "event", "ip", "ts"),
+        # Window warm-up on startup: event IN (...) AND ts >= ? ORDER BY ts
+        Index("ix_events_event_ts", "event", "ts", postgresql_include=["ip"]),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     v: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
@@ -26,6 +32,12 @@ class Event(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        # Cooldown checks: rule = ? AND ip = ? AND created_at >= ?
+        Index("ix_alerts_rule_ip_created_at", "rule", "ip", "created_at"),
+        # Cooldown warm-up on startup: rule IN (...) AND created_at >= ?
+        Index("ix_alerts_created_at", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     rule: Mapped[str] = mapped_column(String(64), nullable=False)  # e.g., brute_force_login
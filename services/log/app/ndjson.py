@@ -0,0 +1,54 @@
+"""
+Incremental newline-delimited JSON splitting for streamed ingest.
+"""
+
+from collections.abc import Iterator
+
+
+class LineSplitter:
+    """
+    Split a byte stream into lines as chunks arrive.
+
+    At most one partial line is buffered. A line longer than max_line_bytes is
+    discarded up to its newline and reported as None, so a client that never
+    sends a newline cannot grow the buffer without bound.
+    """
+
+    def __init__(self, max_line_bytes: int):
+        self.max_line_bytes = max_line_bytes
+        self._buf = bytearray()
+        self._oversized = False
+
+    def feed(self, chunk: bytes) -> Iterator[bytes | None]:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                self._append(chunk[start:])
+                return
+
+            self._append(chunk[start:end])
+            yield self._take()
+            start = end + 1
+
+    def close(self) -> Iterator[bytes | None]:
+        # A final line without a trailing newline still counts
+        if self._buf or self._oversized:
+            yield self._take()
+
+    def _append(self, data: bytes) -> None:
+        if self._oversized or not data:
+            return
+        if len(self._buf) + len(data) > self.max_line_bytes:
+            self._buf.clear()
+            self._oversized = True
+            return
+        self._buf += data
+
+    def _take(self) -> bytes | None:
+        if self._oversized:
+            self._oversized = False
+            return None
+        line = bytes(self._buf)
+        self._buf.clear()
+        return line
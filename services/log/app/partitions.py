@@ -0,0 +1,228 @@
+"""
+Time partitioning and retention of the events table.
+
+On Postgres `events` is range-partitioned by `ts` (migration 0003) into
+daily or hourly partitions named events_pYYYYMMDD[HH], plus events_default
+for rows outside every partition. Maintenance keeps EVENTS_PARTITIONS_AHEAD
+partitions ready past the current one and drops whole partitions once they
+are older than EVENTS_RETENTION_DAYS, instead of DELETE-ing rows. Detection
+only looks at the last few minutes, so its queries are pruned to the newest
+partition.
+
+Other databases (SQLite in tests and benchmarks) have no partitions; there
+retention falls back to a DELETE.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = {
+    "daily": timedelta(days=1),
+    "hourly": timedelta(hours=1),
+}
+
+DEFAULT_PARTITION = "events_default"
+
+# Arbitrary key for pg_try_advisory_xact_lock so only one replica maintains at a time
+ADVISORY_LOCK_KEY = 0x5E17_0002
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class MaintenanceResult:
+    created: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+    deleted_rows: int = 0
+
+
+def bucket_start(ts: datetime, interval: str) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    if interval == "hourly":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    return f"events_p{start:%Y%m%d%H}" if interval == "hourly" else f"events_p{start:%Y%m%d}"
+
+
+def parse_bounds(expr: str) -> tuple[datetime, datetime] | None:
+    """Parse pg_get_expr(relpartbound); None for the default partition."""
+    match = _BOUND_RE.search(expr)
+    if match is None:
+        return None
+    start, end = (datetime.fromisoformat(value) for value in match.groups())
+    return start, end
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('events')")).scalar()
+    return relkind == "p"
+
+
+def list_partitions(conn: Connection) -> list[Partition]:
+    """Range partitions of events, oldest first (the default partition is not listed)."""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('events')"
+    ))
+    partitions = []
+    for name, expr in rows:
+        bounds = parse_bounds(expr)
+        if bounds is not None:
+            partitions.append(Partition(name, *bounds))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def _create_partition(conn: Connection, name: str, start: datetime, end: datetime) -> None:
+    bounds = {"start": start, "end": end}
+
+    # Rows that landed in the default partition for this range would make
+    # CREATE ... PARTITION OF fail, so move them over.
+    stray = conn.execute(
+        text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE ts >= :start AND ts < :end LIMIT 1"), bounds
+    ).first()
+    if stray:
+        conn.execute(text("CREATE TEMP TABLE events_moving (LIKE events) ON COMMIT DROP"))
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE ts >= :start AND ts < :end RETURNING *) "
+            "INSERT INTO events_moving SELECT * FROM moved"
+        ), bounds)
+
+    conn.execute(text(
+        f'CREATE TABLE "{name}" PARTITION OF events '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+    if stray:
+        conn.execute(text("INSERT INTO events SELECT * FROM events_moving"))
+        conn.execute(text("DROP TABLE events_moving"))
+
+
+def ensure_partitions(conn: Connection, interval: str, since: datetime, until: datetime) -> list[str]:
+    """Create the missing partitions covering [since, until). Returns their names."""
+    existing = list_partitions(conn)
+    step = INTERVALS[interval]
+    created = []
+
+    start = bucket_start(since, interval)
+    while start < until:
+        end = start + step
+        # After switching interval, buckets overlapping old partitions are already covered
+        if not any(p.start < end and start < p.end for p in existing):
+            name = partition_name(start, interval)
+            _create_partition(conn, name, start, end)
+            created.append(name)
+        start = end
+    return created
+
+
+def drop_expired_partitions(conn: Connection, cutoff: datetime) -> list[str]:
+    """Drop the partitions that hold nothing newer than cutoff. Returns their names."""
+    dropped = []
+    for partition in list_partitions(conn):
+        if partition.end > cutoff:
+            break
+        conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        dropped.append(partition.name)
+    return dropped
+
+
+def maintain(
+    engine: Engine,
+    interval: str,
+    ahead: int,
+    retention_days: int | None,
+    now: datetime | None = None,
+) -> MaintenanceResult:
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=retention_days) if retention_days else None
+    result = MaintenanceResult()
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            if cutoff is not None:
+                result.deleted_rows = conn.execute(delete(Event).where(Event.ts < cutoff)).rowcount
+            return result
+
+        if not conn.execute(text(f"SELECT pg_try_advisory_xact_lock({ADVISORY_LOCK_KEY})")).scalar():
+            # Another replica is on it
+            return result
+
+        until = bucket_start(now, interval) + INTERVALS[interval] * (ahead + 1)
+        result.created = ensure_partitions(conn, interval, now, until)
+        if cutoff is not None:
+            result.dropped = drop_expired_partitions(conn, cutoff)
+            # Whatever old rows ended up outside the partitions
+            result.deleted_rows = conn.execute(
+                text(f"DELETE FROM {DEFAULT_PARTITION} WHERE ts < :cutoff"), {"cutoff": cutoff}
+            ).rowcount
+
+    return result
+
+
+class PartitionMaintainer:
+    """Runs maintain() on startup and then every interval_seconds in a background thread."""
+
+    def __init__(self, engine: Engine, interval_seconds: float, **options):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.options = options
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(self) -> MaintenanceResult | None:
+        try:
+            result = maintain(self.engine, **self.options)
+        except Exception:
+            logger.exception("Events partition maintenance failed")
+            return None
+        if result.created or result.dropped or result.deleted_rows:
+            logger.info(
+                "Events partitions: created %s, dropped %s, deleted %d rows",
+                result.created, result.dropped, result.deleted_rows,
+            )
+        return result
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval_seconds):
+            self.run_once()
@@ -18,6 +18,30 @@ class IngestResponse(BaseModel):
     stored: bool = True
 
 
+class IngestResult(BaseModel):
+    index: int
+    stored: bool
+    error: str | None = None
+
+
+class IngestBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: list[IngestResult]
+
+
+class IngestLineError(BaseModel):
+    line: int
+    error: str
+
+
+class IngestStreamResponse(BaseModel):
+    accepted: int
+    rejected: int
+    errors: list[IngestLineError]
+    errors_truncated: bool = False
+
+
 class AlertOut(BaseModel):
     id: int
     rule: str
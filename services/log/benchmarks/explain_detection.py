@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Seed a large events table and EXPLAIN every detection query against it.
+
+Usage:
+  poetry run python benchmarks/explain_detection.py --database-url postgresql+psycopg://...
+  poetry run python benchmarks/explain_detection.py --database-url ... --events 10000000 --reseed
+  poetry run python benchmarks/explain_detection.py --events 200000   # temp SQLite file
+
+Notes:
+- Migrates the database first, so the indexes under test are the ones the
+  migrations create. Seeding is skipped when the table already holds
+  --events rows; --reseed truncates and seeds again (tables are wiped!).
+- Seeding runs server-side (generate_series on Postgres, a recursive CTE on
+  SQLite) in chunks, followed by ANALYZE. 10M events take a few minutes on
+  Postgres.
+- Postgres runs EXPLAIN (ANALYZE, BUFFERS); SQLite only has
+  EXPLAIN QUERY PLAN. Each detection query must use its index; the exit
+  status is 1 if any does not.
+- On a partitioned events table, partitions are created for the seeded
+  days first; the plans then also show pruning to the newest partition.
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CHUNK = 1_000_000
+
+# Rough production mix: successful logins dominate, detection events are the tail
+EVENT_MIX = [
+    (0.60, "login_success"),
+    (0.75, "login_failed"),
+    (0.85, "invalid_token"),
+    (0.90, "invalid_token_claims"),
+    (0.93, "missing_token"),
+    (0.96, "unauthorized_admin_access"),
+    (1.00, "signup"),
+]
+
+PG_EVENTS_SQL = """
+INSERT INTO events (v, ts, service, event, ip, path, user_id, meta)
+SELECT 1,
+       now() - random() * make_interval(days => CAST(:days AS integer)),
+       'api',
+       CASE {event_case} END,
+       '10.' || (h / 65536) || '.' || (h / 256 % 256) || '.' || (h % 256),
+       '/login',
+       NULL,
+       '{{}}'::jsonb
+FROM (
+    SELECT (i * 2654435761) % :ips AS h, random() AS r
+    FROM generate_series(CAST(:start AS bigint), CAST(:stop AS bigint)) AS i
+) s
+"""
+
+SQLITE_EVENTS_SQL = """
+WITH RECURSIVE seq(i) AS (SELECT :start UNION ALL SELECT i + 1 FROM seq WHERE i < :stop)
+INSERT INTO events (v, ts, service, event, ip, path, user_id, meta, created_at)
+SELECT 1,
+       datetime('now', '-' || (abs(random()) % (:days * 86400)) || ' seconds'),
+       'api',
+       CASE {event_case} END,
+       '10.' || (h / 65536) || '.' || (h / 256 % 256) || '.' || (h % 256),
+       '/login',
+       NULL,
+       '{{}}',
+       datetime('now')
+FROM (SELECT (i * 2654435761) % :ips AS h, (abs(random()) % 1000000) / 1000000.0 AS r FROM seq)
+"""
+
+PG_ALERTS_SQL = """
+INSERT INTO alerts (rule, severity, ip, window_seconds, threshold, count, first_seen, last_seen, meta, status,
+                    created_at, updated_at)
+SELECT (ARRAY['brute_force_login', 'invalid_token_burst', 'admin_probing'])[1 + i % 3],
+       'medium',
+       '10.' || (h / 65536) || '.' || (h / 256 % 256) || '.' || (h % 256),
+       120, 5, 5, t, t, '{}'::jsonb, 'open', t, t
+FROM (
+    SELECT i, (i * 40503) % :ips AS h, now() - random() * make_interval(days => CAST(:days AS integer)) AS t
+    FROM generate_series(1, CAST(:count AS bigint)) AS i
+) s
+"""
+
+SQLITE_ALERTS_SQL = """
+WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < :count)
+INSERT INTO alerts (rule, severity, ip, window_seconds, threshold, count, first_seen, last_seen, meta, status,
+                    created_at, updated_at)
+SELECT CASE i % 3 WHEN 0 THEN 'brute_force_login' WHEN 1 THEN 'invalid_token_burst' ELSE 'admin_probing' END,
+       'medium',
+       '10.' || (h / 65536) || '.' || (h / 256 % 256) || '.' || (h % 256),
+       120, 5, 5, t, t, '{}', 'open', t, t
+FROM (
+    SELECT i, (i * 40503) % :ips AS h,
+           datetime('now', '-' || (abs(random()) % (:days * 86400)) || ' seconds') AS t
+    FROM seq
+)
+"""
+
+
+def event_case() -> str:
+    return " ".join(f"WHEN r < {threshold} THEN '{name}'" for threshold, name in EVENT_MIX)
+
+
+def seed(engine, events: int, alerts: int, ips: int, days: int, reseed: bool) -> None:
+    from sqlalchemy import text
+
+    postgres = engine.dialect.name == "postgresql"
+
+    with engine.begin() as conn:
+        if reseed:
+            if postgres:
+                conn.execute(text("TRUNCATE events, alerts RESTART IDENTITY"))
+            else:
+                conn.execute(text("DELETE FROM events"))
+                conn.execute(text("DELETE FROM alerts"))
+        existing = conn.execute(text("SELECT count(*) FROM events")).scalar()
+
+    if existing >= events:
+        print(f"events: {existing:,} rows already present, not seeding")
+        return
+
+    if postgres:
+        # Partitions for the seeded days, so rows do not all land in events_default
+        from app import partitions
+        from app.settings import settings
+
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            if partitions.is_partitioned(conn):
+                created = partitions.ensure_partitions(
+                    conn, settings.EVENTS_PARTITION_INTERVAL, now - timedelta(days=days), now + timedelta(days=1)
+                )
+                print(f"partitions: created {len(created)}")
+
+    events_sql = text((PG_EVENTS_SQL if postgres else SQLITE_EVENTS_SQL).format(event_case=event_case()))
+    started = time.perf_counter()
+    for start in range(existing + 1, events + 1, CHUNK):
+        stop = min(start + CHUNK - 1, events)
+        with engine.begin() as conn:
+            conn.execute(events_sql, {"start": start, "stop": stop, "ips": ips, "days": days})
+        print(f"events: {stop:,}/{events:,} ({time.perf_counter() - started:.0f}s)", flush=True)
+
+    with engine.begin() as conn:
+        alerts_sql = text(PG_ALERTS_SQL if postgres else SQLITE_ALERTS_SQL)
+        conn.execute(alerts_sql, {"count": alerts, "ips": ips, "days": days})
+    print(f"alerts: {alerts:,}")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE events" if postgres else "ANALYZE"))
+        if postgres:
+            conn.execute(text("ANALYZE alerts"))
+
+
+def detection_queries(ip: str, now: datetime):
+    """(label, statement, index it must use) for every query detection runs."""
+    from app.detections.engine import RULES, recent_alert_query
+    from app.detections.state import open_windows_query, recent_alerts_query, window_stats_query
+
+    for group in RULES.groups:
+        yield (
+            f"window count [{group.id}]",
+            window_stats_query(group.events, ip, now, group.window_seconds),
+            "ix_events_event_ip_ts",
+        )
+    for rule in RULES.rules.values():
+        yield (
+            f"recent alert [{rule.name}]",
+            recent_alert_query(rule, ip, now),
+            "ix_alerts_rule_ip_created_at",
+        )
+    for group in RULES.groups:
+        yield (
+            f"window warm-up [{group.id}]",
+            open_windows_query(group.events, now, group.window_seconds),
+            "ix_events_event_ts",
+        )
+    cooldowns = {rule.name: rule.cooldown_seconds for rule in RULES.rules.values()}
+    yield ("cooldown warm-up", recent_alerts_query(cooldowns, now), "ix_alerts_created_at")
+
+
+def uses_index(plan: str, index: str) -> bool:
+    if index in plan:
+        return True
+    # On a partitioned events table each partition has its own copy of the
+    # index, auto-named <partition>_<columns>_idx
+    columns = index.split("_", 2)[2]
+    return re.search(rf"\bevents_p\d+_{columns}\w*_idx\b", plan) is not None
+
+
+def explain(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}").all()
+        return "\n".join(row[0] for row in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN the detection queries on a seeded events table.")
+    parser.add_argument("--database-url", default=None, help="Database URL (default: temp SQLite file)")
+    parser.add_argument("--events", type=int, default=10_000_000, help="Events to seed (default: 10M)")
+    parser.add_argument("--alerts", type=int, default=100_000, help="Alerts to seed (default: 100k)")
+    parser.add_argument("--ips", type=int, default=50_000, help="Distinct source IPs (default: 50k)")
+    parser.add_argument("--days", type=int, default=7, help="Spread events over this many days (default: 7)")
+    parser.add_argument("--reseed", action="store_true", help="Wipe events and alerts and seed again")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/explain.db"
+    os.environ["MIGRATE_ON_STARTUP"] = "false"
+
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    @compiles(JSONB, "sqlite")
+    def compile_jsonb_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    from app import migrations
+    from app.db import engine
+
+    migrations.upgrade(engine)
+    seed(engine, args.events, args.alerts, args.ips, args.days, args.reseed)
+
+    # The busiest IP is the interesting case for the window count
+    now = datetime.now(timezone.utc)
+    failures = []
+    with engine.connect() as conn:
+        ip = conn.exec_driver_sql(
+            "SELECT ip FROM events WHERE event = 'login_failed' GROUP BY ip ORDER BY count(*) DESC LIMIT 1"
+        ).scalar() or "10.0.0.1"
+        print(f"\nprobing ip {ip}, now={now.isoformat()}")
+
+        for label, stmt, index in detection_queries(ip, now):
+            plan = explain(conn, stmt)
+            ok = uses_index(plan, index)
+            if not ok:
+                failures.append(label)
+            print(f"\n== {label}: {'uses ' + index if ok else 'DOES NOT USE ' + index}")
+            print(plan)
+
+    print(f"\n{'all detection queries use their indexes' if not failures else 'missing index use: ' + ', '.join(failures)}")
+    if tmpdir:
+        engine.dispose()
+        tmpdir.cleanup()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
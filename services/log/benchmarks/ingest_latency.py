@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure POST /ingest latency (p50/p99) for each INGEST_MODE.
+
+Usage:
+  poetry run python benchmarks/ingest_latency.py
+  poetry run python benchmarks/ingest_latency.py --requests 5000 --modes transactional
+  poetry run python benchmarks/ingest_latency.py --database-url postgresql+psycopg://...
+
+Notes:
+- Runs the app in-process through TestClient (lifespan included, so the
+  deferred-mode worker is running). Latency excludes the network hop.
+- Traffic mimics an attack: mostly login_failed from a handful of IPs, so
+  detection has real work to do.
+- Defaults to a throwaway SQLite file. Point --database-url at a scratch
+  Postgres database to measure the production setup (tables are dropped!).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest latency per INGEST_MODE.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode (default: 2000)")
+    parser.add_argument("--modes", nargs="+", default=["transactional", "deferred"], help="Modes to run")
+    parser.add_argument("--database-url", default=None, help="Database URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/bench.db"
+
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    @compiles(JSONB, "sqlite")
+    def compile_jsonb_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    from fastapi.testclient import TestClient
+    from app.db import Base, engine
+    from app.main import app
+    from app.settings import settings
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'mode':15} {'p50':>10} {'p99':>10} {'mean':>10}")
+
+    for mode in args.modes:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        settings.INGEST_MODE = mode
+
+        samples = []
+        with TestClient(app) as client:
+            for i in range(args.requests):
+                payload = {
+                    "v": 1,
+                    "ts": datetime.now(timezone.utc).isoformat(),
+                    "service": "auth",
+                    "event": "login_failed" if i % 5 else "login_success",
+                    "ip": f"10.0.0.{i % 8}",
+                    "path": "/login",
+                    "user_id": None,
+                    "meta": {},
+                }
+                start = time.perf_counter()
+                client.post("/ingest", json=payload).raise_for_status()
+                samples.append((time.perf_counter() - start) * 1000)
+
+        print(
+            f"{mode:15} {percentile(samples, 50):8.2f}ms {percentile(samples, 99):8.2f}ms "
+            f"{statistics.fmean(samples):8.2f}ms"
+        )
+
+    if tmpdir:
+        engine.dispose()
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
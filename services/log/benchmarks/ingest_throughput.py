@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare log-service ingest throughput: one POST per event vs POST /ingest/batch.
+
+Usage:
+  poetry run python benchmarks/ingest_throughput.py
+  poetry run python benchmarks/ingest_throughput.py --events 5000 --batch-size 500
+  poetry run python benchmarks/ingest_throughput.py --database-url postgresql+psycopg://...
+
+Notes:
+- Runs the real app in-process through TestClient, so HTTP parsing and
+  validation are included but no network hop is.
+- Defaults to a throwaway SQLite file. Point --database-url at a scratch
+  Postgres database to measure the production setup (tables are dropped!).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_events(count: int) -> list[dict]:
+    base = datetime.now(timezone.utc) - timedelta(seconds=count)
+    kinds = ["login_success", "login_failed", "signup_success", "invalid_token"]
+    return [
+        {
+            "v": 1,
+            "ts": (base + timedelta(milliseconds=i)).isoformat(),
+            "service": "auth",
+            "event": kinds[i % len(kinds)],
+            "ip": f"10.0.{(i // 256) % 256}.{i % 256}",
+            "path": "/login",
+            "user_id": None,
+            "meta": {"seq": i},
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark single-event vs batch ingest.")
+    parser.add_argument("--events", type=int, default=2000, help="Events per run (default: 2000)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Events per batch request (default: 500)")
+    parser.add_argument("--database-url", default=None, help="Database URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/bench.db"
+
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    @compiles(JSONB, "sqlite")
+    def compile_jsonb_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    from fastapi.testclient import TestClient
+    from app.db import Base, engine
+    from app.main import app
+
+    client = TestClient(app)
+    events = make_events(args.events)
+
+    def reset():
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    reset()
+    start = time.perf_counter()
+    for ev in events:
+        client.post("/ingest", json=ev).raise_for_status()
+    single = time.perf_counter() - start
+
+    reset()
+    start = time.perf_counter()
+    for i in range(0, len(events), args.batch_size):
+        client.post("/ingest/batch", json=events[i:i + args.batch_size]).raise_for_status()
+    batch = time.perf_counter() - start
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"Events:   {args.events}")
+    print(f"POST /ingest        {single:8.2f}s  {args.events / single:10.0f} events/s")
+    print(f"POST /ingest/batch  {batch:8.2f}s  {args.events / batch:10.0f} events/s  (batch size {args.batch_size})")
+    print(f"Speedup: {single / batch:.1f}x")
+
+    if tmpdir:
+        engine.dispose()
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,10 +12,10 @@ from app.db import Base
 from app.models import Event
 from app.settings import Settings
 
-# Import detection modules so we can mock their settings
-import app.detections.brute_force as brute_force_module
-import app.detections.token_abuse as token_abuse_module
-import app.detections.admin_probing as admin_probing_module
+# Import detection modules so we can swap in test settings
+import app.detections.engine as engine_module
+import app.detections.state as state_module
+from app.detections.rules import load_rules
 
 
 # Make JSONB work with SQLite for testing
@@ -36,14 +36,26 @@ def test_settings():
         TOKEN_BURST_WINDOW_SECONDS=120,
         ADMIN_PROBING_THRESHOLD=3,
         ADMIN_PROBING_WINDOW_SECONDS=120,
+        # Rule tests seed events straight into the DB, which only the SQL backend sees
+        DETECTION_BACKEND="sql",
     )
-    # Replace the global settings in all detection modules
-    brute_force_module.settings = settings_obj
-    token_abuse_module.settings = settings_obj
-    admin_probing_module.settings = settings_obj
+    # Compile the rules with the test thresholds and use the test backend
+    engine_module.activate_rules(load_rules(settings_obj))
+    state_module.settings = settings_obj
+    state_module.window_store.clear()
+    state_module.suppression_cache.clear()
     return settings_obj
 
 
+@pytest.fixture
+def memory_backend(test_settings):
+    """Switch detection to the in-memory window store."""
+    test_settings.DETECTION_BACKEND = "memory"
+    state_module.window_store.clear()
+    yield state_module.window_store
+    state_module.window_store.clear()
+
+
 @pytest.fixture
 def db_engine(test_settings):
     """Create an in-memory SQLite database for testing."""
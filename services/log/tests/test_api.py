@@ -1,5 +1,6 @@
 """Tests for log service API endpoints."""
 
+import json
 import sys
 import pytest
 from datetime import datetime, timezone, timedelta
@@ -178,6 +179,355 @@ class TestIngestEndpoint:
         assert events[0].meta["response_time_ms"] == 45
 
 
+class TestIngestModes:
+    """Test transactional and deferred ingest modes."""
+
+    @staticmethod
+    def _failed_login(ip="192.168.1.100"):
+        return {
+            "v": 1,
+            "ts": utcnow().isoformat(),
+            "service": "auth",
+            "event": "login_failed",
+            "ip": ip,
+            "path": "/login",
+        }
+
+    def test_transactional_ingest_commits_once(self, test_app, db_session, monkeypatch):
+        """Should write the event and its alert in a single commit."""
+        for _ in range(2):
+            test_app.post("/ingest", json=self._failed_login())
+
+        commits = []
+        original_commit = db_session.commit
+        monkeypatch.setattr(db_session, "commit", lambda: (commits.append(1), original_commit())[1])
+
+        response = test_app.post("/ingest", json=self._failed_login())
+        assert response.status_code == 200
+        assert len(commits) == 1
+        assert db_session.query(Alert).count() == 1
+
+    def test_deferred_ingest_detects_in_worker(self, test_app, db_session, db_engine, monkeypatch):
+        """Should store the event, respond, and create the alert in the background."""
+        from sqlalchemy.orm import sessionmaker
+        import app.main as main_module
+        from app.detections.worker import DetectionWorker
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_MODE", "deferred")
+        worker = DetectionWorker(sessionmaker(bind=db_engine), max_queue=100, batch_size=50)
+        monkeypatch.setattr(main_module, "detection_worker", worker)
+        worker.start()
+
+        submitted = []
+        original_submit = worker.submit
+        monkeypatch.setattr(worker, "submit", lambda events: submitted.append(len(events)) or original_submit(events))
+
+        for _ in range(3):
+            response = test_app.post("/ingest", json=self._failed_login())
+            assert response.status_code == 200
+
+        worker.stop()
+
+        assert submitted == [1, 1, 1]
+        assert db_session.query(Event).count() == 3
+        assert db_session.query(Alert).filter(Alert.rule == "brute_force_login").count() == 1
+
+    def test_deferred_ingest_falls_back_inline(self, test_app, db_session, monkeypatch):
+        """Should detect inline when the worker cannot take the events."""
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_MODE", "deferred")
+
+        # The worker is not started in tests, so submit() refuses
+        for _ in range(3):
+            test_app.post("/ingest", json=self._failed_login())
+
+        assert db_session.query(Alert).count() == 1
+
+
+class TestIngestBatchEndpoint:
+    """Test batch event ingestion endpoint."""
+
+    @staticmethod
+    def _event(**overrides):
+        payload = {
+            "v": 1,
+            "ts": utcnow().isoformat(),
+            "service": "auth",
+            "event": "login_success",
+            "ip": "192.168.1.100",
+            "path": "/login",
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_ingest_batch_stores_all_events(self, test_app, db_session):
+        """Should store every valid event in the batch."""
+        payload = [self._event(user_id=f"user{i}") for i in range(25)]
+
+        response = test_app.post("/ingest/batch", json=payload)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["accepted"] == 25
+        assert data["rejected"] == 0
+        assert [r["index"] for r in data["results"]] == list(range(25))
+        assert all(r["stored"] for r in data["results"])
+
+        assert db_session.query(Event).count() == 25
+
+    def test_ingest_batch_empty(self, test_app, db_session):
+        """Should accept an empty batch."""
+        response = test_app.post("/ingest/batch", json=[])
+        assert response.status_code == 200
+        assert response.json() == {"accepted": 0, "rejected": 0, "results": []}
+
+    def test_ingest_batch_reports_invalid_events(self, test_app, db_session):
+        """Should reject invalid events individually and store the rest."""
+        bad_ts = self._event(ts="not-a-datetime")
+        missing_event = self._event()
+        del missing_event["event"]
+        payload = [self._event(), bad_ts, "not-an-object", missing_event, self._event()]
+
+        response = test_app.post("/ingest/batch", json=payload)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["accepted"] == 2
+        assert data["rejected"] == 3
+        stored = [r["stored"] for r in data["results"]]
+        assert stored == [True, False, False, False, True]
+        assert "ts" in data["results"][1]["error"]
+        assert "event" in data["results"][3]["error"]
+        assert data["results"][0]["error"] is None
+
+        assert db_session.query(Event).count() == 2
+
+    def test_ingest_batch_rejects_non_list_body(self, test_app):
+        """Should reject a body that is not a JSON array."""
+        response = test_app.post("/ingest/batch", json=self._event())
+        assert response.status_code == 422
+
+    def test_ingest_batch_size_limit(self, test_app, db_session, monkeypatch):
+        """Should reject batches larger than the configured limit."""
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_BATCH_MAX_EVENTS", 3)
+        payload = [self._event() for _ in range(4)]
+
+        response = test_app.post("/ingest/batch", json=payload)
+        assert response.status_code == 413
+        assert db_session.query(Event).count() == 0
+
+    def test_ingest_batch_triggers_single_alert(self, test_app, db_session):
+        """Should run detection over the batch and alert once per rule and IP."""
+        base_time = utcnow()
+        payload = [
+            self._event(
+                event="login_failed",
+                ts=(base_time - timedelta(seconds=10 - i)).isoformat(),
+            )
+            for i in range(10)
+        ]
+
+        response = test_app.post("/ingest/batch", json=payload)
+        assert response.status_code == 200
+
+        alerts = db_session.query(Alert).filter(Alert.rule == "brute_force_login").all()
+        assert len(alerts) == 1
+        # Fires as soon as the threshold is crossed, as with single ingests
+        assert alerts[0].count == 3
+
+    @pytest.mark.parametrize("endpoint", ["/ingest/batch", "/ingest"])
+    def test_burst_early_in_a_long_batch_alerts(self, test_app, db_session, test_settings, endpoint):
+        """SQL backend: a burst followed by a late event in one batch alerts like single ingests."""
+        assert test_settings.DETECTION_BACKEND == "sql"
+        start = utcnow() - timedelta(minutes=10)
+        offsets = [0, 1, 2, 3, 4, 400]
+        payload = [
+            self._event(event="login_failed", ts=(start + timedelta(seconds=s)).isoformat())
+            for s in offsets
+        ]
+
+        if endpoint == "/ingest/batch":
+            assert test_app.post(endpoint, json=payload).status_code == 200
+        else:
+            for event in payload:
+                assert test_app.post(endpoint, json=event).status_code == 200
+
+        alerts = db_session.query(Alert).filter(Alert.rule == "brute_force_login").all()
+        assert len(alerts) == 1
+        assert alerts[0].count == 3
+
+    def test_ingest_batch_alerts_per_ip(self, test_app, db_session):
+        """Should evaluate each IP in the batch independently."""
+        base_time = utcnow()
+        payload = []
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            for i in range(3):
+                payload.append(
+                    self._event(
+                        event="login_failed",
+                        ip=ip,
+                        ts=(base_time - timedelta(seconds=i)).isoformat(),
+                    )
+                )
+        payload.append(self._event(event="login_failed", ip="10.0.0.3"))
+
+        response = test_app.post("/ingest/batch", json=payload)
+        assert response.status_code == 200
+
+        alerts = db_session.query(Alert).filter(Alert.rule == "brute_force_login").all()
+        assert sorted(a.ip for a in alerts) == ["10.0.0.1", "10.0.0.2"]
+
+
+class TestIngestStreamEndpoint:
+    """Test streaming NDJSON ingestion endpoint."""
+
+    @staticmethod
+    def _line(**overrides) -> bytes:
+        payload = {
+            "v": 1,
+            "ts": utcnow().isoformat(),
+            "service": "api",
+            "event": "invalid_token",
+            "ip": "192.168.1.100",
+            "path": "/me",
+        }
+        payload.update(overrides)
+        return json.dumps(payload).encode() + b"\n"
+
+    def test_stream_stores_events(self, test_app, db_session):
+        """Should store every line of an NDJSON body."""
+        body = b"".join(self._line(user_id=str(i)) for i in range(20))
+
+        response = test_app.post("/ingest/stream", content=body)
+        assert response.status_code == 200
+        assert response.json() == {
+            "accepted": 20,
+            "rejected": 0,
+            "errors": [],
+            "errors_truncated": False,
+        }
+        assert db_session.query(Event).count() == 20
+
+    def test_stream_lines_split_across_chunks(self, test_app, db_session):
+        """Should reassemble lines that arrive split over several chunks."""
+        body = b"".join(self._line() for _ in range(5))
+
+        def chunks():
+            for i in range(0, len(body), 7):
+                yield body[i:i + 7]
+
+        response = test_app.post("/ingest/stream", content=chunks())
+        assert response.status_code == 200
+        assert response.json()["accepted"] == 5
+        assert db_session.query(Event).count() == 5
+
+    def test_stream_reports_line_errors(self, test_app, db_session):
+        """Should report bad lines by number without aborting the stream."""
+        body = b"".join([
+            self._line(),
+            b"{not json}\n",
+            b"\n",
+            self._line(ts="not-a-datetime"),
+            self._line(),
+        ])
+
+        response = test_app.post("/ingest/stream", content=body)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["accepted"] == 2
+        assert data["rejected"] == 2
+        assert [e["line"] for e in data["errors"]] == [2, 4]
+        assert "ts" in data["errors"][1]["error"]
+        assert db_session.query(Event).count() == 2
+
+    def test_stream_last_line_without_newline(self, test_app, db_session):
+        """Should accept a final line that has no trailing newline."""
+        body = self._line() + self._line().rstrip(b"\n")
+
+        response = test_app.post("/ingest/stream", content=body)
+        assert response.json()["accepted"] == 2
+
+    def test_stream_flushes_in_micro_batches(self, test_app, db_session, monkeypatch):
+        """Should flush in bounded micro-batches."""
+        import app.main as main_module
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_STREAM_FLUSH_EVENTS", 4)
+        batch_sizes = []
+        original = main_module.store_events
+
+        def spy(db, payloads):
+            batch_sizes.append(len(payloads))
+            return original(db, payloads)
+
+        monkeypatch.setattr(main_module, "store_events", spy)
+
+        body = b"".join(self._line() for _ in range(10))
+        response = test_app.post("/ingest/stream", content=body)
+
+        assert response.json()["accepted"] == 10
+        assert batch_sizes == [4, 4, 2]
+
+    def test_stream_rejects_oversized_line(self, test_app, db_session, monkeypatch):
+        """Should drop lines over the size limit and keep going."""
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_STREAM_MAX_LINE_BYTES", 512)
+        body = self._line() + self._line(meta={"pad": "x" * 1024}) + self._line()
+
+        response = test_app.post("/ingest/stream", content=body)
+        data = response.json()
+        assert data["accepted"] == 2
+        assert data["errors"][0]["line"] == 2
+        assert "exceeds" in data["errors"][0]["error"]
+
+    def test_stream_caps_reported_errors(self, test_app, db_session, monkeypatch):
+        """Should cap the number of reported errors but keep counting."""
+        from app.settings import settings
+
+        monkeypatch.setattr(settings, "INGEST_STREAM_MAX_ERRORS", 3)
+        body = b"garbage\n" * 10
+
+        response = test_app.post("/ingest/stream", content=body)
+        data = response.json()
+        assert data["rejected"] == 10
+        assert len(data["errors"]) == 3
+        assert data["errors_truncated"] is True
+
+    def test_stream_triggers_detection(self, test_app, db_session):
+        """Should run detection on streamed events."""
+        body = b"".join(self._line() for _ in range(6))
+
+        test_app.post("/ingest/stream", content=body)
+
+        alerts = db_session.query(Alert).filter(Alert.rule == "invalid_token_burst").all()
+        assert len(alerts) == 1
+
+
+class TestLineSplitter:
+    """Test the incremental NDJSON line splitter."""
+
+    def test_splits_lines_across_chunks(self):
+        from app.ndjson import LineSplitter
+
+        splitter = LineSplitter(max_line_bytes=100)
+        lines = list(splitter.feed(b"ab")) + list(splitter.feed(b"c\nde\nf")) + list(splitter.close())
+        assert lines == [b"abc", b"de", b"f"]
+
+    def test_oversized_line_reported_as_none(self):
+        from app.ndjson import LineSplitter
+
+        splitter = LineSplitter(max_line_bytes=4)
+        lines = list(splitter.feed(b"ok\n123")) + list(splitter.feed(b"456789\nend\n"))
+        assert lines == [b"ok", None, b"end"]
+        assert len(splitter._buf) == 0
+
+
 class TestAlertsListEndpoint:
     """Test alerts listing endpoint."""
 
@@ -0,0 +1,334 @@
+"""Tests for the in-memory sliding-window detection state."""
+
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from app.models import Event, Alert
+from app.detections.engine import run_detection_pipeline, run_detection_pipeline_batch, warm_detection_state
+from app.detections.state import SlidingWindow, WindowStore, sql_window_stats
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def make_event(db_session, *, event="login_failed", ip="192.168.1.100", ts=None):
+    ev = Event(
+        v=1,
+        ts=ts or utcnow(),
+        service="auth",
+        event=event,
+        ip=ip,
+        path="/login",
+        user_id=None,
+        meta={},
+    )
+    db_session.add(ev)
+    db_session.commit()
+    return ev
+
+
+class TestSlidingWindow:
+    """Test the per-key timestamp window."""
+
+    def test_counts_events_in_window(self):
+        window = SlidingWindow(window_seconds=60)
+        for ts in (0, 10, 20, 30):
+            window.add(1000.0 + ts)
+
+        stats = window.stats(1030.0)
+        assert stats.count == 4
+        assert stats.first_seen.timestamp() == 1000.0
+        assert stats.last_seen.timestamp() == 1030.0
+
+    def test_evicts_expired_timestamps(self):
+        window = SlidingWindow(window_seconds=60)
+        window.add(1000.0)
+        window.add(1030.0)
+        window.add(1100.0)
+
+        assert list(window.timestamps) == [1100.0]
+        assert window.stats(1100.0).count == 1
+
+    def test_window_start_is_inclusive(self):
+        window = SlidingWindow(window_seconds=60)
+        window.add(1000.0)
+        window.add(1060.0)
+
+        assert window.stats(1060.0).count == 2
+
+    def test_out_of_order_event(self):
+        window = SlidingWindow(window_seconds=60)
+        window.add(1000.0)
+        window.add(1050.0)
+        window.add(1020.0)
+
+        assert list(window.timestamps) == [1000.0, 1020.0, 1050.0]
+        # A late event only counts what came before it
+        stats = window.stats(1020.0)
+        assert stats.count == 2
+        assert stats.last_seen.timestamp() == 1020.0
+
+    def test_empty_window(self):
+        stats = SlidingWindow(window_seconds=60).stats(1000.0)
+        assert stats.count == 0
+        assert stats.first_seen is None
+
+
+class TestWindowStore:
+    """Test the keyed window store."""
+
+    def test_keys_are_independent(self):
+        store = WindowStore(max_keys=100)
+        now = utcnow()
+        for _ in range(3):
+            store.record("rule", "10.0.0.1", now, 60)
+        stats = store.record("rule", "10.0.0.2", now, 60)
+
+        assert stats.count == 1
+        assert store.record("other", "10.0.0.1", now, 60).count == 1
+        assert len(store) == 3
+
+    def test_bounded_number_of_keys(self):
+        store = WindowStore(max_keys=10)
+        now = utcnow()
+        for i in range(50):
+            store.record("rule", f"10.0.0.{i}", now, 60)
+
+        assert len(store) <= 10
+        # Most recently updated keys survive
+        assert store.record("rule", "10.0.0.49", now, 60).count == 2
+
+    def test_sweep_drops_expired_windows(self):
+        store = WindowStore(max_keys=1000)
+        store.SWEEP_EVERY = 5
+        old = utcnow() - timedelta(minutes=10)
+        store.record("rule", "10.0.0.1", old, 60)
+
+        now = utcnow()
+        for i in range(5):
+            store.record("rule", "10.0.0.2", now, 60)
+
+        assert len(store) == 1
+
+    def test_accepts_naive_timestamps_as_utc(self):
+        store = WindowStore(max_keys=10)
+        aware = utcnow()
+        store.record("rule", "ip", aware, 60)
+        stats = store.record("rule", "ip", aware.replace(tzinfo=None), 60)
+        assert stats.count == 2
+
+
+class TestMemoryBackendDetection:
+    """Rules evaluated against the in-memory windows."""
+
+    def test_alerts_without_counting_in_sql(self, db_session, memory_backend):
+        """Should reach the threshold from the events it has been fed."""
+        for _ in range(3):
+            ev = make_event(db_session)
+            run_detection_pipeline(db_session, ev)
+            db_session.commit()
+
+        alerts = db_session.query(Alert).all()
+        assert len(alerts) == 1
+        assert alerts[0].rule == "brute_force_login"
+        assert alerts[0].count == 3
+
+    def test_matches_sql_backend(self, db_session, memory_backend, test_settings):
+        """Should produce the same window stats as the SQL reference."""
+        base = utcnow()
+        stats = None
+        for i in range(8):
+            ev = make_event(db_session, event="invalid_token", ts=base - timedelta(seconds=200 - i * 30))
+            stats = memory_backend.record("invalid_token_burst", ev.ip, ev.ts, 120)
+
+        expected = sql_window_stats(db_session, {"invalid_token"}, "192.168.1.100", ev.ts, 120)
+        assert stats.count == expected.count
+        assert stats.first_seen.replace(tzinfo=None) == expected.first_seen.replace(tzinfo=None)
+        assert stats.last_seen.replace(tzinfo=None) == expected.last_seen.replace(tzinfo=None)
+
+    def test_batch_feeds_every_event(self, db_session, memory_backend):
+        """Should record every event of a batch, not only the newest."""
+        base = utcnow()
+        events = [
+            make_event(db_session, ts=base - timedelta(seconds=5 - i))
+            for i in range(5)
+        ]
+
+        run_detection_pipeline_batch(db_session, events)
+        db_session.commit()
+
+        alerts = db_session.query(Alert).all()
+        assert len(alerts) == 1
+        # Alert fires as soon as the threshold is crossed, like the single path
+        assert alerts[0].count == 3
+
+    def test_warm_from_events_table(self, db_session, memory_backend):
+        """Should pick up windows that were open before a restart."""
+        base = utcnow()
+        for i in range(2):
+            make_event(db_session, ts=base - timedelta(seconds=10 - i))
+        # Outside the window, must not be counted
+        make_event(db_session, ts=base - timedelta(minutes=10))
+
+        warm_detection_state(db_session, base)
+
+        trigger = make_event(db_session, ts=base)
+        run_detection_pipeline(db_session, trigger)
+        db_session.commit()
+
+        alerts = db_session.query(Alert).all()
+        assert len(alerts) == 1
+        assert alerts[0].count == 3
+
+    @pytest.mark.parametrize("event_name", ["login_success", "signup_success"])
+    def test_irrelevant_events_create_no_state(self, db_session, memory_backend, event_name):
+        ev = make_event(db_session, event=event_name)
+        run_detection_pipeline(db_session, ev)
+        assert len(memory_backend) == 0
+
+
+@pytest.fixture
+def statement_log(db_engine):
+    """Record every SQL statement sent to the test database."""
+    from sqlalchemy import event as sa_event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sa_event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    sa_event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestSuppressionCache:
+    """Cooldown cache that replaces the per-event recent-alert query."""
+
+    def _trigger(self, db_session, count, ip="192.168.1.100", ts=None):
+        for _ in range(count):
+            ev = make_event(db_session, ip=ip, ts=ts)
+            run_detection_pipeline(db_session, ev)
+            db_session.commit()
+
+    def test_cache_populated_on_alert(self, db_session, memory_backend):
+        from app.detections.state import suppression_cache
+
+        self._trigger(db_session, 3)
+        assert suppression_cache.is_suppressed("brute_force_login", "192.168.1.100", utcnow())
+        assert not suppression_cache.is_suppressed("brute_force_login", "10.9.9.9", utcnow())
+
+    def test_suppressed_events_issue_no_detection_sql(self, db_session, memory_backend, statement_log):
+        """Memory backend: events during the cooldown never query events or alerts."""
+        self._trigger(db_session, 3)
+        statement_log.clear()
+
+        for _ in range(5):
+            ev = Event(
+                v=1, ts=utcnow(), service="auth", event="login_failed",
+                ip="192.168.1.100", path="/login", user_id=None, meta={},
+            )
+            run_detection_pipeline(db_session, ev)
+
+        assert statement_log == []
+        assert db_session.query(Alert).count() == 1
+
+    def test_sql_backend_skips_count_query_when_suppressed(self, db_session, test_settings, statement_log):
+        """SQL backend: a cached cooldown short-circuits before the count query."""
+        self._trigger(db_session, 3)
+        assert db_session.query(Alert).count() == 1
+
+        trigger = make_event(db_session)
+        db_session.refresh(trigger)
+        statement_log.clear()
+        run_detection_pipeline(db_session, trigger)
+
+        assert statement_log == []
+
+    def test_cooldown_waits_for_commit(self, db_session, memory_backend):
+        """The alert's cooldown holds in its transaction, and everywhere once committed."""
+        from app.detections.state import suppression_cache
+
+        for _ in range(3):
+            run_detection_pipeline(db_session, make_event(db_session))
+        assert db_session.new
+        assert not suppression_cache.is_suppressed("brute_force_login", "192.168.1.100", utcnow())
+
+        # Later events in the same transaction do not alert again
+        run_detection_pipeline(db_session, make_event(db_session))
+        db_session.commit()
+
+        assert db_session.query(Alert).count() == 1
+        assert suppression_cache.is_suppressed("brute_force_login", "192.168.1.100", utcnow())
+
+    def test_failed_commit_does_not_suppress(self, db_session, memory_backend, monkeypatch):
+        """An alert that was never stored must not mute the rule for its cooldown."""
+        from app.detections.state import suppression_cache
+
+        events = [make_event(db_session) for _ in range(3)]
+
+        def failing_flush(*args, **kwargs):
+            raise RuntimeError("database went away")
+
+        monkeypatch.setattr(db_session, "flush", failing_flush)
+        run_detection_pipeline_batch(db_session, events)
+        with pytest.raises(RuntimeError):
+            db_session.commit()
+        db_session.rollback()
+        monkeypatch.undo()
+
+        assert not suppression_cache.is_suppressed("brute_force_login", "192.168.1.100", utcnow())
+        assert db_session.query(Alert).count() == 0
+
+        # The attack is still detected once the database is back
+        run_detection_pipeline(db_session, make_event(db_session))
+        db_session.commit()
+        assert db_session.query(Alert).count() == 1
+
+    def test_alerts_again_after_cooldown(self, db_session, memory_backend):
+        from app.detections.state import suppression_cache
+
+        self._trigger(db_session, 3)
+        # Pretend the cooldown ran out
+        suppression_cache.clear()
+        self._trigger(db_session, 1)
+
+        assert db_session.query(Alert).count() == 2
+
+    def test_warm_from_alerts_table(self, db_session, memory_backend, statement_log):
+        """Should suppress alerts created before a restart without querying."""
+        from app.detections.state import suppression_cache
+
+        now = utcnow()
+        db_session.add(Alert(
+            rule="brute_force_login", severity="high", ip="192.168.1.100",
+            window_seconds=120, threshold=3, count=3, first_seen=now, last_seen=now,
+            meta={}, created_at=now - timedelta(seconds=30),
+        ))
+        db_session.add(Alert(
+            rule="admin_probing", severity="medium", ip="192.168.1.100",
+            window_seconds=120, threshold=3, count=3, first_seen=now, last_seen=now,
+            meta={}, created_at=now - timedelta(minutes=10),
+        ))
+        db_session.commit()
+
+        warm_detection_state(db_session, now)
+
+        assert suppression_cache.is_suppressed("brute_force_login", "192.168.1.100", now)
+        # Already past its cooldown
+        assert not suppression_cache.is_suppressed("admin_probing", "192.168.1.100", now)
+
+        self._trigger(db_session, 3)
+        assert db_session.query(Alert).filter(Alert.rule == "brute_force_login").count() == 1
+
+    def test_cooldown_is_per_rule(self, db_session, memory_backend):
+        self._trigger(db_session, 3)
+        for _ in range(5):
+            ev = make_event(db_session, event="invalid_token")
+            run_detection_pipeline(db_session, ev)
+            db_session.commit()
+
+        rules = sorted(a.rule for a in db_session.query(Alert).all())
+        assert rules == ["brute_force_login", "invalid_token_burst"]
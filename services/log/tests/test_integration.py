@@ -308,3 +308,57 @@ class TestDetectionPipeline:
         # Should have token burst alert (brute force won't trigger from token event)
         token_alerts = [a for a in alerts if a.rule == "invalid_token_burst"]
         assert len(token_alerts) == 1
+
+
+class TestDispatchTable:
+    """Tests for the event-name dispatch index."""
+
+    def test_rules_indexed_by_subscribed_events(self, test_settings):
+        """Should map each subscribed event to exactly its window group."""
+        from app.detections import engine
+
+        def rule_names(event_name):
+            return [rule.name for group in engine.RULES.dispatch[event_name] for rule in group.rules]
+
+        assert rule_names("login_failed") == ["brute_force_login"]
+        assert rule_names("unauthorized_admin_access") == ["admin_probing"]
+        for name in ("invalid_token", "invalid_token_claims", "missing_token"):
+            assert rule_names(name) == ["invalid_token_burst"]
+
+    def test_shared_event_dispatches_to_all_subscribers(self):
+        """Should list every subscriber of the same event."""
+        from types import SimpleNamespace
+        from app.detections.engine import build_dispatch_table
+
+        a = SimpleNamespace(events={"login_failed"})
+        b = SimpleNamespace(events={"login_failed", "missing_token"})
+
+        table = build_dispatch_table([a, b])
+        assert table == {"login_failed": (a, b), "missing_token": (b,)}
+
+    def test_unsubscribed_event_skips_all_rules(self, db_session, test_settings, monkeypatch):
+        """Should not evaluate any window group for events nobody subscribes to."""
+        from app.detections import engine
+
+        calls = []
+        monkeypatch.setattr(
+            engine, "_evaluate_group",
+            lambda db, group, rules, ev: calls.extend(rule.name for rule in rules),
+        )
+
+        event = Event(
+            v=1,
+            ts=utcnow(),
+            service="auth",
+            event="login_success",
+            ip="192.168.1.100",
+            path="/login",
+            user_id="user1",
+            meta={},
+        )
+        run_detection_pipeline(db_session, event)
+        assert calls == []
+
+        event.event = "missing_token"
+        run_detection_pipeline(db_session, event)
+        assert calls == ["invalid_token_burst"]
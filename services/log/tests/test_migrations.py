@@ -0,0 +1,107 @@
+"""Tests for the schema migrations."""
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from app import migrations
+from app.db import Base
+from app.detections.engine import recent_alert_query
+from app.detections.rules import ThresholdRule
+from app.detections.state import window_stats_query, open_windows_query
+from app.migrations import m0001_initial_schema
+
+
+@pytest.fixture
+def empty_engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine, table: str) -> set[str]:
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def query_plan(engine, stmt) -> str:
+    compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+class TestUpgrade:
+    def test_fresh_database_gets_all_migrations(self, empty_engine):
+        applied = migrations.upgrade(empty_engine)
+
+        assert applied == [m.VERSION for m in migrations.MIGRATIONS]
+        assert {"events", "alerts", "schema_migrations"} <= set(inspect(empty_engine).get_table_names())
+
+    def test_upgrade_is_idempotent(self, empty_engine):
+        migrations.upgrade(empty_engine)
+
+        assert migrations.upgrade(empty_engine) == []
+
+    def test_schema_matches_models(self, empty_engine):
+        migrations.upgrade(empty_engine)
+
+        for table in Base.metadata.sorted_tables:
+            columns = {c["name"] for c in inspect(empty_engine).get_columns(table.name)}
+            assert columns == set(table.columns.keys())
+            assert index_names(empty_engine, table.name) == {i.name for i in table.indexes}
+
+    def test_adopts_database_created_before_migrations(self, empty_engine):
+        # What Base.metadata.create_all used to leave behind: tables, no indexes
+        m0001_initial_schema.metadata.create_all(empty_engine)
+        with empty_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO events (v, ts, service, event, ip, path, meta) "
+                "VALUES (1, '2024-01-01 00:00:00', 'auth', 'login_failed', '10.0.0.1', '/login', '{}')"
+            ))
+
+        applied = migrations.upgrade(empty_engine)
+
+        assert applied == [m.VERSION for m in migrations.MIGRATIONS]
+        assert "ix_events_event_ip_ts" in index_names(empty_engine, "events")
+        with empty_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM events")).scalar() == 1
+
+
+class TestDetectionQueriesUseIndexes:
+    NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    @pytest.fixture
+    def migrated(self, empty_engine):
+        migrations.upgrade(empty_engine)
+        return empty_engine
+
+    def test_window_count(self, migrated):
+        stmt = window_stats_query({"login_failed"}, "10.0.0.1", self.NOW, 120)
+
+        assert "COVERING INDEX ix_events_event_ip_ts" in query_plan(migrated, stmt)
+
+    def test_window_warm_up(self, migrated):
+        stmt = open_windows_query({"login_failed"}, self.NOW, 120)
+
+        assert "ix_events_event_ts" in query_plan(migrated, stmt)
+
+    def test_recent_alert_check(self, migrated):
+        rule = ThresholdRule(
+            name="brute_force_login",
+            events=frozenset({"login_failed"}),
+            group_by="ip",
+            window_seconds=120,
+            threshold=5,
+            severity="high",
+            cooldown_seconds=120,
+            note="",
+        )
+        stmt = recent_alert_query(rule, "10.0.0.1", self.NOW)
+
+        assert "ix_alerts_rule_ip_created_at" in query_plan(migrated, stmt)
@@ -0,0 +1,104 @@
+"""Tests for events partitioning helpers and retention."""
+
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import func, select
+
+from app.models import Event
+from app.partitions import (
+    PartitionMaintainer,
+    bucket_start,
+    is_partitioned,
+    maintain,
+    parse_bounds,
+    partition_name,
+)
+
+
+class TestPartitionNaming:
+    def test_daily_bucket(self):
+        ts = datetime(2024, 3, 5, 17, 42, 9, tzinfo=timezone.utc)
+
+        start = bucket_start(ts, "daily")
+
+        assert start == datetime(2024, 3, 5, tzinfo=timezone.utc)
+        assert partition_name(start, "daily") == "events_p20240305"
+
+    def test_hourly_bucket(self):
+        ts = datetime(2024, 3, 5, 17, 42, 9, tzinfo=timezone.utc)
+
+        start = bucket_start(ts, "hourly")
+
+        assert start == datetime(2024, 3, 5, 17, tzinfo=timezone.utc)
+        assert partition_name(start, "hourly") == "events_p2024030517"
+
+    def test_bucket_is_utc(self):
+        ts = datetime(2024, 3, 6, 1, 30, tzinfo=timezone(timedelta(hours=3)))
+
+        assert bucket_start(ts, "daily") == datetime(2024, 3, 5, tzinfo=timezone.utc)
+
+    def test_parse_bounds(self):
+        expr = "FOR VALUES FROM ('2024-03-05 00:00:00+00') TO ('2024-03-06 00:00:00+00')"
+
+        assert parse_bounds(expr) == (
+            datetime(2024, 3, 5, tzinfo=timezone.utc),
+            datetime(2024, 3, 6, tzinfo=timezone.utc),
+        )
+
+    def test_parse_bounds_in_session_time_zone(self):
+        expr = "FOR VALUES FROM ('2024-03-05 03:00:00+03') TO ('2024-03-06 03:00:00+03')"
+
+        start, _ = parse_bounds(expr)
+
+        assert start == datetime(2024, 3, 5, tzinfo=timezone.utc)
+
+    def test_default_partition_has_no_bounds(self):
+        assert parse_bounds("DEFAULT") is None
+
+
+class TestRetentionWithoutPartitions:
+    """SQLite has no partitions: maintenance only applies retention with a DELETE."""
+
+    NOW = datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+
+    def seed(self, create_event):
+        for days_ago in (0, 1, 5, 9, 30):
+            create_event(event="login_failed", ts=self.NOW - timedelta(days=days_ago))
+
+    def count(self, db_session) -> int:
+        return db_session.execute(select(func.count()).select_from(Event)).scalar()
+
+    def test_sqlite_is_not_partitioned(self, db_engine):
+        with db_engine.connect() as conn:
+            assert not is_partitioned(conn)
+
+    def test_retention_deletes_old_events(self, db_engine, db_session, create_event):
+        self.seed(create_event)
+
+        result = maintain(db_engine, "daily", ahead=3, retention_days=7, now=self.NOW)
+
+        assert result.deleted_rows == 2
+        assert result.created == [] and result.dropped == []
+        assert self.count(db_session) == 3
+
+    def test_no_retention_keeps_everything(self, db_engine, db_session, create_event):
+        self.seed(create_event)
+
+        result = maintain(db_engine, "daily", ahead=3, retention_days=None, now=self.NOW)
+
+        assert result.deleted_rows == 0
+        assert self.count(db_session) == 5
+
+    def test_maintainer_runs_once_and_stops(self, db_engine, db_session, create_event):
+        self.seed(create_event)
+        maintainer = PartitionMaintainer(
+            db_engine, 3600, interval="daily", ahead=3, retention_days=7, now=self.NOW,
+        )
+
+        result = maintainer.run_once()
+        maintainer.start()
+        assert maintainer.running
+        maintainer.stop()
+
+        assert result.deleted_rows == 2
+        assert not maintainer.running
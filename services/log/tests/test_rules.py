@@ -0,0 +1,147 @@
+"""Tests for declarative rule loading and compilation."""
+
+import json
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from app.models import Event, Alert
+from app.detections import engine
+from app.detections.rules import load_rules, parse_rule
+from app.settings import Settings
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def write_rules(tmp_path, rules):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": rules}))
+    return path
+
+
+def rule_spec(**overrides):
+    spec = {
+        "name": "test_rule",
+        "events": ["login_failed"],
+        "group_by": "ip",
+        "window_seconds": 60,
+        "threshold": 2,
+        "severity": "low",
+        "note": "test",
+    }
+    spec.update(overrides)
+    return spec
+
+
+class TestLoadRules:
+    """Test loading and validating the rule file."""
+
+    def test_bundled_rules_match_previous_defaults(self):
+        """Should express the built-in rules with their historical settings."""
+        rules = {rule.name: rule for rule in load_rules(Settings())}
+
+        assert set(rules) == {"brute_force_login", "invalid_token_burst", "admin_probing"}
+
+        brute = rules["brute_force_login"]
+        assert brute.events == {"login_failed"}
+        assert (brute.threshold, brute.window_seconds, brute.severity) == (5, 120, "high")
+        assert brute.cooldown_seconds == 120
+        assert brute.note == "Too many failed logins from same IP"
+
+        token = rules["invalid_token_burst"]
+        assert token.events == {"invalid_token", "invalid_token_claims", "missing_token"}
+        assert (token.threshold, token.window_seconds, token.severity) == (10, 120, "medium")
+
+        admin = rules["admin_probing"]
+        assert admin.events == {"unauthorized_admin_access"}
+        assert (admin.threshold, admin.window_seconds, admin.severity) == (5, 120, "medium")
+
+    def test_settings_override_file_values(self):
+        """Should let the existing threshold settings override the file."""
+        settings = Settings(BRUTE_FORCE_THRESHOLD=7, BRUTE_FORCE_WINDOW_SECONDS=30)
+        rules = {rule.name: rule for rule in load_rules(settings)}
+
+        assert rules["brute_force_login"].threshold == 7
+        assert rules["brute_force_login"].window_seconds == 30
+        assert rules["admin_probing"].threshold == 5
+
+    @pytest.mark.parametrize("overrides", [
+        {"BRUTE_FORCE_THRESHOLD": 0},
+        {"BRUTE_FORCE_WINDOW_SECONDS": -5},
+        {"TOKEN_BURST_WINDOW_SECONDS": 0},
+        {"ADMIN_PROBING_THRESHOLD": -1},
+    ])
+    def test_rejects_invalid_setting_override(self, overrides):
+        """A bad override fails at startup instead of being ignored or breaking the windows."""
+        (setting,) = overrides
+        with pytest.raises(ValueError, match=setting):
+            load_rules(Settings(**overrides))
+
+    def test_load_custom_path(self, tmp_path):
+        """Should load rules from DETECTION_RULES_PATH."""
+        path = write_rules(tmp_path, [rule_spec(cooldown_seconds=300)])
+        rules = load_rules(Settings(DETECTION_RULES_PATH=str(path)))
+
+        assert len(rules) == 1
+        assert rules[0].cooldown_seconds == 300
+
+    @pytest.mark.parametrize("overrides, message", [
+        ({"events": []}, "events"),
+        ({"threshold": 0}, "threshold"),
+        ({"window_seconds": "120"}, "window_seconds"),
+        ({"severity": "urgent"}, "severity"),
+        ({"group_by": "path"}, "group_by"),
+        ({"name": ""}, "name"),
+    ])
+    def test_rejects_invalid_rule(self, overrides, message):
+        with pytest.raises(ValueError, match=message):
+            parse_rule(rule_spec(**overrides))
+
+    def test_rejects_duplicate_names(self, tmp_path):
+        path = write_rules(tmp_path, [rule_spec(), rule_spec()])
+        with pytest.raises(ValueError, match="duplicate"):
+            load_rules(path=path)
+
+
+class TestCompiledRules:
+    """Test the compiled, shared evaluator."""
+
+    def test_rules_on_same_events_share_a_window(self):
+        compiled = engine.CompiledRules([
+            parse_rule(rule_spec(name="tier_low", threshold=2)),
+            parse_rule(rule_spec(name="tier_high", threshold=4, severity="critical")),
+            parse_rule(rule_spec(name="other_window", window_seconds=10)),
+        ])
+
+        assert len(compiled.groups) == 2
+        assert [len(group.rules) for group in compiled.dispatch["login_failed"]] == [2, 1]
+
+    def test_added_rule_fires_from_shared_window(self, db_session, test_settings, memory_backend):
+        """Should evaluate an extra rule on the same events without a new window."""
+        rules = load_rules(test_settings) + [
+            parse_rule(rule_spec(
+                name="brute_force_critical", threshold=5, severity="critical", window_seconds=120,
+            )),
+        ]
+        engine.activate_rules(rules)
+
+        base = utcnow()
+        for i in range(5):
+            ev = Event(
+                v=1, ts=base - timedelta(seconds=5 - i), service="auth", event="login_failed",
+                ip="10.0.0.1", path="/login", user_id=None, meta={},
+            )
+            db_session.add(ev)
+            db_session.commit()
+            engine.run_detection_pipeline(db_session, ev)
+            db_session.commit()
+
+        alerts = {a.rule: a for a in db_session.query(Alert).all()}
+        assert set(alerts) == {"brute_force_login", "brute_force_critical"}
+        assert alerts["brute_force_login"].count == 3
+        assert alerts["brute_force_critical"].count == 5
+        assert alerts["brute_force_critical"].severity == "critical"
+        # One window per (group, ip) regardless of how many rules share it
+        assert len(memory_backend) == 1